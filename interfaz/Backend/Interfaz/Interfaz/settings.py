@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -20,13 +21,19 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
+# Perfil de producción: DJANGO_DEBUG=0 junto con DJANGO_SECRET_KEY y DJANGO_ALLOWED_HOSTS.
+# `python manage.py selfcheck` (lo ejecuta gunicorn al arrancar) valida esta configuración.
+INSECURE_SECRET_KEY = 'django-insecure-gm^=mohp%0_5ou(l_x!2%zf@f6(4=z6g&@h6@5diigi-7=p%nw'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-gm^=mohp%0_5ou(l_x!2%zf@f6(4=z6g&@h6@5diigi-7=p%nw'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY') or INSECURE_SECRET_KEY
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0']
+ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0'] + [
+    host.strip() for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host.strip()
+]
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -51,6 +58,7 @@ CORS_ALLOW_HEADERS = [
     'cache-control',
     'pragma',
     'if-modified-since',
+    'if-none-match',
     'access-control-allow-origin',
     'access-control-allow-headers',
     'access-control-allow-methods',
@@ -82,6 +90,7 @@ CORS_EXPOSE_HEADERS = [
     'cache-control',
     'expires',
     'last-modified',
+    'etag',
     'pragma',
     'vary',
     'content-length',
@@ -111,12 +120,16 @@ AUTH_USER_MODEL = 'api.User'
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # CORS primero para Safari
     'django.middleware.security.SecurityMiddleware',
+    # Archivos estáticos servidos por la app (si whitenoise está instalado, ver más abajo)
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Métricas por request (consultas SQL, tiempos, Server-Timing): ver api/instrumentation.py
+    'api.instrumentation.RequestMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'Interfaz.urls'
@@ -143,6 +156,20 @@ WSGI_APPLICATION = 'Interfaz.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Conexiones a Postgres. Dos modos:
+# - Persistente (por defecto): cada hilo reutiliza su conexión durante DB_CONN_MAX_AGE segundos
+#   y Django verifica que siga viva antes de usarla (DB_CONN_HEALTH_CHECKS).
+# - Pool (DB_POOL=1, requiere psycopg 3 con psycopg_pool): cada proceso mantiene un pool de
+#   DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE conexiones; CONN_MAX_AGE queda en 0 porque el pool
+#   administra la vida de las conexiones.
+# Dimensionamiento: procesos × max(hilos, DB_POOL_MAX_SIZE) + workers de reportes debe quedar por
+# debajo de max_connections de Postgres (100 por defecto). Con gunicorn de 3 procesos × 4 hilos,
+# DB_POOL_MAX_SIZE=4 usa como máximo 12 conexiones.
+DB_POOL = (
+    os.environ.get('DB_POOL', '0') == '1'
+    and importlib.util.find_spec('psycopg') is not None
+    and importlib.util.find_spec('psycopg_pool') is not None
+)
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -151,14 +178,52 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'practicas2025'),
         'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
         'PORT': os.environ.get('POSTGRES_PORT', '5432'),
-        'OPTIONS': {'connect_timeout': 5},
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'OPTIONS': {'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))},
     }
 }
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '4')),
+        # Segundos que un request espera una conexión libre antes de fallar
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    }
 
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
+# Hash de contraseñas (api.hashers). PASSWORD_HASHER elige el algoritmo para contraseñas nuevas
+# ('pbkdf2', 'scrypt' o 'argon2', este último requiere argon2-cffi); los demás quedan para
+# verificar hashes existentes, que se regeneran solos en el próximo login correcto.
+# `python manage.py benchmark_hashers` recomienda parámetros según la latencia objetivo.
+PASSWORD_HASHING = {
+    'ALGORITHM': os.environ.get('PASSWORD_HASHER', 'pbkdf2'),
+    'PBKDF2_ITERATIONS': int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', '1000000')),
+    'SCRYPT_WORK_FACTOR': int(os.environ.get('PASSWORD_SCRYPT_WORK_FACTOR', str(2 ** 14))),
+    'SCRYPT_BLOCK_SIZE': int(os.environ.get('PASSWORD_SCRYPT_BLOCK_SIZE', '8')),
+    'ARGON2_TIME_COST': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', '2')),
+    'ARGON2_MEMORY_COST': int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', '102400')),
+    'ARGON2_PARALLELISM': int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', '8')),
+}
+# Sin variable se usa el paralelismo de scrypt de Django (api.hashers.DEFAULT_PASSWORD_HASHING)
+if os.environ.get('PASSWORD_SCRYPT_PARALLELISM'):
+    PASSWORD_HASHING['SCRYPT_PARALLELISM'] = int(os.environ['PASSWORD_SCRYPT_PARALLELISM'])
+_PASSWORD_HASHER_PATHS = {
+    'pbkdf2': 'api.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'api.hashers.TunedScryptPasswordHasher',
+    'argon2': 'api.hashers.TunedArgon2PasswordHasher',
+}
+if PASSWORD_HASHING['ALGORITHM'] not in _PASSWORD_HASHER_PATHS or (
+    PASSWORD_HASHING['ALGORITHM'] == 'argon2' and importlib.util.find_spec('argon2') is None
+):
+    PASSWORD_HASHING['ALGORITHM'] = 'pbkdf2'
+PASSWORD_HASHERS = [_PASSWORD_HASHER_PATHS[PASSWORD_HASHING['ALGORITHM']]] + [
+    path for name, path in _PASSWORD_HASHER_PATHS.items() if name != PASSWORD_HASHING['ALGORITHM']
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -198,11 +263,34 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Reportes PDF generados por el worker de reportes (api/report_jobs.py)
+REPORT_FILES_ROOT = MEDIA_ROOT / 'reports'
+# Segundos durante los que un PDF ya generado se reutiliza para pedidos idénticos
+REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', '3600'))
+# Un trabajo 'running' sin terminar después de este tiempo se considera abandonado y se reintenta
+REPORT_JOB_TIMEOUT = int(os.environ.get('REPORT_JOB_TIMEOUT', '600'))
+
 # Additional static files directories
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# Sin servidor web delante, whitenoise sirve STATIC_ROOT (collectstatic) comprimido y con
+# nombres versionados cacheables. Es opcional: sin el paquete se quita su middleware y los
+# estáticos solo se sirven con DEBUG=True (ver urls.py).
+if importlib.util.find_spec('whitenoise') is not None:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {
+            'BACKEND': (
+                'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+                else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+            ),
+        },
+    }
+else:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 # Static files finders
 STATICFILES_FINDERS = [
     'django.contrib.staticfiles.finders.FileSystemFinder',
@@ -214,14 +302,74 @@ STATICFILES_FINDERS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Métricas por request (api/instrumentation.py)
+REQUEST_METRICS = {
+    'ENABLED': os.environ.get('REQUEST_METRICS_ENABLED', '1') == '1',
+    'SERVER_TIMING': os.environ.get('REQUEST_METRICS_SERVER_TIMING', '1') == '1',
+    'SLOW_REQUEST_MS': int(os.environ.get('REQUEST_METRICS_SLOW_MS', '500')),
+    'MAX_QUERIES': int(os.environ.get('REQUEST_METRICS_MAX_QUERIES', '50')),
+    'DUPLICATE_QUERY_THRESHOLD': int(os.environ.get('REQUEST_METRICS_DUPLICATE_THRESHOLD', '5')),
+    'POOL_STATS': os.environ.get('REQUEST_METRICS_POOL_STATS', '1') == '1',
+}
+
+# Caché de Django: contadores de login y versiones de estado de usuarios. El LocMemCache es por
+# proceso; con varios workers usar un backend compartido, por ejemplo
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/tmp/interfaz-cache
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'interfaz'),
+    }
+}
+
+# Límites de intentos de login fallidos (api.login_throttle)
+LOGIN_THROTTLE = {
+    'MAX_FAILURES_PER_EMAIL': int(os.environ.get('LOGIN_MAX_FAILURES_PER_EMAIL', '5')),
+    'EMAIL_WINDOW': int(os.environ.get('LOGIN_EMAIL_WINDOW', '900')),
+    'MAX_FAILURES_PER_IP': int(os.environ.get('LOGIN_MAX_FAILURES_PER_IP', '30')),
+    'IP_WINDOW': int(os.environ.get('LOGIN_IP_WINDOW', '900')),
+    'TRUST_X_FORWARDED_FOR': os.environ.get('LOGIN_TRUST_X_FORWARDED_FOR', '0') == '1',
+}
+
+# Caché por proceso de usuarios autenticados por JWT (api.authentication.RoleJWTAuthentication).
+# Bloqueos, bajas y cambios de rol invalidan el snapshot; TTL acota la demora entre procesos
+# cuando CACHES no apunta a un caché compartido.
+JWT_USER_CACHE = {
+    'ENABLED': os.environ.get('JWT_USER_CACHE_ENABLED', '1') == '1',
+    'MAX_SIZE': int(os.environ.get('JWT_USER_CACHE_MAX_SIZE', '2048')),
+    'TTL': float(os.environ.get('JWT_USER_CACHE_TTL', '5')),
+}
+
+# Logs de la aplicación por consola: una línea JSON por request en 'api.metrics'
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.environ.get('API_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Configuración de DRF con JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT de SimpleJWT con el rol del usuario precargado (una consulta por request)
+        'api.authentication.RoleJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Paginación por cursor opt-in (?page_size= / ?cursor=); sin esos parámetros se devuelve la lista completa
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetCursorPagination',
 }
 
 # Configuración de JWT
@@ -236,6 +384,13 @@ SECURE_CROSS_ORIGIN_OPENER_POLICY = None
 SECURE_REFERRER_POLICY = None
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 
+# Producción: cookies seguras y HSTS solo si el sitio se sirve por HTTPS (DJANGO_HTTPS=1)
+if not DEBUG and os.environ.get('DJANGO_HTTPS', '0') == '1':
+    SESSION_COOKIE_SECURE = True
+    CSRF_COOKIE_SECURE = True
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+    SECURE_HSTS_SECONDS = int(os.environ.get('DJANGO_HSTS_SECONDS', '3600'))
+
 # Configuración para desarrollo - permitir localhost en Safari
 if DEBUG:
     ALLOWED_HOSTS.extend(['localhost', '127.0.0.1', '0.0.0.0', '::1', '10.0.2.2'])
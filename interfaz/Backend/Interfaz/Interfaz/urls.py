@@ -24,11 +24,12 @@ from api.views import (
     UserViewSet, ProductViewSet, CashMovementViewSet, 
     InventoryChangeViewSet, SaleViewSet, SaleCreate,
     UserListCreate, UserDestroy, login_view, ExportDataView,
-    UserQueryViewSet, SupplierViewSet, UserStorageViewSet, CurrentUserView,
+    UserQueryViewSet, SupplierViewSet, UserStorageViewSet, CurrentUserView, CurrentUserStatusView, SyncView, ProductionFeasibilityView, MaterialPlanView,
     LowStockReportCreateView, LowStockReportListView, LowStockReportUpdateView,
     RecipeIngredientViewSet, ProductProductionView, LossRecordViewSet,
     get_ingredients_with_suggested_unit, refresh_from_cookie, logout_view,
-    RoleViewSet, PurchaseViewSet, OrderViewSet, ProductionViewSet
+    RoleViewSet, PurchaseViewSet, OrderViewSet, ProductionViewSet, ReportJobViewSet,
+    ExportStreamView
 )
 from django.shortcuts import redirect
 from rest_framework_simplejwt.views import (
@@ -53,6 +54,7 @@ router.register(r'inventory-change-audits', __import__('api.views', fromlist=['I
 router.register(r'recipe-ingredients', RecipeIngredientViewSet, basename='recipe-ingredient')
 router.register(r'loss-records', LossRecordViewSet, basename='loss-record')
 router.register(r'productions', ProductionViewSet, basename='production')
+router.register(r'reports', ReportJobViewSet, basename='report-job')
 
 
 def root_redirect(request):
@@ -65,6 +67,10 @@ urlpatterns = [
     path('api/products/produce/', ProductProductionView.as_view(), name='product-production'),
     path('api/ingredients/suggested-units/', get_ingredients_with_suggested_unit, name='ingredients-suggested-units'),
     path('api/users/me/', CurrentUserView.as_view(), name='user-me'),
+    path('api/users/me/status/', CurrentUserStatusView.as_view(), name='user-me-status'),
+    path('api/sync/', SyncView.as_view(), name='sync'),
+    path('api/production/feasibility/', ProductionFeasibilityView.as_view(), name='production-feasibility'),
+    path('api/production/plan/', MaterialPlanView.as_view(), name='production-plan'),
     path('api/users/create/', UserListCreate.as_view(), name='user-list-create'),
     path('api/users/<int:pk>/delete/', UserDestroy.as_view(), name='user-delete'),
     path('api/sales/create/', SaleCreate.as_view(), name='sale-create'),
@@ -77,6 +83,7 @@ urlpatterns = [
     path('api/refresh-cookie/', refresh_from_cookie, name='refresh-from-cookie'),
     path('api/logout/', logout_view, name='logout'),
     path('api/export-data/', ExportDataView.as_view(), name='export-data'),
+    path('api/export-data/stream/', ExportStreamView.as_view(), name='export-data-stream'),
     # Low stock reports
     path('api/low-stock-reports/', LowStockReportListView.as_view(), name='low-stock-report-list'),
     path('api/low-stock-reports/create/', LowStockReportCreateView.as_view(), name='low-stock-report-create'),
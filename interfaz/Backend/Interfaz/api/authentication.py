@@ -0,0 +1,200 @@
+# backend/api/authentication.py
+"""
+Autenticación JWT con el rol precargado y caché de usuarios por proceso.
+
+Los permisos (IsGerente, IsGerenteOrEncargado, ...) y varios get_queryset
+consultan `request.user.role.name` en cada request. `RoleJWTAuthentication`
+trae usuario y rol en una sola consulta con select_related y guarda un
+snapshot de ambos en un LRU con TTL (settings.JWT_USER_CACHE). Mientras el
+snapshot esté vigente, autenticar no toca la base: se valida la firma del
+token y se reconstruye una instancia nueva de User a partir del snapshot.
+
+Invalidación: User.bump_status_version() (bloqueo, desbloqueo, baja,
+UserUpdateSerializer.update) descarta el snapshot local y publica la nueva
+versión en el caché de Django. Un snapshot cuya versión no coincide con la
+publicada se vuelve a cargar de la base. Con un caché compartido en CACHES el
+cambio llega a todos los procesos en el próximo request; con el LocMemCache
+por defecto los demás procesos lo ven al vencer el TTL.
+
+Los tokens emitidos por `tokens_for_user` llevan además el nombre del rol en
+el claim ROLE_CLAIM, para que el frontend no tenga que pedirlo aparte. El
+claim es informativo: los permisos siempre usan el rol del usuario cargado.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import Role
+
+ROLE_CLAIM = 'role'
+
+DEFAULT_JWT_USER_CACHE = {
+    'ENABLED': True,
+    # Usuarios distintos que se mantienen en memoria por proceso
+    'MAX_SIZE': 2048,
+    # Segundos que un snapshot se usa sin volver a la base
+    'TTL': 5.0,
+}
+
+
+def role_name(user):
+    """Nombre del rol del usuario o None, sin consultar la base si no tiene rol."""
+    if user is None or not getattr(user, 'role_id', None):
+        return None
+    return user.role.name
+
+
+def tokens_for_user(user):
+    """RefreshToken para `user` con el rol como claim (se copia al access token)."""
+    refresh = RefreshToken.for_user(user)
+    refresh[ROLE_CLAIM] = role_name(user)
+    return refresh
+
+
+def access_token_for(refresh, user):
+    """Access token a partir de `refresh` con el rol actual de `user`."""
+    access = refresh.access_token
+    access[ROLE_CLAIM] = role_name(user)
+    return access
+
+
+def user_cache_settings():
+    config = dict(DEFAULT_JWT_USER_CACHE)
+    config.update(getattr(settings, 'JWT_USER_CACHE', {}) or {})
+    return config
+
+
+class UserSnapshotCache:
+    """LRU con TTL de snapshots de usuario: {user_id: (vence, status_version, valores, rol)}."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry
+
+    def set(self, user_id, status_version, values, role_values):
+        entry = (time.monotonic() + self.ttl, status_version, values, role_values)
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_snapshot_cache = None
+
+
+def snapshot_cache():
+    global _snapshot_cache
+    if _snapshot_cache is None:
+        config = user_cache_settings()
+        _snapshot_cache = UserSnapshotCache(max(1, int(config['MAX_SIZE'])), float(config['TTL']))
+    return _snapshot_cache
+
+
+def _status_key(user_id):
+    return f'api:user-status:{user_id}'
+
+
+def publish_status_version(user_id, status_version):
+    """Descarta el snapshot local de `user_id` y publica su nueva versión para los demás procesos."""
+    snapshot_cache().invalidate(user_id)
+    try:
+        cache.set(_status_key(user_id), status_version, timeout=None)
+    except Exception:
+        # Sin caché disponible la invalidación en otros procesos queda a cargo del TTL
+        pass
+
+
+def _published_version(user_id):
+    try:
+        return cache.get(_status_key(user_id))
+    except Exception:
+        return None
+
+
+class RoleJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que carga usuario y rol en una consulta y los cachea por proceso."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        if api_settings.USER_ID_FIELD == 'id' and user_cache_settings()['ENABLED']:
+            user = self._cached_user(user_id)
+        else:
+            user = self._load_user(user_id)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
+
+    def _load_user(self, user_id):
+        User = get_user_model()
+        try:
+            return User.objects.select_related('role').get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist as e:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+
+    def _cached_user(self, user_id):
+        User = get_user_model()
+        user_fields = [f.attname for f in User._meta.concrete_fields]
+        snapshots = snapshot_cache()
+
+        entry = snapshots.get(user_id)
+        if entry is not None:
+            published = _published_version(user_id)
+            if published is None or published == entry[1]:
+                # Instancia nueva por request: los cambios de una vista no alcanzan al caché
+                user = User.from_db('default', user_fields, entry[2])
+                if entry[3] is not None:
+                    user.role = Role.from_db('default', [f.attname for f in Role._meta.concrete_fields], entry[3])
+                return user
+            snapshots.invalidate(user_id)
+
+        user = self._load_user(user_id)
+        role = user.role if user.role_id else None
+        snapshots.set(
+            user_id,
+            user.status_version,
+            tuple(getattr(user, name) for name in user_fields),
+            tuple(getattr(role, f.attname) for f in Role._meta.concrete_fields) if role else None,
+        )
+        return user
@@ -0,0 +1,368 @@
+# backend/api/benchmarks.py
+"""
+Benchmarks de los endpoints más usados (ver `python manage.py benchmark`).
+
+`seed_dataset` carga un conjunto de datos del tamaño de una panadería real
+(productos con recetas, ventas de un año, auditorías de inventario y
+movimientos de caja) con bulk_create por lotes. Todos los productos creados
+llevan el prefijo BENCH_PREFIX para poder reconocerlos.
+
+Cada escenario se ejecuta en el mismo proceso con el cliente de DRF y mide
+latencia, throughput y cantidad de consultas SQL por request. Los mismos
+escenarios corren como suite de pytest-benchmark en api/tests/.
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .instrumentation import QueryCollector
+from .models import (
+    Role, Product, RecipeIngredient, Sale, SaleItem, InventoryChangeAudit, CashMovement, Purchase,
+)
+
+BENCH_PREFIX = 'BENCH '
+BENCH_USER = 'bench_gerente'
+SEED_BATCH_SIZE = 5000
+
+DEFAULT_DATASET = {
+    'products': 2000,
+    'ingredients': 300,
+    'ingredients_per_recipe': 6,
+    'sales': 200000,
+    'items_per_sale': 3,
+    'audits': 100000,
+    'cash_movements': 100000,
+    'days': 365,
+}
+
+
+def _bulk(model, objs):
+    model.objects.bulk_create(objs, batch_size=SEED_BATCH_SIZE)
+
+
+def _spread_timestamps(model, first_id, last_id, days, field='timestamp'):
+    """
+    Reparte las filas [first_id, last_id] en los últimos `days` días con un
+    UPDATE por día (auto_now_add no permite fijar la fecha al crear).
+    """
+    total = last_id - first_id + 1
+    if total <= 0:
+        return
+    now = timezone.now()
+    per_day = max(1, total // days)
+    start = first_id
+    for day in range(days, 0, -1):
+        if start > last_id:
+            break
+        end = last_id if day == 1 else min(start + per_day - 1, last_id)
+        model.objects.filter(id__gte=start, id__lte=end).update(
+            **{field: now - timedelta(days=day - 1, hours=random.randint(0, 10))}
+        )
+        start = end + 1
+
+
+def _last_id(model):
+    return model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def bench_user():
+    User = get_user_model()
+    role, _ = Role.objects.get_or_create(name='Gerente')
+    user, created = User.objects.get_or_create(
+        username=BENCH_USER,
+        defaults={'email': f'{BENCH_USER}@example.com', 'role': role},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    return user
+
+
+def dataset_counts():
+    return {
+        'products': Product.objects.filter(name__startswith=BENCH_PREFIX, category='Producto').count(),
+        'ingredients': Product.objects.filter(name__startswith=BENCH_PREFIX, category='Insumo').count(),
+        'recipe_ingredients': RecipeIngredient.objects.filter(product__name__startswith=BENCH_PREFIX).count(),
+        'sales': Sale.objects.count(),
+        'sale_items': SaleItem.objects.count(),
+        'audits': InventoryChangeAudit.objects.count(),
+        'cash_movements': CashMovement.objects.count(),
+    }
+
+
+def seed_dataset(log=print, seed=42, **sizes):
+    """Carga el dataset de benchmark. `sizes` sobreescribe DEFAULT_DATASET."""
+    from .rollups import rebuild_sales_rollups
+
+    config = dict(DEFAULT_DATASET, **{k: v for k, v in sizes.items() if v is not None})
+    rng = random.Random(seed)
+    user = bench_user()
+    days = max(1, config['days'])
+
+    started = time.monotonic()
+    with transaction.atomic():
+        # Insumos y productos con stock suficiente para todos los escenarios
+        _bulk(Product, [
+            Product(name=f'{BENCH_PREFIX}Insumo {i}', price=Decimal(rng.randint(1, 50)), stock=Decimal('9000000'),
+                    category='Insumo', unit=rng.choice(['g', 'ml', 'unidades']), is_ingredient=True,
+                    low_stock_threshold=1000)
+            for i in range(config['ingredients'])
+        ])
+        _bulk(Product, [
+            Product(name=f'{BENCH_PREFIX}Producto {i}', price=Decimal(rng.randint(100, 5000)), stock=Decimal('90000000'),
+                    category='Producto', unit='unidades', recipe_yield=rng.choice([1, 6, 12, 24]))
+            for i in range(config['products'])
+        ])
+        ingredients = list(Product.objects.filter(name__startswith=f'{BENCH_PREFIX}Insumo ').values_list('id', 'unit'))
+        product_ids = list(Product.objects.filter(name__startswith=f'{BENCH_PREFIX}Producto ').values_list('id', flat=True))
+        log(f'  {len(product_ids)} productos, {len(ingredients)} insumos')
+
+        recipe = []
+        per_recipe = min(config['ingredients_per_recipe'], len(ingredients))
+        for pid in product_ids:
+            for ingredient_id, unit in rng.sample(ingredients, per_recipe):
+                recipe.append(RecipeIngredient(product_id=pid, ingredient_id=ingredient_id,
+                                               quantity=Decimal(rng.randint(1, 500)),
+                                               unit=unit if unit in ('g', 'ml') else 'unidades'))
+        _bulk(RecipeIngredient, recipe)
+        log(f'  {len(recipe)} líneas de receta')
+
+        prices = dict(Product.objects.filter(id__in=product_ids).values_list('id', 'price'))
+        first_sale = _last_id(Sale) + 1
+        for offset in range(0, config['sales'], SEED_BATCH_SIZE):
+            count = min(SEED_BATCH_SIZE, config['sales'] - offset)
+            sales = [Sale(total_amount=Decimal('0'), payment_method=rng.choice(['efectivo', 'debito', 'credito', 'transferencia']),
+                          user=user) for _ in range(count)]
+            _bulk(Sale, sales)
+        last_sale = _last_id(Sale)
+        sale_ids = range(first_sale, last_sale + 1)
+
+        items = []
+        for sale_id in sale_ids:
+            for pid in rng.sample(product_ids, min(config['items_per_sale'], len(product_ids))):
+                items.append(SaleItem(sale_id=sale_id, product_id=pid, quantity=rng.randint(1, 6), price=prices[pid]))
+            if len(items) >= SEED_BATCH_SIZE:
+                _bulk(SaleItem, items)
+                items = []
+        _bulk(SaleItem, items)
+        log(f'  {len(sale_ids)} ventas con {config["items_per_sale"]} items')
+
+        audits = []
+        for _ in range(config['audits']):
+            previous = Decimal(rng.randint(0, 1000))
+            quantity = Decimal(rng.randint(1, 50))
+            audits.append(InventoryChangeAudit(
+                product_id=rng.choice(product_ids), user=user, role='Gerente', change_type='Entrada',
+                quantity=quantity, previous_stock=previous, new_stock=previous + quantity, reason='benchmark',
+            ))
+            if len(audits) >= SEED_BATCH_SIZE:
+                _bulk(InventoryChangeAudit, audits)
+                audits = []
+        _bulk(InventoryChangeAudit, audits)
+
+        first_movement = _last_id(CashMovement) + 1
+        _bulk(CashMovement, [
+            CashMovement(type=rng.choice(['Entrada', 'Salida']), amount=Decimal(rng.randint(100, 50000)),
+                         description='benchmark', user=user, payment_method=rng.choice(['efectivo', 'transferencia']))
+            for _ in range(config['cash_movements'])
+        ])
+        log(f'  {config["audits"]} auditorías, {config["cash_movements"]} movimientos de caja')
+
+    # Fechas repartidas en el período y totales/rollups consistentes con los items
+    from django.db.models import Sum, F, OuterRef, Subquery, DecimalField, ExpressionWrapper
+    _spread_timestamps(Sale, first_sale, last_sale, days)
+    _spread_timestamps(CashMovement, first_movement, _last_id(CashMovement), days)
+    line_totals = (
+        SaleItem.objects.filter(sale_id=OuterRef('pk')).values('sale_id')
+        .annotate(total=Sum(ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))))
+        .values('total')
+    )
+    Sale.objects.filter(id__gte=first_sale, id__lte=last_sale).update(total_amount=Subquery(line_totals))
+    today = timezone.localdate()
+    rebuild_sales_rollups(today - timedelta(days=days), today)
+
+    log(f'  dataset cargado en {time.monotonic() - started:.1f}s')
+    return dataset_counts()
+
+
+# ---------------------- Escenarios
+
+class Scenario:
+    """Un escenario prepara su payload en `setup()` y ejecuta un request en `run(client)`."""
+    name = ''
+    mutates = True
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.product_ids = list(
+            Product.objects.filter(name__startswith=f'{BENCH_PREFIX}Producto ').values_list('id', flat=True)
+        )
+        if not self.product_ids:
+            raise RuntimeError('No hay datos de benchmark: ejecute el comando con --seed')
+
+    def setup(self):
+        pass
+
+    def run(self, client):
+        raise NotImplementedError
+
+
+class SaleCreateScenario(Scenario):
+    name = 'sale_create'
+
+    def run(self, client):
+        items = [
+            {'product_id': pid, 'product_name': '', 'quantity': self.rng.randint(1, 3), 'price': '100.00'}
+            for pid in self.rng.sample(self.product_ids, 4)
+        ]
+        total = sum(Decimal(i['price']) * i['quantity'] for i in items)
+        return client.post('/api/sales/', {'total_amount': str(total), 'payment_method': 'efectivo', 'items': items}, format='json')
+
+
+class PurchaseApprovalScenario(Scenario):
+    name = 'purchase_approval'
+
+    def setup(self):
+        ingredients = list(
+            Product.objects.filter(name__startswith=f'{BENCH_PREFIX}Insumo ').values_list('id', 'name', 'unit')[:200]
+        )
+        purchase_units = {'g': 'kg', 'ml': 'l', 'unidades': 'unidades'}
+        items = [
+            {'product_id': pid, 'productName': name, 'quantity': 5, 'unitPrice': 10, 'unit': purchase_units.get(unit, unit)}
+            for pid, name, unit in self.rng.sample(ingredients, min(8, len(ingredients)))
+        ]
+        self.purchase = Purchase.objects.create(supplier='Benchmark', items=items, total_amount=Decimal('400'))
+
+    def run(self, client):
+        return client.post(f'/api/purchases/{self.purchase.id}/approve/', format='json')
+
+
+class ProductionBatchScenario(Scenario):
+    name = 'production_batch'
+
+    def run(self, client):
+        productions = [
+            {'product_id': pid, 'quantity_produced': self.rng.randint(1, 24)}
+            for pid in self.rng.sample(self.product_ids, 5)
+        ]
+        return client.post('/api/productions/batch/', {'productions': productions}, format='json')
+
+
+class ProductListScenario(Scenario):
+    name = 'product_list'
+    mutates = False
+
+    def run(self, client):
+        return client.get('/api/products/')
+
+
+class PdfExportScenario(Scenario):
+    name = 'pdf_export'
+    mutates = False
+    days = 1
+
+    def run(self, client):
+        end = timezone.localdate()
+        start = end - timedelta(days=self.days - 1)
+        return client.post('/api/export-data/', {
+            'query_type': 'ventas',
+            'filters': {'start_date': start.isoformat(), 'end_date': end.isoformat()},
+        }, format='json')
+
+
+SCENARIOS = {cls.name: cls for cls in (
+    SaleCreateScenario, PurchaseApprovalScenario, ProductionBatchScenario, ProductListScenario, PdfExportScenario,
+)}
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def bench_client():
+    client = APIClient()
+    client.force_authenticate(bench_user())
+    return client
+
+
+def run_once(scenario, client):
+    """Ejecuta un request del escenario; devuelve (response, cantidad de consultas SQL)."""
+    collector = QueryCollector()
+    with connections['default'].execute_wrapper(collector):
+        response = scenario.run(client)
+        # Consumir respuestas en streaming dentro de la medición
+        if getattr(response, 'streaming', False):
+            for _ in response.streaming_content:
+                pass
+    return response, collector.count
+
+
+def run_scenario(name, iterations=20, warmup=2, seed=42, log=print):
+    """Ejecuta un escenario y devuelve sus estadísticas (tiempos en ms)."""
+    rng = random.Random(seed)
+    scenario = SCENARIOS[name](rng)
+    client = bench_client()
+
+    latencies, queries, statuses = [], [], {}
+    wall_started = time.perf_counter()
+    for i in range(warmup + iterations):
+        scenario.setup()
+        started = time.perf_counter()
+        response, query_count = run_once(scenario, client)
+        elapsed = (time.perf_counter() - started) * 1000
+        if i < warmup:
+            wall_started = time.perf_counter()
+            continue
+        latencies.append(elapsed)
+        queries.append(query_count)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    wall = time.perf_counter() - wall_started
+
+    result = {
+        'iterations': iterations,
+        'status_codes': {str(k): v for k, v in sorted(statuses.items())},
+        'latency_ms': {
+            'min': round(min(latencies), 2),
+            'median': round(statistics.median(latencies), 2),
+            'mean': round(statistics.fmean(latencies), 2),
+            'p95': round(_percentile(latencies, 0.95), 2),
+            'max': round(max(latencies), 2),
+        },
+        'throughput_rps': round(iterations / wall, 2) if wall else None,
+        'queries': {
+            'min': min(queries),
+            'median': statistics.median(queries),
+            'max': max(queries),
+        },
+    }
+    log(f'  {name}: mediana {result["latency_ms"]["median"]} ms, p95 {result["latency_ms"]["p95"]} ms, '
+        f'{result["throughput_rps"]} req/s, {result["queries"]["median"]} consultas, códigos {result["status_codes"]}')
+    return result
+
+
+def compare_results(current, baseline, max_regression):
+    """
+    Compara la mediana de latencia y las consultas con un resultado anterior.
+    Devuelve la lista de regresiones superiores a `max_regression` (0.2 = 20 %).
+    """
+    regressions = []
+    for name, result in current.get('scenarios', {}).items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        for metric, now, before in (
+            ('latency_ms.median', result['latency_ms']['median'], previous['latency_ms']['median']),
+            ('queries.median', result['queries']['median'], previous['queries']['median']),
+        ):
+            if before and now > before * (1 + max_regression):
+                regressions.append({'scenario': name, 'metric': metric, 'baseline': before, 'current': now})
+    return regressions
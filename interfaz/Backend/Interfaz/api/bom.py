@@ -0,0 +1,169 @@
+# backend/api/bom.py
+"""
+Listas de materiales (BOM) de varios niveles.
+
+Una receta puede usar como insumo otro producto que a su vez tiene receta
+(una crema, una masa madre). Para cada producto se calculan dos vectores por
+UNIDAD producida, ya divididos por `recipe_yield`:
+
+- `direct`: los insumos de su propia receta, tal como se descuentan al producir.
+- `flat`: la receta expandida hasta los insumos sin receta propia, para
+  planificación, factibilidad y costeo.
+
+Los vectores se guardan en el caché de Django bajo una generación global que
+vive en la base (BomGeneration), no en el caché: con un caché local por
+proceso cada worker de gunicorn vería otra generación. Cualquier alta, cambio
+o baja de un RecipeIngredient, o un cambio de `recipe_yield`, incrementa la
+generación en la misma transacción y los vectores se recalculan en la próxima
+consulta de cualquier proceso. Las recetas cambian poco, así
+que invalidar todo es más simple que seguir la cadena de cada producto y es
+igual de correcto. Un ciclo (A usa B y B usa A) se rechaza al guardar la
+receta y, si existiera en la base, `resolve_boms` lo informa con RecipeCycleError.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+
+BOM_CACHE_TIMEOUT = 60 * 60 * 24
+
+Bom = namedtuple('Bom', ['direct', 'flat', 'units'])
+
+
+class RecipeCycleError(ValueError):
+    def __init__(self, path):
+        self.path = path
+        super().__init__('La receta forma un ciclo: ' + ' → '.join(str(pid) for pid in path))
+
+
+def bom_generation():
+    from .models import BomGeneration
+
+    return BomGeneration.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+
+def invalidate_boms():
+    """Descarta todos los vectores cacheados; se confirma junto con la transacción actual."""
+    from .models import BomGeneration
+
+    if not BomGeneration.objects.filter(pk=1).update(value=F('value') + 1):
+        BomGeneration.objects.get_or_create(pk=1, defaults={'value': 1})
+
+
+def _cache_key(generation, product_id):
+    return f'api:bom:{generation}:{product_id}'
+
+
+def _load_recipes(product_ids):
+    """
+    Recetas de `product_ids` y de todos sus sub-productos, un nivel por consulta.
+    Devuelve {product_id: [(ingredient_id, cantidad por unidad, unidad)]}.
+    """
+    from .models import RecipeIngredient
+
+    recipes = {}
+    frontier = set(product_ids)
+    while frontier:
+        for pid in frontier:
+            recipes.setdefault(pid, [])
+        rows = RecipeIngredient.objects.filter(product_id__in=frontier).order_by('id').values_list(
+            'product_id', 'ingredient_id', 'quantity', 'unit', 'product__recipe_yield',
+        )
+        for product_id, ingredient_id, quantity, unit, recipe_yield in rows:
+            per_unit = Decimal(str(quantity)) / Decimal(recipe_yield or 1)
+            recipes[product_id].append((ingredient_id, per_unit, unit))
+        frontier = {ingredient_id for lines in recipes.values() for ingredient_id, _, _ in lines} - set(recipes)
+    return recipes
+
+
+def _flatten(product_id, recipes, memo, path):
+    if product_id in memo:
+        return memo[product_id]
+    if product_id in path:
+        raise RecipeCycleError(path[path.index(product_id):] + [product_id])
+    path.append(product_id)
+    flat = {}
+    for ingredient_id, per_unit, _ in recipes.get(product_id, ()):
+        if recipes.get(ingredient_id):
+            for leaf_id, leaf_per_unit in _flatten(ingredient_id, recipes, memo, path).items():
+                flat[leaf_id] = flat.get(leaf_id, Decimal('0')) + per_unit * leaf_per_unit
+        else:
+            flat[ingredient_id] = flat.get(ingredient_id, Decimal('0')) + per_unit
+    path.pop()
+    memo[product_id] = flat
+    return flat
+
+
+def resolve_boms(product_ids):
+    """
+    {product_id: Bom} para los productos indicados. Los vectores vigentes salen
+    del caché; los que faltan se calculan juntos (una consulta por nivel de
+    anidamiento) y se guardan para los próximos requests.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+    generation = bom_generation()
+    keys = {_cache_key(generation, pid): pid for pid in product_ids}
+    boms = {keys[key]: Bom(*value) for key, value in cache.get_many(list(keys)).items()}
+
+    missing = product_ids - set(boms)
+    if missing:
+        recipes = _load_recipes(missing)
+        memo = {}
+        computed = {}
+        for pid in recipes:
+            direct, units = {}, {}
+            for ingredient_id, per_unit, unit in recipes[pid]:
+                direct[ingredient_id] = direct.get(ingredient_id, Decimal('0')) + per_unit
+                units.setdefault(ingredient_id, unit)
+            computed[pid] = Bom(direct, _flatten(pid, recipes, memo, []), units)
+        cache.set_many(
+            {_cache_key(generation, pid): tuple(bom) for pid, bom in computed.items()}, timeout=BOM_CACHE_TIMEOUT,
+        )
+        boms.update((pid, computed[pid]) for pid in missing)
+    return boms
+
+
+def ensure_acyclic(product_id, ingredient_ids):
+    """Lanza RecipeCycleError si agregar `ingredient_ids` a la receta de `product_id` crea un ciclo."""
+    ingredient_ids = {int(i) for i in ingredient_ids if i is not None}
+    if not ingredient_ids or product_id is None:
+        return
+    product_id = int(product_id)
+    if product_id in ingredient_ids:
+        raise RecipeCycleError([product_id, product_id])
+    recipes = _load_recipes(ingredient_ids)
+    for ingredient_id in ingredient_ids:
+        # Buscar product_id entre los descendientes del insumo
+        stack, seen = [(ingredient_id, [product_id, ingredient_id])], set()
+        while stack:
+            current, path = stack.pop()
+            for child_id, _, _ in recipes.get(current, ()):
+                if child_id == product_id:
+                    raise RecipeCycleError(path + [child_id])
+                if child_id not in seen:
+                    seen.add(child_id)
+                    stack.append((child_id, path + [child_id]))
+
+
+def _recipe_changed(sender, **kwargs):
+    invalidate_boms()
+
+
+def _product_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'recipe_yield' not in update_fields:
+        return
+    if 'recipe_yield' in instance.get_deferred_fields():
+        return
+    # Sin valor leído de la base (instancia armada a mano) se invalida por las dudas
+    if not created and getattr(instance, '_loaded_recipe_yield', None) != instance.recipe_yield:
+        invalidate_boms()
+    instance._loaded_recipe_yield = instance.recipe_yield
+
+
+post_save.connect(_recipe_changed, sender='api.RecipeIngredient', dispatch_uid='api.bom:recipe_saved')
+post_delete.connect(_recipe_changed, sender='api.RecipeIngredient', dispatch_uid='api.bom:recipe_deleted')
+post_save.connect(_product_saved, sender='api.Product', dispatch_uid='api.bom:product_saved')
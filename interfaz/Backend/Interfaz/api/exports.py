@@ -0,0 +1,335 @@
+# backend/api/exports.py
+"""
+Exportaciones CSV / XLSX en streaming.
+
+Cada fuente recorre su queryset con `.iterator(chunk_size=...)` (cursor del
+lado del servidor en PostgreSQL) y produce filas de a una; los escritores
+CSV y XLSX las convierten en bytes a medida que el cliente las descarga.
+La memoria usada no depende de la cantidad de filas exportadas.
+
+Los `query_type` son los mismos del reporte PDF (api/reports.py) más
+'auditoria_inventario' y 'perdidas'.
+"""
+import csv
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, DecimalField, ExpressionWrapper
+
+from .models import (
+    Product, CashMovement, Sale, SaleItem, Purchase, OrderItem, Supplier, InventoryChangeAudit, LossRecord,
+)
+from .reports import ReportFilterError, parse_report_filters, date_range_q, format_datetime
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+
+def _line_total():
+    return ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _sales_rows(filters):
+    items = SaleItem.objects.filter(date_range_q('sale__timestamp', filters))
+    sales = Sale.objects.filter(date_range_q('timestamp', filters), saleitem__isnull=True)
+    if 'ids' in filters:
+        items = items.filter(sale_id__in=filters['ids'])
+        sales = sales.filter(id__in=filters['ids'])
+    if filters.get('payment_method'):
+        items = items.filter(sale__payment_method__icontains=filters['payment_method'])
+        sales = sales.filter(payment_method__icontains=filters['payment_method'])
+    if filters.get('user'):
+        items = items.filter(sale__user__username__icontains=filters['user'])
+        sales = sales.filter(user__username__icontains=filters['user'])
+
+    for row in items.annotate(line_total=_line_total()).order_by('sale_id', 'id').values_list(
+        'sale_id', 'sale__timestamp', 'product_id', 'product__name', 'quantity', 'price', 'line_total',
+        'sale__payment_method', 'sale__user__username',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        sale_id, timestamp, product_id, product, quantity, price, total, method, user = row
+        yield [sale_id, format_datetime(timestamp), product_id, product, quantity, price, total, method, user or 'Sistema']
+
+    # Ventas registradas sin detalle de items
+    for sale_id, timestamp, total, method, user in sales.order_by('id').values_list(
+        'id', 'timestamp', 'total_amount', 'payment_method', 'user__username'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [sale_id, format_datetime(timestamp), None, 'Venta (sin items detallados)', 1, total, total, method, user or 'Sistema']
+
+
+def _cash_movement_rows(filters):
+    qs = CashMovement.objects.filter(date_range_q('timestamp', filters))
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('type'):
+        qs = qs.filter(type=filters['type'])
+    if filters.get('payment_method'):
+        qs = qs.filter(payment_method=filters['payment_method'])
+    for mid, timestamp, mtype, amount, method, description, user in qs.order_by('id').values_list(
+        'id', 'timestamp', 'type', 'amount', 'payment_method', 'description', 'user__username'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [mid, format_datetime(timestamp), mtype, amount, method or '', description or '', user or '']
+
+
+def _inventory_audit_rows(filters):
+    qs = InventoryChangeAudit.objects.filter(date_range_q('timestamp', filters))
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('product'):
+        qs = qs.filter(product__name__icontains=filters['product'])
+    if filters.get('type'):
+        qs = qs.filter(change_type=filters['type'])
+    for row in qs.order_by('id').values_list(
+        'id', 'timestamp', 'product_id', 'product__name', 'change_type', 'quantity',
+        'previous_stock', 'new_stock', 'user__username', 'role', 'reason', 'inventory_change_id',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        aid, timestamp, product_id, product, change_type, quantity, previous, new, user, role, reason, change_id = row
+        yield [aid, format_datetime(timestamp), product_id, product, change_type, quantity, previous, new,
+               user or '', role or '', reason or '', change_id]
+
+
+def _loss_rows(filters):
+    qs = LossRecord.objects.filter(date_range_q('timestamp', filters))
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('product'):
+        qs = qs.filter(product__name__icontains=filters['product'])
+    if filters.get('category'):
+        qs = qs.filter(category=filters['category'])
+    for row in qs.order_by('id').values_list(
+        'id', 'timestamp', 'product_id', 'product__name', 'product__category', 'product__unit',
+        'quantity', 'category', 'cost_estimate', 'description', 'user__username',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        lid, timestamp, product_id, product, product_category, unit, quantity, category, cost, description, user = row
+        yield [lid, format_datetime(timestamp), product_id, product, product_category, unit, quantity,
+               category, cost, description or '', user or '']
+
+
+def _stock_rows(filters):
+    qs = Product.objects.filter(is_active=True)
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('category') or filters.get('type'):
+        qs = qs.filter(category__iexact=filters.get('category') or filters.get('type'))
+    yield from (list(row) for row in qs.order_by('id').values_list(
+        'id', 'name', 'category', 'unit', 'stock', 'low_stock_threshold', 'price'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE))
+
+
+def _purchase_rows(filters):
+    qs = Purchase.objects.filter(date_range_q('created_at', filters), is_active=True)
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('status'):
+        qs = qs.filter(status=filters['status'])
+    # Una fila por item (los items de la compra se guardan como JSON)
+    for pid, created_at, supplier, status, items, total in qs.order_by('id').values_list(
+        'id', 'created_at', 'supplier', 'status', 'items', 'total_amount'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        base = [pid, format_datetime(created_at), supplier or '', status]
+        items = [it for it in (items if isinstance(items, list) else []) if isinstance(it, dict)]
+        if not items:
+            yield base + ['', None, None, total]
+        for it in items:
+            yield base + [
+                it.get('productName') or it.get('product_name') or it.get('name') or '',
+                it.get('quantity') or it.get('qty'),
+                it.get('unitPrice') or it.get('unit_price') or it.get('price'),
+                total,
+            ]
+
+
+def _order_rows(filters):
+    qs = OrderItem.objects.filter(date_range_q('order__fecha_de_orden_del_pedido', filters))
+    if 'ids' in filters:
+        qs = qs.filter(order_id__in=filters['ids'])
+    if filters.get('status'):
+        qs = qs.filter(order__status=filters['status'])
+    for row in qs.order_by('order_id', 'id').values_list(
+        'order_id', 'order__fecha_de_orden_del_pedido', 'order__customer_name', 'order__payment_method',
+        'order__status', 'product_name', 'quantity', 'unit_price', 'total',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        oid, created_at, customer, method, status, product, quantity, unit_price, total = row
+        yield [oid, format_datetime(created_at), customer, method or '', status, product, quantity, unit_price, total]
+
+
+def _supplier_rows(filters):
+    qs = Supplier.objects.filter(is_active=True)
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    for row in qs.order_by('id').values_list(
+        'id', 'name', 'cuit', 'phone', 'address', 'products'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [value if value is not None else '' for value in row]
+
+
+def _user_rows(filters):
+    qs = get_user_model().objects.filter(is_active=True)
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    for uid, username, email, role in qs.order_by('id').values_list(
+        'id', 'username', 'email', 'role__name'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [uid, username, email, role or '']
+
+
+_SALES = (['Venta', 'Fecha', 'ID Producto', 'Producto', 'Cantidad', 'Precio', 'Total', 'Método de pago', 'Usuario'], _sales_rows)
+_STOCK = (['ID', 'Producto/Insumo', 'Tipo', 'Unidad', 'Stock', 'Umbral stock bajo', 'Precio'], _stock_rows)
+_SUPPLIERS = (['ID', 'Nombre', 'CUIT', 'Teléfono', 'Dirección', 'Productos'], _supplier_rows)
+_USERS = (['ID', 'Usuario', 'Email', 'Rol'], _user_rows)
+_AUDIT = (
+    ['ID', 'Fecha', 'ID Producto', 'Producto', 'Tipo', 'Cantidad', 'Stock anterior', 'Stock nuevo',
+     'Usuario', 'Rol', 'Motivo', 'Movimiento'],
+    _inventory_audit_rows,
+)
+_LOSSES = (
+    ['ID', 'Fecha', 'ID Producto', 'Producto', 'Tipo', 'Unidad', 'Cantidad', 'Categoría', 'Costo estimado',
+     'Descripción', 'Usuario'],
+    _loss_rows,
+)
+
+# query_type -> (encabezados, generador de filas)
+EXPORT_SOURCES = {
+    'stock': _STOCK,
+    'inventario': _STOCK,
+    'ventas': _SALES,
+    'movimientos_caja': (['ID', 'Fecha', 'Tipo', 'Monto', 'Método de pago', 'Descripción', 'Usuario'], _cash_movement_rows),
+    'compras': (['Compra', 'Fecha', 'Proveedor', 'Estado', 'Producto', 'Cantidad', 'Precio unitario', 'Total compra'], _purchase_rows),
+    'pedidos': (['Pedido', 'Fecha', 'Cliente', 'Método de pago', 'Estado', 'Producto', 'Cantidad', 'Precio unitario', 'Total'], _order_rows),
+    'proveedores': _SUPPLIERS,
+    'suppliers': _SUPPLIERS,
+    'usuarios': _USERS,
+    'users': _USERS,
+    'auditoria_inventario': _AUDIT,
+    'perdidas': _LOSSES,
+}
+
+
+class _Echo:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en lugar de guardarlo."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    writer = csv.writer(_Echo())
+    # BOM para que Excel detecte UTF-8 al abrir el archivo
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(['' if value is None else value for value in row])
+
+
+class _ZipSink:
+    """
+    Destino no posicionable para zipfile: acumula lo escrito hasta que se
+    vacía con drain(). zipfile escribe descriptores de datos después de cada
+    archivo, así que nunca necesita volver atrás en el stream.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_STATIC_PARTS = (
+    ('[Content_Types].xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ('xl/_rels/workbook.xml.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+     '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+     '</Relationships>'),
+    ('xl/styles.xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+     '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+     '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+     '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+     '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+     '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+     '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+     '</styleSheet>'),
+)
+
+# Filas del worksheet entre cada entrega de bytes al cliente
+XLSX_ROWS_PER_CHUNK = 500
+
+
+def _xlsx_cell(value, style=''):
+    if isinstance(value, bool):
+        return f'<c t="b"{style}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c{style}><v>{value}</v></c>'
+    if value is None or value == '':
+        return '<c/>'
+    return f'<c t="inlineStr"{style}><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def _xlsx_row(values, style=''):
+    return ('<row>' + ''.join(_xlsx_cell(v, style) for v in values) + '</row>').encode('utf-8')
+
+
+def stream_xlsx(headers, rows, sheet_name='Datos'):
+    """
+    Genera un .xlsx mínimo (una hoja, strings inline) a medida que se
+    consumen las filas. La hoja se comprime con deflate en streaming.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        for name, content in _XLSX_STATIC_PARTS:
+            zf.writestr(name, content)
+        yield sink.drain()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(headers, ' s="1"'))
+            for count, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row))
+                if count % XLSX_ROWS_PER_CHUNK == 0:
+                    data = sink.drain()
+                    if data:
+                        yield data
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+def export_rows(query_type, filters=None):
+    """Devuelve (encabezados, iterador de filas) para `query_type`; lanza ReportFilterError si no es válido."""
+    source = EXPORT_SOURCES.get(query_type)
+    if source is None:
+        raise ReportFilterError(f'Tipo de exportación no soportado: {query_type}')
+    headers, builder = source
+    return headers, builder(parse_report_filters(filters))
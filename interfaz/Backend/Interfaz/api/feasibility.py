@@ -0,0 +1,196 @@
+# backend/api/feasibility.py
+"""
+Factibilidad de producción: cuántas unidades de cada producto se pueden
+producir con el stock actual y qué insumos limitan.
+
+Con la matriz A (insumos × productos, cantidad por unidad de api/bom.py ya
+agrandada por el `loss_rate` de cada insumo), el stock s y las cantidades
+pedidas q:
+
+1. Máximo individual de cada producto: min_i floor(s_i / A_ij).
+2. Si A·q <= s todo el pedido es factible.
+3. Si no, se escala el pedido por el mayor t con A·(t·q) <= s, se redondea a
+   unidades enteras y el stock sobrante se reparte en el orden recibido.
+
+Es una aproximación greedy del problema lineal, suficiente para la pantalla de
+producción: no toma locks ni modifica nada. Los resultados se ajustan después
+con ingredient_consumption, el mismo consumo redondeado que descuenta la
+producción, así lo que se informa como factible no falla al registrarlo. Con NumPy instalado las cuentas se
+hacen sobre la matriz completa; sin NumPy se usa la versión en Python puro.
+"""
+import math
+from decimal import Decimal
+
+from .bom import resolve_boms
+from .services import gross_for_loss, ingredient_consumption
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+# Tolerancia para no perder una unidad por redondeo de punto flotante
+_EPSILON = 1e-9
+
+
+def _allocate_numpy(matrix, stock, requested):
+    A = np.array(matrix, dtype=float).reshape(len(stock), len(requested))
+    s = np.clip(np.array(stock, dtype=float), 0, None)
+    q = np.array(requested, dtype=float)
+    used = A > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_ingredient = np.where(used, np.floor(s[:, None] / A + _EPSILON), np.inf)
+    max_alone = per_ingredient.min(axis=0) if len(stock) else np.full(len(requested), np.inf)
+
+    demand = A @ q
+    if np.all(demand <= s + _EPSILON):
+        allocated = q.copy()
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = np.where(demand > 0, s / demand, np.inf)
+        allocated = np.floor(q * min(1.0, ratios.min()) + _EPSILON)
+        remaining = s - A @ allocated
+        for j in range(len(q)):
+            column = A[:, j]
+            mask = column > 0
+            room = np.floor(remaining[mask] / column[mask] + _EPSILON).min() if mask.any() else np.inf
+            extra = max(0.0, min(q[j] - allocated[j], room))
+            allocated[j] += extra
+            remaining -= column * extra
+    return [None if math.isinf(v) else int(v) for v in max_alone], [float(v) for v in allocated], list(demand)
+
+
+def _allocate_python(matrix, stock, requested):
+    m, n = len(stock), len(requested)
+    s = [max(float(v), 0.0) for v in stock]
+    q = [float(v) for v in requested]
+
+    def room(available, j):
+        limits = [math.floor(available[i] / matrix[i][j] + _EPSILON) for i in range(m) if matrix[i][j] > 0]
+        return min(limits) if limits else math.inf
+
+    max_alone = [room(s, j) for j in range(n)]
+    demand = [sum(matrix[i][j] * q[j] for j in range(n)) for i in range(m)]
+    if all(demand[i] <= s[i] + _EPSILON for i in range(m)):
+        allocated = list(q)
+    else:
+        scale = min([1.0] + [s[i] / demand[i] for i in range(m) if demand[i] > 0])
+        allocated = [math.floor(q[j] * scale + _EPSILON) for j in range(n)]
+        remaining = [s[i] - sum(matrix[i][j] * allocated[j] for j in range(n)) for i in range(m)]
+        for j in range(n):
+            extra = max(0.0, min(q[j] - allocated[j], room(remaining, j)))
+            allocated[j] += extra
+            for i in range(m):
+                remaining[i] -= matrix[i][j] * extra
+    return [None if math.isinf(v) else int(v) for v in max_alone], [float(v) for v in allocated], demand
+
+
+def _consumption(vectors, loss_rates, ingredient_ids, lines):
+    """Consumo exacto de cada insumo para `lines` [(product_id, cantidad)], línea por línea como en producción."""
+    demand = [Decimal('0')] * len(ingredient_ids)
+    for pid, quantity in lines:
+        if not quantity:
+            continue
+        for i, iid in enumerate(ingredient_ids):
+            per_unit = vectors[pid].get(iid)
+            if per_unit:
+                demand[i] += ingredient_consumption(per_unit, quantity, loss_rates[iid])
+    return demand
+
+
+def production_feasibility(lines, expand=False):
+    """
+    `lines` es [(product_id, cantidad)]. Con `expand=True` se usan las recetas
+    expandidas hasta los insumos base (ignora el stock de preparaciones
+    intermedias); por defecto, los insumos directos que descuenta la producción.
+    """
+    from .models import Product
+
+    product_ids = list(dict.fromkeys(pid for pid, _ in lines))
+    quantities = {}
+    for pid, quantity in lines:
+        quantities[pid] = quantities.get(pid, Decimal('0')) + quantity
+
+    boms = resolve_boms(product_ids)
+    vectors = {pid: (boms[pid].flat if expand else boms[pid].direct) for pid in product_ids}
+    ingredient_ids = list(dict.fromkeys(iid for pid in product_ids for iid in vectors[pid]))
+    rows = Product.objects.filter(id__in=set(product_ids) | set(ingredient_ids)).only(
+        'id', 'name', 'stock', 'unit', 'loss_rate',
+    )
+    products = {p.id: p for p in rows}
+    missing = [pid for pid in product_ids if pid not in products]
+    if missing:
+        raise LookupError(missing[0])
+    loss_rates = {iid: products[iid].loss_rate for iid in ingredient_ids}
+
+    matrix = [
+        [float(gross_for_loss(vectors[pid][iid], loss_rates[iid])) if iid in vectors[pid] else 0.0 for pid in product_ids]
+        for iid in ingredient_ids
+    ]
+    stock = [float(products[iid].stock) for iid in ingredient_ids]
+    requested = [float(quantities[pid]) for pid in product_ids]
+    allocate = _allocate_numpy if np is not None else _allocate_python
+    max_alone, allocated, _ = allocate(matrix, stock, requested)
+
+    # Ajuste con el consumo redondeado de producción: el punto flotante y el
+    # redondeo a centésimos pueden mover el límite en una unidad
+    available = [max(Decimal(str(products[iid].stock)), Decimal('0')) for iid in ingredient_ids]
+
+    def fits(pid, quantity):
+        return all(d <= a for d, a in zip(_consumption(vectors, loss_rates, ingredient_ids, [(pid, quantity)]), available))
+
+    for j, pid in enumerate(product_ids):
+        if max_alone[j] is None:
+            continue
+        while max_alone[j] > 0 and not fits(pid, max_alone[j]):
+            max_alone[j] -= 1
+        if fits(pid, max_alone[j] + 1):
+            max_alone[j] += 1
+    while True:
+        used = _consumption(vectors, loss_rates, ingredient_ids, list(zip(product_ids, allocated)))
+        over = next((i for i in range(len(ingredient_ids)) if used[i] > available[i]), None)
+        if over is None:
+            break
+        # Se achica el último producto (en el orden recibido) que usa el insumo excedido
+        j = max(j for j in range(len(product_ids)) if matrix[over][j] > 0 and allocated[j] > 0)
+        allocated[j] = max(0.0, allocated[j] - 1)
+
+    demand = _consumption(vectors, loss_rates, ingredient_ids, lines)
+
+    result_products = []
+    for j, pid in enumerate(product_ids):
+        # El insumo limitante es el que da el menor máximo individual
+        candidates = [
+            (max(stock[i], 0.0) / matrix[i][j], iid) for i, iid in enumerate(ingredient_ids) if matrix[i][j] > 0
+        ]
+        limiting = min(candidates)[1] if candidates else None
+        result_products.append({
+            'product_id': pid,
+            'name': products[pid].name,
+            'requested': requested[j],
+            'max_producible': max_alone[j],
+            'allocated': allocated[j],
+            'feasible': allocated[j] >= requested[j],
+            'bottleneck': None if limiting is None else {'ingredient_id': limiting, 'name': products[limiting].name},
+        })
+
+    bottlenecks = []
+    for i, iid in enumerate(ingredient_ids):
+        if demand[i] > Decimal(str(products[iid].stock)):
+            bottlenecks.append({
+                'ingredient_id': iid,
+                'name': products[iid].name,
+                'unit': products[iid].unit,
+                'required': float(demand[i]),
+                'available': stock[i],
+                'shortfall': float(demand[i]) - max(stock[i], 0.0),
+                'used_by': [pid for j, pid in enumerate(product_ids) if matrix[i][j] > 0],
+            })
+
+    return {
+        'feasible': not bottlenecks,
+        'products': result_products,
+        'bottlenecks': bottlenecks,
+        'engine': 'numpy' if np is not None else 'python',
+    }
@@ -0,0 +1,78 @@
+# backend/api/hashers.py
+"""
+Hashers de contraseñas con costo configurable (settings.PASSWORD_HASHING).
+
+Mantienen los nombres de algoritmo de Django, así que verifican cualquier
+hash existente. Cuando cambian los parámetros o el algoritmo preferido,
+`user.check_password` en el login detecta que el hash quedó desactualizado
+(must_update) y lo vuelve a generar con la configuración actual, sin pasos
+manuales. Para elegir parámetros en un servidor: `python manage.py benchmark_hashers`.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher,
+)
+
+DEFAULT_PASSWORD_HASHING = {
+    'ALGORITHM': 'pbkdf2',
+    'PBKDF2_ITERATIONS': PBKDF2PasswordHasher.iterations,
+    'SCRYPT_WORK_FACTOR': ScryptPasswordHasher.work_factor,
+    'SCRYPT_BLOCK_SIZE': ScryptPasswordHasher.block_size,
+    'SCRYPT_PARALLELISM': ScryptPasswordHasher.parallelism,
+    'ARGON2_TIME_COST': Argon2PasswordHasher.time_cost,
+    'ARGON2_MEMORY_COST': Argon2PasswordHasher.memory_cost,
+    'ARGON2_PARALLELISM': Argon2PasswordHasher.parallelism,
+}
+
+
+def hashing_settings():
+    config = dict(DEFAULT_PASSWORD_HASHING)
+    config.update(getattr(settings, 'PASSWORD_HASHING', {}) or {})
+    return config
+
+
+def argon2_available():
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return int(hashing_settings()['PBKDF2_ITERATIONS'])
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return int(hashing_settings()['SCRYPT_WORK_FACTOR'])
+
+    @property
+    def block_size(self):
+        return int(hashing_settings()['SCRYPT_BLOCK_SIZE'])
+
+    @property
+    def parallelism(self):
+        return int(hashing_settings()['SCRYPT_PARALLELISM'])
+
+    @property
+    def maxmem(self):
+        # OpenSSL limita scrypt a 32 MiB por defecto; se reserva el doble de lo que usa N·r
+        return 2 * 128 * self.work_factor * self.block_size * max(1, self.parallelism)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return int(hashing_settings()['ARGON2_TIME_COST'])
+
+    @property
+    def memory_cost(self):
+        return int(hashing_settings()['ARGON2_MEMORY_COST'])
+
+    @property
+    def parallelism(self):
+        return int(hashing_settings()['ARGON2_PARALLELISM'])
@@ -0,0 +1,201 @@
+# backend/api/instrumentation.py
+"""
+Métricas por request: cantidad de consultas SQL, tiempo en la base, tiempo de
+Python y tamaño de la respuesta.
+
+`RequestMetricsMiddleware` instala un `connection.execute_wrapper` durante
+cada request, publica los valores en el encabezado `Server-Timing` (visible en
+la pestaña Network del navegador) y deja una línea JSON por request en el
+logger `api.metrics`. Los requests que superan los umbrales de
+settings.REQUEST_METRICS se registran como WARNING junto con las huellas de
+SQL repetidas, que es como se ven los N+1.
+
+También se informa cuántas conexiones nuevas abrió el request (`db_connects`;
+con CONN_MAX_AGE debería ser 0 casi siempre). Con el pool de psycopg Django
+emite `connection_created` en cada préstamo del pool, así que esos se cuentan
+aparte (`db_checkouts`) y las conexiones físicas se ven en el estado del pool
+del proceso (`db_pool`).
+"""
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('api.metrics')
+
+DEFAULT_REQUEST_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    # Umbrales a partir de los que un request se registra como lento
+    'SLOW_REQUEST_MS': 500,
+    'MAX_QUERIES': 50,
+    # Una misma huella de SQL ejecutada este número de veces o más se informa como repetida
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+    # Cantidad máxima de huellas repetidas incluidas en el log
+    'MAX_REPORTED_DUPLICATES': 5,
+    # Incluir en el log las estadísticas del pool de conexiones (solo con OPTIONS['pool'])
+    'POOL_STATS': True,
+}
+
+# Collector del request en curso en este hilo, para contar conexiones nuevas
+_current = threading.local()
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_SPACES_RE = re.compile(r'\s+')
+
+
+def metrics_settings():
+    config = dict(DEFAULT_REQUEST_METRICS)
+    config.update(getattr(settings, 'REQUEST_METRICS', {}) or {})
+    return config
+
+
+def sql_fingerprint(sql):
+    """Normaliza una consulta reemplazando literales y listas IN por '?'."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACES_RE.sub(' ', sql).strip()
+
+
+class QueryCollector:
+    """execute_wrapper que cuenta consultas, mide su duración y agrupa por huella."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.connects = 0
+        self.checkouts = 0
+        self.fingerprints = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            fingerprint = sql_fingerprint(sql)
+            stats = self.fingerprints.get(fingerprint)
+            if stats is None:
+                self.fingerprints[fingerprint] = [1, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+
+    def duplicates(self, threshold, limit):
+        repeated = [
+            {'sql': sql[:500], 'count': count, 'ms': round(duration * 1000, 2)}
+            for sql, (count, duration) in self.fingerprints.items()
+            if count >= threshold
+        ]
+        repeated.sort(key=lambda d: d['count'], reverse=True)
+        return repeated[:limit]
+
+
+def _count_connection(sender, connection, **kwargs):
+    collector = getattr(_current, 'collector', None)
+    if collector is None:
+        return
+    if connection.settings_dict.get('OPTIONS', {}).get('pool'):
+        collector.checkouts += 1
+    else:
+        collector.connects += 1
+
+
+connection_created.connect(_count_connection, dispatch_uid='api.instrumentation.count_connection')
+
+
+def connection_pool_stats():
+    """Estadísticas de psycopg_pool por alias de base, solo para las conexiones con pool."""
+    stats = {}
+    for conn in connections.all(initialized_only=True):
+        if conn.vendor != 'postgresql' or not conn.settings_dict.get('OPTIONS', {}).get('pool'):
+            continue
+        pool = getattr(conn, 'pool', None)
+        if pool is not None:
+            stats[conn.alias] = pool.get_stats()
+    return stats
+
+
+def _response_size(response):
+    if getattr(response, 'streaming', False):
+        return None
+    try:
+        return len(response.content)
+    except Exception:
+        return None
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = metrics_settings()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        collector = QueryCollector()
+        _current.collector = collector
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(collector))
+                response = self.get_response(request)
+        finally:
+            _current.collector = None
+        total = time.perf_counter() - started
+
+        db_ms = collector.duration * 1000
+        total_ms = total * 1000
+        app_ms = max(total_ms - db_ms, 0.0)
+        size = _response_size(response)
+
+        if config['SERVER_TIMING']:
+            timing = (
+                f'db;dur={db_ms:.1f};desc="{collector.count} queries", '
+                f'app;dur={app_ms:.1f}, total;dur={total_ms:.1f}'
+            )
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': collector.count,
+            'db_connects': collector.connects,
+            'db_ms': round(db_ms, 2),
+            'app_ms': round(app_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'bytes': size,
+        }
+        user = getattr(request, 'user', None)
+        if user is not None and getattr(user, 'is_authenticated', False):
+            record['user_id'] = user.pk
+        if collector.checkouts:
+            record['db_checkouts'] = collector.checkouts
+        if config['POOL_STATS']:
+            pool_stats = connection_pool_stats()
+            if pool_stats:
+                record['db_pool'] = pool_stats
+
+        slow = total_ms >= config['SLOW_REQUEST_MS'] or collector.count >= config['MAX_QUERIES']
+        duplicates = collector.duplicates(config['DUPLICATE_QUERY_THRESHOLD'], config['MAX_REPORTED_DUPLICATES'])
+        if slow or duplicates:
+            record['duplicates'] = duplicates
+            logger.warning(json.dumps(record, ensure_ascii=False), extra={'metrics': record})
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False), extra={'metrics': record})
+        return response
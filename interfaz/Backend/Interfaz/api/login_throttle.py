@@ -0,0 +1,115 @@
+# backend/api/login_throttle.py
+"""
+Contadores de intentos de login fallidos por email y por IP.
+
+Los contadores viven en el caché de Django (settings.LOGIN_THROTTLE['CACHE'])
+y no en la tabla de usuarios: un intento fallido cuesta un incremento atómico
+en el caché, sin escrituras en la base. `login_view` consulta
+`LoginThrottle.blocked_for` antes de buscar al usuario y de calcular el hash
+de la contraseña, de modo que una ráfaga de credential stuffing se corta con una
+lectura de caché.
+
+Cada ventana es deslizante aproximada: se guardan dos baldes consecutivos de
+WINDOW segundos y el anterior se pondera por la fracción de ventana que
+todavía cubre.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_LOGIN_THROTTLE = {
+    'CACHE': 'default',
+    # Fallos por email dentro de la ventana que bloquean la cuenta (User.is_locked)
+    'MAX_FAILURES_PER_EMAIL': 5,
+    'EMAIL_WINDOW': 900,
+    # Fallos por IP dentro de la ventana a partir de los que se responde 429
+    'MAX_FAILURES_PER_IP': 30,
+    'IP_WINDOW': 900,
+    # Usar el primer valor de X-Forwarded-For como IP (solo detrás de un proxy confiable)
+    'TRUST_X_FORWARDED_FOR': False,
+}
+
+
+def throttle_settings():
+    config = dict(DEFAULT_LOGIN_THROTTLE)
+    config.update(getattr(settings, 'LOGIN_THROTTLE', {}) or {})
+    return config
+
+
+def client_ip(request, config=None):
+    config = config or throttle_settings()
+    if config['TRUST_X_FORWARDED_FOR']:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '') or 'unknown'
+
+
+def _prefix(scope, value):
+    digest = hashlib.sha256(value.encode('utf-8')).hexdigest()[:32]
+    return f'api:login-fail:{scope}:{digest}'
+
+
+def _window_count(store, prefix, window, now):
+    bucket = int(now // window)
+    current_key, previous_key = f'{prefix}:{bucket}', f'{prefix}:{bucket - 1}'
+    values = store.get_many([current_key, previous_key])
+    weight = 1 - (now % window) / window
+    return values.get(current_key, 0) + values.get(previous_key, 0) * weight
+
+
+def _increment(store, prefix, window, now):
+    key = f'{prefix}:{int(now // window)}'
+    # Dos ventanas de vida: el balde sigue contando como "anterior" en la ventana siguiente
+    store.add(key, 0, timeout=window * 2)
+    try:
+        store.incr(key)
+    except ValueError:
+        # El balde expiró entre add e incr
+        store.set(key, 1, timeout=window * 2)
+
+
+class LoginThrottle:
+    """Consulta y actualiza los contadores de un intento de login (email + IP)."""
+
+    def __init__(self, email, ip=''):
+        self.config = throttle_settings()
+        self.store = caches[self.config['CACHE']]
+        self.email_prefix = _prefix('email', email.strip().lower())
+        self.ip_prefix = _prefix('ip', ip)
+
+    def email_failures(self, now=None):
+        now = now if now is not None else time.time()
+        return math.ceil(_window_count(self.store, self.email_prefix, self.config['EMAIL_WINDOW'], now))
+
+    def blocked_for(self, now=None):
+        """
+        Segundos a esperar si la IP superó su límite, o 0 si el intento puede seguir.
+        (El límite por email se traduce en el bloqueo persistente de la cuenta.)
+        """
+        now = now if now is not None else time.time()
+        window = self.config['IP_WINDOW']
+        if _window_count(self.store, self.ip_prefix, window, now) >= self.config['MAX_FAILURES_PER_IP']:
+            return max(1, int(window - now % window))
+        return 0
+
+    def record_failure(self, now=None):
+        """Registra un fallo y devuelve los fallos del email dentro de su ventana."""
+        now = now if now is not None else time.time()
+        _increment(self.store, self.email_prefix, self.config['EMAIL_WINDOW'], now)
+        _increment(self.store, self.ip_prefix, self.config['IP_WINDOW'], now)
+        return self.email_failures(now)
+
+    def reset(self, now=None):
+        """Olvida los fallos del email (login correcto o desbloqueo)."""
+        now = now if now is not None else time.time()
+        window = self.config['EMAIL_WINDOW']
+        bucket = int(now // window)
+        self.store.delete_many([f'{self.email_prefix}:{bucket}', f'{self.email_prefix}:{bucket - 1}'])
+
+    @property
+    def max_failures(self):
+        return self.config['MAX_FAILURES_PER_EMAIL']
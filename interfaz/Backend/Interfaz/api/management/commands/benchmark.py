@@ -0,0 +1,103 @@
+# backend/api/management/commands/benchmark.py
+import json
+import platform
+import sys
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia, throughput y consultas SQL de los endpoints principales '
+        '(ventas, aprobación de compras, producción por lote, listado de productos y '
+        'exportación PDF) y guarda el resultado en JSON. Con --seed carga antes un '
+        'dataset del tamaño de una panadería real. Usar sobre una base de pruebas.'
+    )
+
+    def add_arguments(self, parser):
+        from api.benchmarks import DEFAULT_DATASET, SCENARIOS
+
+        parser.add_argument('--seed', action='store_true', help='Cargar el dataset de benchmark antes de medir.')
+        parser.add_argument('--seed-only', action='store_true', help='Cargar el dataset y salir sin medir.')
+        parser.add_argument('--noinput', action='store_true', help='No pedir confirmación antes de cargar datos.')
+        for name in ('products', 'ingredients', 'sales', 'audits', 'cash_movements', 'days'):
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=None,
+                help=f'Tamaño del dataset (por defecto {DEFAULT_DATASET[name]}).',
+            )
+        parser.add_argument('--items-per-sale', type=int, default=None,
+                            help=f'Items por venta (por defecto {DEFAULT_DATASET["items_per_sale"]}).')
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(SCENARIOS), default=None,
+            help='Escenario a medir (se puede repetir; por defecto todos).',
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='Requests medidos por escenario.')
+        parser.add_argument('--warmup', type=int, default=2, help='Requests descartados antes de medir.')
+        parser.add_argument('--output', default='benchmark_results.json', help='Archivo JSON de salida.')
+        parser.add_argument('--baseline', default=None, help='JSON de una corrida anterior para comparar.')
+        parser.add_argument(
+            '--max-regression', type=float, default=0.2,
+            help='Regresión tolerada respecto de --baseline (0.2 = 20 %%). Si se supera el comando falla.',
+        )
+
+    def handle(self, *args, **options):
+        from api import benchmarks
+
+        if options['seed'] or options['seed_only']:
+            if not options['noinput']:
+                answer = input(
+                    f'Se van a insertar datos de benchmark en la base "{connection.settings_dict["NAME"]}". '
+                    "Escriba 'si' para continuar: "
+                )
+                if answer.strip().lower() not in ('si', 'sí', 'yes'):
+                    raise CommandError('Carga cancelada.')
+            self.stdout.write('Cargando dataset de benchmark...')
+            sizes = {name: options[name] for name in
+                     ('products', 'ingredients', 'sales', 'items_per_sale', 'audits', 'cash_movements', 'days')}
+            counts = benchmarks.seed_dataset(log=self.stdout.write, **sizes)
+            self.stdout.write(self.style.SUCCESS(f'Dataset cargado: {counts}'))
+            if options['seed_only']:
+                return
+
+        iterations = max(1, options['iterations'])
+        results = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'iterations': iterations,
+                'dataset': benchmarks.dataset_counts(),
+            },
+            'scenarios': {},
+        }
+        self.stdout.write(f'Midiendo ({iterations} iteraciones por escenario)...')
+        for name in options['scenario'] or list(benchmarks.SCENARIOS):
+            try:
+                results['scenarios'][name] = benchmarks.run_scenario(
+                    name, iterations=iterations, warmup=max(0, options['warmup']), log=self.stdout.write,
+                )
+            except RuntimeError as e:
+                raise CommandError(str(e))
+
+        with open(options['output'], 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'Resultados guardados en {options["output"]}'))
+
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as fh:
+                    baseline = json.load(fh)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer la línea base: {e}')
+            regressions = benchmarks.compare_results(results, baseline, options['max_regression'])
+            for r in regressions:
+                self.stderr.write(self.style.ERROR(
+                    f'Regresión en {r["scenario"]} ({r["metric"]}): {r["baseline"]} -> {r["current"]}'
+                ))
+            if regressions:
+                sys.exit(1)
+            self.stdout.write(self.style.SUCCESS('Sin regresiones respecto de la línea base.'))
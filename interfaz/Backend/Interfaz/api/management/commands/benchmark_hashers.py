@@ -0,0 +1,145 @@
+# backend/api/management/commands/benchmark_hashers.py
+import json
+import statistics
+import time
+
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+
+from api.hashers import (
+    TunedArgon2PasswordHasher, TunedPBKDF2PasswordHasher, TunedScryptPasswordHasher,
+    argon2_available, hashing_settings,
+)
+
+BENCH_PASSWORD = 'contraseña-de-prueba-2025'
+BENCH_SALT = 'benchmarksalt1234567890'
+
+
+def _measure(encode, repeat):
+    """Mediana en ms de `repeat` ejecuciones de encode()."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el costo de los hashers de contraseñas en este servidor y recomienda '
+        'parámetros (variables PASSWORD_*) para una latencia objetivo por login.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250.0, help='Latencia objetivo de un hash (ms).')
+        parser.add_argument('--repeat', type=int, default=3, help='Mediciones por configuración.')
+        parser.add_argument(
+            '--algorithm', action='append', choices=['pbkdf2', 'scrypt', 'argon2'], default=None,
+            help='Algoritmo a medir (se puede repetir; por defecto todos los disponibles).',
+        )
+        parser.add_argument('--output', default=None, help='Guardar los resultados en este archivo JSON.')
+
+    def handle(self, *args, **options):
+        target = options['target_ms']
+        if target <= 0:
+            raise CommandError('--target-ms debe ser mayor que 0')
+        repeat = max(1, options['repeat'])
+        algorithms = options['algorithm'] or ['pbkdf2', 'scrypt', 'argon2']
+        if 'argon2' in algorithms and not argon2_available():
+            self.stdout.write(self.style.WARNING('argon2-cffi no está instalado: se omite argon2.'))
+            algorithms = [a for a in algorithms if a != 'argon2']
+
+        config = hashing_settings()
+        self.stdout.write(f'Objetivo: {target:.0f} ms por hash, algoritmo actual: {config["ALGORITHM"]}')
+        results = {}
+        for algorithm in algorithms:
+            result = getattr(self, f'_bench_{algorithm}')(target, repeat)
+            results[algorithm] = result
+            self.stdout.write(
+                f'  {algorithm}: actual {result["current_ms"]:.1f} ms {result["current"]} | '
+                f'recomendado {result["recommended_ms"]:.1f} ms {result["recommended"]} '
+                f'(~{1000 / result["recommended_ms"]:.1f} logins/s por núcleo)'
+            )
+
+        self.stdout.write('\nVariables de entorno sugeridas:')
+        for algorithm, result in results.items():
+            env = ' '.join(f'{k}={v}' for k, v in result['env'].items())
+            self.stdout.write(f'  PASSWORD_HASHER={algorithm} {env}')
+        self.stdout.write(
+            'Los hashes existentes se regeneran con la configuración nueva en el próximo login correcto de cada usuario.'
+        )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump({'target_ms': target, 'results': results}, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Resultados guardados en {options["output"]}'))
+
+    def _bench_pbkdf2(self, target, repeat):
+        current = TunedPBKDF2PasswordHasher()
+        current_ms = _measure(lambda: current.encode(BENCH_PASSWORD, BENCH_SALT), repeat)
+
+        # El costo de PBKDF2 es lineal en las iteraciones: calibrar con una corrida corta
+        hasher = PBKDF2PasswordHasher()
+        sample = 100_000
+        sample_ms = _measure(lambda: hasher.encode(BENCH_PASSWORD, BENCH_SALT, iterations=sample), repeat)
+        iterations = max(10_000, int(sample * target / sample_ms) // 10_000 * 10_000)
+        recommended_ms = _measure(lambda: hasher.encode(BENCH_PASSWORD, BENCH_SALT, iterations=iterations), repeat)
+        return {
+            'current': {'iterations': current.iterations},
+            'current_ms': current_ms,
+            'recommended': {'iterations': iterations},
+            'recommended_ms': recommended_ms,
+            'env': {'PASSWORD_PBKDF2_ITERATIONS': iterations},
+        }
+
+    def _bench_scrypt(self, target, repeat):
+        current = TunedScryptPasswordHasher()
+        current_ms = _measure(lambda: current.encode(BENCH_PASSWORD, BENCH_SALT), repeat)
+
+        # N debe ser potencia de 2: elegir el mayor que entra en el objetivo
+        block_size, parallelism = current.block_size, current.parallelism
+        best = None
+        for exponent in range(12, 21):
+            hasher = ScryptPasswordHasher()
+            hasher.work_factor = 2 ** exponent
+            hasher.block_size = block_size
+            hasher.parallelism = parallelism
+            hasher.maxmem = 2 * 128 * hasher.work_factor * block_size * max(1, parallelism)
+            elapsed = _measure(lambda: hasher.encode(BENCH_PASSWORD, BENCH_SALT), repeat)
+            if best is None or elapsed <= target:
+                best = (hasher.work_factor, elapsed)
+            if elapsed > target:
+                break
+        return {
+            'current': {'work_factor': current.work_factor, 'block_size': block_size, 'parallelism': parallelism},
+            'current_ms': current_ms,
+            'recommended': {'work_factor': best[0], 'block_size': block_size, 'parallelism': parallelism},
+            'recommended_ms': best[1],
+            'env': {'PASSWORD_SCRYPT_WORK_FACTOR': best[0]},
+        }
+
+    def _bench_argon2(self, target, repeat):
+        current = TunedArgon2PasswordHasher()
+        current_ms = _measure(lambda: current.encode(BENCH_PASSWORD, BENCH_SALT), repeat)
+
+        # Con la memoria fija, time_cost escala el costo de forma casi lineal
+        memory_cost, parallelism = current.memory_cost, current.parallelism
+        best = None
+        for time_cost in range(1, 11):
+            hasher = Argon2PasswordHasher()
+            hasher.time_cost = time_cost
+            hasher.memory_cost = memory_cost
+            hasher.parallelism = parallelism
+            elapsed = _measure(lambda: hasher.encode(BENCH_PASSWORD, BENCH_SALT), repeat)
+            if best is None or elapsed <= target:
+                best = (time_cost, elapsed)
+            if elapsed > target:
+                break
+        return {
+            'current': {'time_cost': current.time_cost, 'memory_cost': memory_cost, 'parallelism': parallelism},
+            'current_ms': current_ms,
+            'recommended': {'time_cost': best[0], 'memory_cost': memory_cost, 'parallelism': parallelism},
+            'recommended_ms': best[1],
+            'env': {'PASSWORD_ARGON2_TIME_COST': best[0]},
+        }
@@ -0,0 +1,130 @@
+# backend/api/management/commands/rebuild_rollups.py
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+# Rollups que se pueden reconstruir: nombre -> ruta de la función que los recalcula.
+# Cada función recibe (start, end, chunk_size) y devuelve {tabla_cruda: filas_procesadas}.
+ROLLUP_BUILDERS = {
+    'sales': 'api.rollups.rebuild_sales_rollups',
+}
+
+
+def _init_worker():
+    # Cada proceso hijo debe abrir sus propias conexiones a la base de datos
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _rebuild_partition(name, start, end, chunk_size):
+    from django.utils.module_loading import import_string
+
+    builder = import_string(ROLLUP_BUILDERS[name])
+    started = time.monotonic()
+    try:
+        counts = builder(start, end, chunk_size=chunk_size)
+    finally:
+        connections.close_all()
+    return name, start, end, counts, time.monotonic() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye las tablas de resumen (rollups) a partir de las tablas crudas, '
+        'particionando el rango de fechas entre varios procesos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Fecha inicial YYYY-MM-DD (por defecto, la primera venta registrada).')
+        parser.add_argument('--until', help='Fecha final YYYY-MM-DD inclusive (por defecto, hoy).')
+        parser.add_argument('--workers', type=int, default=1, help='Cantidad de procesos (1 = sin pool).')
+        parser.add_argument('--days-per-task', type=int, default=7, help='Días por partición de trabajo.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Filas por lote al leer con .iterator().')
+        parser.add_argument(
+            '--only', choices=sorted(ROLLUP_BUILDERS.keys()), action='append',
+            help='Reconstruir solo estos rollups (se puede repetir).',
+        )
+
+    def handle(self, *args, **options):
+        from api.models import Sale
+
+        until = self._parse(options['until'], '--until') or timezone.localdate()
+        since = self._parse(options['since'], '--since')
+        if since is None:
+            first = Sale.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+            if first is None:
+                self.stdout.write('No hay ventas registradas; nada para reconstruir.')
+                return
+            since = timezone.localtime(first).date()
+        if since > until:
+            raise CommandError('--since debe ser anterior o igual a --until')
+
+        workers = max(1, options['workers'])
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite no admite escrituras concurrentes desde varios procesos
+            self.stdout.write(self.style.WARNING('SQLite detectado: se usa un único proceso.'))
+            workers = 1
+        days_per_task = max(1, options['days_per_task'])
+        chunk_size = max(1, options['chunk_size'])
+        names = options['only'] or sorted(ROLLUP_BUILDERS.keys())
+
+        tasks = []
+        start = since
+        while start <= until:
+            end = min(start + timedelta(days=days_per_task - 1), until)
+            tasks.extend((name, start, end, chunk_size) for name in names)
+            start = end + timedelta(days=1)
+
+        self.stdout.write(
+            f'Reconstruyendo {", ".join(names)} desde {since} hasta {until} '
+            f'({len(tasks)} particiones, {workers} proceso(s))'
+        )
+
+        started = time.monotonic()
+        totals = {}
+        if workers == 1:
+            results = (_rebuild_partition(*task) for task in tasks)
+            for result in results:
+                self._report(result, totals)
+        else:
+            # Las conexiones del proceso padre no deben compartirse con los hijos
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(_rebuild_partition, *task) for task in tasks]
+                for future in as_completed(futures):
+                    self._report(future.result(), totals)
+
+        elapsed = time.monotonic() - started
+        rows = sum(totals.values())
+        summary = ', '.join(f'{table}={count}' for table, count in sorted(totals.items())) or 'sin filas'
+        self.stdout.write(self.style.SUCCESS(
+            f'Listo en {elapsed:.2f}s: {summary} ({rows / elapsed if elapsed else rows:.0f} filas/s)'
+        ))
+
+    def _parse(self, value, flag):
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f'{flag} debe tener formato YYYY-MM-DD')
+        return parsed
+
+    def _report(self, result, totals):
+        name, start, end, counts, elapsed = result
+        rows = sum(counts.values())
+        for table, count in counts.items():
+            totals[table] = totals.get(table, 0) + count
+        self.stdout.write(
+            f'  {name} {start}..{end}: {rows} filas en {elapsed:.2f}s '
+            f'({rows / elapsed if elapsed else rows:.0f} filas/s)'
+        )
@@ -0,0 +1,83 @@
+# backend/api/management/commands/run_report_worker.py
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+
+def _init_worker():
+    # Cada proceso hijo debe abrir sus propias conexiones a la base de datos
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _worker_loop(poll_interval, once, purge_every):
+    from api.report_jobs import claim_next_job, run_job, purge_report_files
+
+    processed = failed = 0
+    last_purge = 0.0
+    try:
+        while True:
+            if purge_every and time.monotonic() - last_purge >= purge_every:
+                purge_report_files()
+                last_purge = time.monotonic()
+
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    break
+                # Cerrar la conexión mientras se espera para no ocupar el pool de la base
+                connections.close_all()
+                time.sleep(poll_interval)
+                continue
+
+            if run_job(job):
+                processed += 1
+            else:
+                failed += 1
+    finally:
+        connections.close_all()
+    return processed, failed
+
+
+class Command(BaseCommand):
+    help = (
+        'Procesa la cola de exportaciones PDF (ReportJob). La cola es la tabla de la '
+        'base de datos, no requiere un broker externo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Cantidad de procesos (1 = sin pool).')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Segundos de espera cuando la cola está vacía.')
+        parser.add_argument('--once', action='store_true', help='Procesar los trabajos pendientes y salir.')
+        parser.add_argument(
+            '--purge-every', type=int, default=3600,
+            help='Cada cuántos segundos borrar PDFs viejos del disco (0 = nunca).',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite no admite escrituras concurrentes desde varios procesos
+            self.stdout.write(self.style.WARNING('SQLite detectado: se usa un único proceso.'))
+            workers = 1
+        args = (max(0.1, options['poll_interval']), options['once'], max(0, options['purge_every']))
+
+        self.stdout.write(f'Worker de reportes iniciado ({workers} proceso(s))')
+        started = time.monotonic()
+        if workers == 1:
+            results = [_worker_loop(*args)]
+        else:
+            # Las conexiones del proceso padre no deben compartirse con los hijos
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(_worker_loop, *args) for _ in range(workers)]
+                results = [future.result() for future in futures]
+
+        processed = sum(r[0] for r in results)
+        failed = sum(r[1] for r in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Listo en {time.monotonic() - started:.2f}s: {processed} reporte(s) generados, {failed} con error'
+        ))
@@ -0,0 +1,83 @@
+# backend/api/management/commands/selfcheck.py
+import importlib.util
+import os
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica la configuración antes de servir tráfico: checks de Django (--deploy con '
+        'DEBUG=False), conexión a la base, migraciones pendientes, estáticos y cachés. '
+        'Gunicorn lo ejecuta al arrancar (gunicorn.conf.py).'
+    )
+
+    def handle(self, *args, **options):
+        self.errors = []
+        self.warnings = []
+
+        # Checks del framework; los errores cortan el arranque
+        call_command('check', deploy=not settings.DEBUG, fail_level='ERROR', stdout=self.stdout, stderr=self.stderr)
+
+        self._check_database()
+        self._check_production()
+        self._check_storage()
+
+        for message in self.warnings:
+            self.stdout.write(self.style.WARNING(f'  ! {message}'))
+        for message in self.errors:
+            self.stderr.write(self.style.ERROR(f'  x {message}'))
+        if self.errors:
+            raise CommandError(f'selfcheck: {len(self.errors)} error(es)')
+        mode = 'DEBUG' if settings.DEBUG else 'producción'
+        self.stdout.write(self.style.SUCCESS(f'selfcheck OK ({mode}, {len(self.warnings)} advertencia(s))'))
+
+    def _check_database(self):
+        started = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception as e:
+            self.errors.append(f'No se pudo conectar a la base "{connection.settings_dict["NAME"]}": {e}')
+            return
+        self.stdout.write(f'  Base de datos ({connection.vendor}) OK en {(time.perf_counter() - started) * 1000:.1f} ms')
+
+        executor = MigrationExecutor(connection)
+        pending = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if pending:
+            names = ', '.join(f'{migration.app_label}.{migration.name}' for migration, _ in pending[:5])
+            self.errors.append(f'{len(pending)} migración(es) sin aplicar ({names}): ejecute migrate')
+
+        if os.environ.get('DB_POOL', '0') == '1' and not getattr(settings, 'DB_POOL', False):
+            self.warnings.append('DB_POOL=1 pero psycopg 3/psycopg_pool no están instalados: se usan conexiones persistentes')
+
+    def _check_production(self):
+        if settings.DEBUG:
+            return
+        if settings.SECRET_KEY == getattr(settings, 'INSECURE_SECRET_KEY', None):
+            self.errors.append('DEBUG=False con la SECRET_KEY de desarrollo: defina DJANGO_SECRET_KEY')
+        if importlib.util.find_spec('whitenoise') is None:
+            self.warnings.append('whitenoise no está instalado: los archivos estáticos no se sirven con DEBUG=False')
+        elif not os.path.exists(os.path.join(str(settings.STATIC_ROOT), 'staticfiles.json')):
+            self.errors.append('Falta el manifiesto de estáticos: ejecute collectstatic --noinput')
+        backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+        if backend.endswith('LocMemCache'):
+            self.warnings.append(
+                'CACHES usa LocMemCache: los contadores de login y las versiones de usuario no se comparten '
+                'entre procesos de gunicorn (configure CACHE_BACKEND/CACHE_LOCATION)'
+            )
+
+    def _check_storage(self):
+        root = str(settings.REPORT_FILES_ROOT)
+        try:
+            os.makedirs(root, exist_ok=True)
+        except OSError as e:
+            self.warnings.append(f'No se puede crear {root} para los reportes PDF: {e}')
+            return
+        if not os.access(root, os.W_OK):
+            self.warnings.append(f'{root} no tiene permisos de escritura: los reportes PDF fallarán')
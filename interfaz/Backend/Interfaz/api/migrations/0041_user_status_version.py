@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0040_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='status_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0041_user_status_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cashmovement',
+            index=models.Index(fields=['timestamp', 'id'], name='api_cashmov_timesta_de3137_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorychange',
+            index=models.Index(fields=['timestamp', 'id'], name='api_invento_timesta_461708_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorychangeaudit',
+            index=models.Index(fields=['timestamp', 'id'], name='api_invento_timesta_3947f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lossrecord',
+            index=models.Index(fields=['timestamp', 'id'], name='api_lossrec_timesta_698999_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['fecha_de_orden_del_pedido', 'id'], name='api_order_fecha_d_d65c2d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='production',
+            index=models.Index(fields=['created_at', 'id'], name='api_product_created_176062_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['timestamp', 'id'], name='api_sale_timesta_677b5e_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:10
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0042_list_cursor_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorychangeaudit',
+            index=models.Index(fields=['product', 'timestamp'], name='api_audit_product_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorychangeaudit',
+            index=models.Index(fields=['user', 'timestamp'], name='api_audit_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorychangeaudit',
+            index=models.Index(fields=['change_type', 'timestamp'], name='api_audit_type_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'fecha_de_orden_del_pedido'], name='api_order_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='api_product_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['is_ingredient', 'stock'], name='api_product_in_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at'], name='api_purchase_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['status', 'created_at'], name='api_purchase_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='api_user_email_upper_idx'),
+        ),
+    ]
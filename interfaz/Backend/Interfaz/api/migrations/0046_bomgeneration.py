@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0045_reportjob_cache_key_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BomGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
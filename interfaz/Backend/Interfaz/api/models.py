@@ -1,6 +1,7 @@
 # backend/api/models.py
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Upper
 import uuid
 
 # Modelo para almacenamiento tipo localStorage por usuario
@@ -21,6 +22,8 @@ class UserStorage(models.Model):
 # Modelo para roles
 class Role(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    # Última modificación: entra en la versión de los reportes cacheados (api/report_jobs.py)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -34,6 +37,8 @@ class Supplier(models.Model):
     products = models.CharField(max_length=255, blank=True, null=True)
     is_active = models.BooleanField(default=True)  # Para eliminación lógica
     deleted_at = models.DateTimeField(null=True, blank=True)  # Fecha de eliminación
+    # Última modificación: entra en la versión de los reportes cacheados (api/report_jobs.py)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -60,6 +65,11 @@ class User(AbstractUser):
         ('automatic', 'Automatic'),
     )
     lock_type = models.CharField(max_length=10, choices=LOCK_TYPE_CHOICES, null=True, blank=True)
+    # Se incrementa con cada cambio de estado de la cuenta (bloqueo, desbloqueo, baja, cambio de rol).
+    # Los clientes lo consultan en /api/users/me/status/ con ETag en lugar de pedir el usuario completo.
+    status_version = models.PositiveIntegerField(default=0)
+    # Última modificación: entra en la versión de los reportes cacheados (api/report_jobs.py)
+    updated_at = models.DateTimeField(auto_now=True)
     
     # Permitir espacios en el username sobrescribiendo el campo
     username = models.CharField(
@@ -71,9 +81,23 @@ class User(AbstractUser):
         },
     )
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # login y recuperación de contraseña buscan con email__iexact → UPPER(email) = UPPER(%s)
+            models.Index(Upper('email'), name='api_user_email_upper_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} - {self.role}"
 
+    def bump_status_version(self):
+        """Incrementa status_version de forma atómica e invalida los snapshots cacheados del usuario."""
+        from .authentication import publish_status_version
+
+        User.objects.filter(pk=self.pk).update(status_version=models.F('status_version') + 1)
+        self.refresh_from_db(fields=['status_version'])
+        publish_status_version(self.pk, self.status_version)
+
 # Modelo para los productos (eliminar la duplicación)
 class Product(models.Model):
     name = models.CharField(max_length=255)
@@ -96,6 +120,25 @@ class Product(models.Model):
     loss_rate = models.DecimalField(max_digits=5, decimal_places=4, default=0.02)
     is_active = models.BooleanField(default=True)  # Para eliminación lógica
     deleted_at = models.DateTimeField(null=True, blank=True)  # Fecha de eliminación
+    # Posición en la secuencia de cambios de /api/sync/ (api/sync.py)
+    change_seq = models.BigIntegerField(default=0, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Índices parciales: solo contienen las filas que consultan el listado y el selector de ingredientes
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='api_product_active_idx'),
+            models.Index(
+                fields=['is_ingredient', 'stock'], condition=models.Q(stock__gt=0), name='api_product_in_stock_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Rendimiento leído de la base: api/bom.py invalida las recetas cacheadas si cambia
+        if 'recipe_yield' in field_names:
+            instance._loaded_recipe_yield = instance.recipe_yield
+        return instance
 
     def __str__(self):
         return self.name
@@ -112,6 +155,11 @@ class CashMovement(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True)
     payment_method = models.CharField(max_length=50, blank=True, null=True)
+    # Última modificación: entra en la versión de los reportes cacheados (api/report_jobs.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['timestamp', 'id'])]
 
 # Modelo para cambios de inventario (no por ventas)
 class InventoryChange(models.Model):
@@ -126,6 +174,9 @@ class InventoryChange(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey('User', on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['timestamp', 'id'])]
+
     def __str__(self):
         return f'{self.type} de {self.quantity} de {self.product.name}'
 
@@ -144,6 +195,13 @@ class InventoryChangeAudit(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            # Filtros del historial de auditoría (?product=, ?user=, ?type=) ordenados por fecha
+            models.Index(fields=['product', 'timestamp'], name='api_audit_product_ts_idx'),
+            models.Index(fields=['user', 'timestamp'], name='api_audit_user_ts_idx'),
+            models.Index(fields=['change_type', 'timestamp'], name='api_audit_type_ts_idx'),
+        ]
 
     def __str__(self):
         user_repr = self.user.username if self.user else 'Sistema'
@@ -156,21 +214,88 @@ class Sale(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=50)
     user = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True)
+    # Última modificación: entra en la versión de los reportes cacheados (api/report_jobs.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['timestamp', 'id'])]
 
     def __str__(self):
         return f"Sale {self.id} - {self.total_amount}"
 
 
+class SaleIdempotencyKey(models.Model):
+    """
+    Clave generada por el cliente (caja offline) para cada venta encolada.
+    Permite reintentar el envío de un lote sin duplicar ventas ni descontar stock dos veces.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    sale = models.OneToOneField(Sale, on_delete=models.CASCADE, related_name='idempotency_key')
+    user = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key} -> Sale {self.sale_id}"
+
+
 class SaleItem(models.Model):
     sale = models.ForeignKey(Sale, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Última modificación: entra en la versión de los reportes cacheados (api/report_jobs.py)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name} @ {self.price}"
 
 
+# ---------------------- Tablas de resumen (rollups) para reportes de ventas
+# Se mantienen de forma incremental al registrar cada venta (ver api/rollups.py)
+class SalesDailyRollup(models.Model):
+    date = models.DateField(unique=True)
+    sales_count = models.IntegerField(default=0)
+    items_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: {self.sales_count} ventas - {self.total_amount}"
+
+
+class SalesProductDailyRollup(models.Model):
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_rollups')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'product')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: {self.quantity} x {self.product_id}"
+
+
+class SalesPaymentMethodDailyRollup(models.Model):
+    date = models.DateField()
+    payment_method = models.CharField(max_length=50)
+    sales_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'payment_method')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: {self.payment_method} - {self.total_amount}"
+
+
 class Purchase(models.Model):
     STATUS_CHOICES = (
         ('Pendiente', 'Pendiente'),
@@ -189,9 +314,19 @@ class Purchase(models.Model):
     approved_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)  # Para eliminación lógica
     deleted_at = models.DateTimeField(null=True, blank=True)  # Fecha de eliminación
+    # Última modificación: entra en la versión de los reportes cacheados (api/report_jobs.py)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Las compras dadas de baja nunca se listan: los índices excluyen esas filas
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True), name='api_purchase_active_idx'),
+            models.Index(
+                fields=['status', 'created_at'], condition=models.Q(is_active=True),
+                name='api_purchase_status_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Purchase {self.id} - {self.total_amount}"
@@ -206,9 +341,14 @@ class Order(models.Model):
     status = models.CharField(max_length=50, default='Pendiente')
     fecha_de_orden_del_pedido = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True)
+    change_seq = models.BigIntegerField(default=0, db_index=True)
 
     class Meta:
         ordering = ['-fecha_de_orden_del_pedido']
+        indexes = [
+            models.Index(fields=['fecha_de_orden_del_pedido', 'id']),
+            models.Index(fields=['status', 'fecha_de_orden_del_pedido'], name='api_order_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} - {self.customer_name}"
@@ -242,12 +382,48 @@ class UserQuery(models.Model):
     def __str__(self):
         return f"Query {self.query_type} by {self.user.username}"
 
+class ReportJob(models.Model):
+    """
+    Exportación de un reporte PDF encolada para el worker de reportes
+    (`python manage.py run_report_worker`). La cola es la propia tabla:
+    el worker toma los trabajos pendientes con SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En proceso'),
+        ('done', 'Listo'),
+        ('failed', 'Error'),
+    ]
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='report_jobs')
+    query_type = models.CharField(max_length=50)
+    filters = models.JSONField(default=dict, blank=True)
+    # sha256 de (query_type, filters, versión de los datos): trabajos con la misma clave comparten el archivo.
+    # La completa el worker al tomar el trabajo.
+    cache_key = models.CharField(max_length=64, db_index=True, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file_path = models.CharField(max_length=255, blank=True, default='')
+    cached = models.BooleanField(default=False)
+    error = models.TextField(blank=True, default='')
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"ReportJob {self.id} {self.query_type} ({self.status})"
+
+
 class LowStockReport(models.Model):
     products = models.ManyToManyField(Product, related_name='low_stock_reports')
     message = models.TextField()
     reported_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     is_resolved = models.BooleanField(default=False)
+    change_seq = models.BigIntegerField(default=0, db_index=True)
 
     def __str__(self):
         product_names = ", ".join([p.name for p in self.products.all()[:3]])
@@ -278,6 +454,9 @@ class LossRecord(models.Model):
     cost_estimate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['timestamp', 'id'])]
     
     def __str__(self):
         return f"Pérdida de {self.quantity} {self.product.unit} de {self.product.name} - {self.get_category_display()}"
@@ -333,6 +512,7 @@ class Production(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at', 'id'])]
 
     def __str__(self):
         return f"Production {self.id} by {self.user.username if self.user else 'Unknown'} - {self.total_units} units"
@@ -344,4 +524,28 @@ class ProductionItem(models.Model):
     quantity = models.IntegerField()
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.name}"
\ No newline at end of file
+        return f"{self.quantity} x {self.product.name}"
+
+
+# Contador global de cambios para /api/sync/: una sola fila (id=1)
+class SyncSequence(models.Model):
+    value = models.BigIntegerField(default=0)
+
+
+# Generación de las listas de materiales cacheadas (ver api/bom.py): una sola fila (id=1)
+class BomGeneration(models.Model):
+    value = models.BigIntegerField(default=0)
+
+
+# Registro de filas borradas físicamente, para que /api/sync/ informe las bajas
+class SyncTombstone(models.Model):
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} borrado en {self.change_seq}"
+
+
+# Receptores de señales: secuencia de cambios (api/sync.py) e invalidación de recetas (api/bom.py)
+from . import bom, sync  # noqa: E402,F401
@@ -0,0 +1,208 @@
+# backend/api/mrp.py
+"""
+Planificación de requerimientos de materiales (MRP) a partir de los pedidos abiertos.
+
+1. Demanda bruta: las cantidades de los pedidos 'Pendiente'/'En Preparación'
+   por producto y por período (día o semana de la fecha pedida; los atrasados
+   y los pedidos sin fecha caen en el período actual).
+2. Por nivel de receta (primero los productos pedidos, después sus
+   preparaciones intermedias, al final los insumos base) se descuenta el
+   stock disponible período a período. En productos con receta lo que falta
+   es producción planificada, que se explota con api/bom.py en demanda de sus
+   insumos para el mismo período, agrandada por el `loss_rate` de cada insumo
+   igual que al registrar la producción. En insumos sin receta es un faltante
+   a comprar, agrupado por proveedor.
+
+La demanda por pedido se guarda en el caché de Django junto con la posición de
+la secuencia de cambios de /api/sync/. Cada consulta solo relee los pedidos
+cuyo `change_seq` avanzó (y los borrados), no todo el horizonte; el neteo se
+recalcula siempre contra el stock actual porque es barato en memoria.
+"""
+import math
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .bom import resolve_boms
+from .services import ingredient_consumption
+from .sync import current_change_seq
+
+OPEN_ORDER_STATUSES = ('Pendiente', 'En Preparación')
+BUCKETS = ('day', 'week')
+_STATE_KEY = 'api:mrp:orders'
+_STATE_TIMEOUT = 60 * 60 * 24
+
+
+def _order_demand(order):
+    """(fecha pedida, {nombre de producto en mayúsculas: cantidad}) o None si el pedido no está abierto."""
+    if order.status not in OPEN_ORDER_STATUSES:
+        return None
+    due = order.fecha_para_la_que_se_quiere_el_pedido or order.fecha_de_orden_del_pedido
+    items = {}
+    for item in order.items.all():
+        name = (item.product_name or '').strip().upper()
+        if name and item.quantity > 0:
+            items[name] = items.get(name, 0) + item.quantity
+    return (timezone.localdate(due) if due else None, items) if items else None
+
+
+def _open_order_demand():
+    """
+    {order_id: demanda} de los pedidos abiertos, actualizado de forma incremental
+    desde la última consulta con la secuencia de cambios de los pedidos.
+    """
+    from .models import Order, SyncTombstone
+
+    cursor = current_change_seq()
+    state = cache.get(_STATE_KEY)
+    orders = Order.objects.prefetch_related('items')
+    if state is None or state['seq'] > cursor:
+        demand = {}
+        for order in orders.filter(status__in=OPEN_ORDER_STATUSES):
+            demand[order.id] = _order_demand(order)
+    else:
+        demand = dict(state['orders'])
+        if state['seq'] < cursor:
+            for order in orders.filter(change_seq__gt=state['seq'], change_seq__lte=cursor):
+                demand[order.id] = _order_demand(order)
+            for order_id in SyncTombstone.objects.filter(
+                model='orders', change_seq__gt=state['seq'], change_seq__lte=cursor,
+            ).values_list('object_id', flat=True):
+                demand.pop(order_id, None)
+    demand = {oid: d for oid, d in demand.items() if d is not None}
+    if state is None or state['seq'] != cursor:
+        cache.set(_STATE_KEY, {'seq': cursor, 'orders': demand}, timeout=_STATE_TIMEOUT)
+    return demand, cursor
+
+
+def _bucket_start(day, today, bucket):
+    day = max(day or today, today)
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _net(gross, on_hand, whole_units):
+    """Neteo período a período: {período: cantidad a producir/comprar}."""
+    available = max(on_hand, Decimal('0'))
+    planned = {}
+    for period in sorted(gross):
+        required = gross[period]
+        if available >= required:
+            available -= required
+            continue
+        quantity = required - available
+        available = Decimal('0')
+        planned[period] = Decimal(math.ceil(quantity)) if whole_units else quantity.quantize(Decimal('0.01'))
+    return planned
+
+
+def material_plan(bucket='day', horizon_days=None):
+    """Plan de producción por período y faltantes de insumos por proveedor."""
+    from .models import Product, Supplier
+
+    if bucket not in BUCKETS:
+        raise ValueError(f'Período inválido: {bucket}')
+    today = timezone.localdate()
+    horizon = today + timedelta(days=horizon_days) if horizon_days is not None else None
+    demand, cursor = _open_order_demand()
+
+    # Demanda bruta por nombre de producto y período
+    by_name = {}
+    for due, items in demand.values():
+        if horizon is not None and due is not None and due > horizon:
+            continue
+        period = _bucket_start(due, today, bucket)
+        for name, quantity in items.items():
+            periods = by_name.setdefault(name, {})
+            periods[period] = periods.get(period, Decimal('0')) + Decimal(quantity)
+
+    fields = ('id', 'name', 'stock', 'unit', 'loss_rate')
+    products = {
+        p.name.strip().upper(): p
+        for p in Product.objects.annotate(upper_name=Upper('name'))
+        .filter(upper_name__in=list(by_name), is_active=True).only(*fields)
+    }
+    unmatched = sorted(name for name in by_name if name not in products)
+    items = {products[name].id: products[name] for name in by_name if name in products}
+    gross = {products[name].id: periods for name, periods in by_name.items() if name in products}
+
+    # Nivel de cada ítem en las recetas: un insumo se netea después de todos los que lo usan
+    boms = {}
+    level = {pid: 0 for pid in gross}
+    frontier = set(gross)
+    while frontier:
+        boms.update(resolve_boms(frontier - set(boms)))
+        next_frontier = set()
+        for pid in frontier:
+            for ingredient_id in boms[pid].direct:
+                if level.get(ingredient_id, -1) < level[pid] + 1:
+                    level[ingredient_id] = level[pid] + 1
+                    next_frontier.add(ingredient_id)
+        frontier = next_frontier
+    missing = set(level) - set(items)
+    if missing:
+        items.update(Product.objects.only(*fields).in_bulk(missing))
+
+    production, purchases = [], {}
+    for pid in sorted(level, key=lambda pid: (level[pid], pid)):
+        item = items.get(pid)
+        if item is None or pid not in gross:
+            continue
+        recipe = boms[pid].direct
+        planned = _net(gross[pid], Decimal(item.stock), item.unit == 'unidades')
+        if not recipe:
+            if planned:
+                purchases[pid] = planned
+            continue
+        for period, quantity in sorted(planned.items()):
+            production.append({
+                'period': period.isoformat(),
+                'product_id': pid,
+                'name': item.name,
+                'unit': item.unit,
+                'level': level[pid],
+                'gross': float(gross[pid][period]),
+                'planned': float(quantity),
+            })
+            for ingredient_id, per_unit in recipe.items():
+                ingredient = items.get(ingredient_id)
+                needed = ingredient_consumption(per_unit, quantity, ingredient.loss_rate if ingredient else 0)
+                periods = gross.setdefault(ingredient_id, {})
+                periods[period] = periods.get(period, Decimal('0')) + needed
+
+    # Faltantes por proveedor: el primero activo que lista el insumo en `products`
+    suppliers = [
+        (name, {p.strip().upper() for p in (listed or '').split(',') if p.strip()})
+        for name, listed in Supplier.objects.filter(is_active=True).order_by('id').values_list('name', 'products')
+    ]
+    shortfalls = {}
+    for pid, planned in purchases.items():
+        item = items[pid]
+        supplier = next((name for name, listed in suppliers if item.name.strip().upper() in listed), None)
+        shortfalls.setdefault(supplier, []).append({
+            'ingredient_id': pid,
+            'name': item.name,
+            'unit': item.unit,
+            'stock': float(item.stock),
+            'quantity': float(sum(planned.values())),
+            'first_needed': min(planned).isoformat(),
+            'by_period': {period.isoformat(): float(q) for period, q in sorted(planned.items())},
+        })
+
+    production.sort(key=lambda row: (row['period'], row['level'], row['name']))
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'cursor': cursor,
+        'bucket': bucket,
+        'open_orders': len(demand),
+        'production': production,
+        'shortfalls': [
+            {'supplier': supplier, 'items': rows}
+            for supplier, rows in sorted(shortfalls.items(), key=lambda entry: (entry[0] is None, entry[0] or ''))
+        ],
+        'unmatched_products': unmatched,
+    }
@@ -0,0 +1,35 @@
+# backend/api/pagination.py
+"""
+Paginación por cursor (keyset) para los listados.
+
+La paginación es opt-in para no romper a los clientes que esperan la lista
+completa: solo se activa si el request trae `?page_size=` o `?cursor=`. Las
+pantallas de historial del frontend la usan con getAllPages (services/api.js).
+La respuesta es {"next", "previous", "results"}.
+
+Es la CursorPagination de DRF: el cursor guarda el valor del PRIMER campo del
+orden (la fecha) y un offset para las filas que empatan en ese valor. Cada
+página se obtiene con `WHERE fecha < posición ORDER BY fecha, id LIMIT n
+OFFSET empates`, que usa los índices compuestos (fecha, id) de cada tabla; el
+id solo desempata el orden. El costo de una página no crece con el historial
+mientras no haya muchas filas con la misma fecha exacta.
+
+Cada viewset define su orden en `cursor_ordering`; sin él se ordena por -id.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'cursor_ordering', self.ordering))
@@ -0,0 +1,186 @@
+# backend/api/report_jobs.py
+"""
+Exportaciones PDF asíncronas.
+
+`POST /api/reports/` solo registra un ReportJob; el PDF lo genera el worker
+(`python manage.py run_report_worker`), que usa la tabla api_reportjob como
+cola. Así los workers HTTP quedan libres para las cajas mientras se exportan
+reportes grandes.
+
+Cada trabajo tiene una `cache_key` = sha256(query_type, filters, versión de
+los datos). Si ya existe un PDF generado para la misma clave dentro de
+REPORT_CACHE_TTL, se reutiliza el archivo en disco sin volver a generarlo.
+La versión recorre tablas enteras, así que la calcula el worker al tomar el
+trabajo y no el request que lo encola.
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q, Count, Max
+from django.utils import timezone
+
+from .models import (
+    Product, Sale, SaleItem, CashMovement, Purchase, Order, Supplier, Role, ReportJob,
+)
+from .reports import check_report_request
+
+# Intentos antes de marcar como fallido un trabajo cuyo worker murió a mitad de camino
+REPORT_JOB_MAX_ATTEMPTS = 3
+
+
+def _table_version(model, marker):
+    """
+    Versión de una tabla: cantidad y último id (altas y bajas) más el máximo de
+    su marca de cambio. `updated_at` se renueva en cada save(); en Product y
+    Order `change_seq` lo avanza api/sync.py también en los update() masivos
+    (stock) y en los cambios de sus items.
+    """
+    return model.objects.aggregate(count=Count('id'), last_id=Max('id'), changed=Max(marker))
+
+
+def data_version(query_type):
+    """
+    Huella barata (una consulta agregada por tabla) de las tablas que alimentan
+    un reporte, incluidas las que aporta por join (nombres de producto, usuario
+    o rol): cambia con cualquier alta, baja o modificación de esas filas.
+    """
+    User = get_user_model()
+    if query_type in ('stock', 'inventario'):
+        tables = [(Product, 'change_seq')]
+    elif query_type == 'ventas':
+        tables = [(Sale, 'updated_at'), (SaleItem, 'updated_at'), (Product, 'change_seq'), (User, 'updated_at')]
+    elif query_type == 'movimientos_caja':
+        tables = [(CashMovement, 'updated_at'), (User, 'updated_at')]
+    elif query_type == 'compras':
+        # Filtra por usuario y clasifica los items por categoría del producto
+        tables = [(Purchase, 'updated_at'), (User, 'updated_at'), (Product, 'change_seq')]
+    elif query_type == 'pedidos':
+        tables = [(Order, 'change_seq')]
+    elif query_type in ('proveedores', 'suppliers'):
+        tables = [(Supplier, 'updated_at')]
+    else:
+        tables = [(User, 'updated_at'), (Role, 'updated_at')]
+    parts = [_table_version(model, marker) for model, marker in tables]
+    return json.dumps(parts, sort_keys=True, default=str)
+
+
+def report_cache_key(query_type, filters):
+    payload = json.dumps(
+        {'query_type': query_type, 'filters': filters or {}, 'version': data_version(query_type)},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _report_path(cache_key):
+    return os.path.join(str(settings.REPORT_FILES_ROOT), f'{cache_key}.pdf')
+
+
+def _cached_file(cache_key):
+    """Devuelve la ruta de un PDF vigente para `cache_key`, o None."""
+    since = timezone.now() - timedelta(seconds=settings.REPORT_CACHE_TTL)
+    path = (
+        ReportJob.objects.filter(cache_key=cache_key, status='done', finished_at__gte=since)
+        .exclude(file_path='')
+        .order_by('-finished_at')
+        .values_list('file_path', flat=True)
+        .first()
+    )
+    if path and os.path.exists(path):
+        return path
+    return None
+
+
+def enqueue_report(user, query_type, filters):
+    """
+    Registra un pedido de exportación con una sola inserción. La `cache_key` la
+    completa el worker (ver run_job).
+    """
+    filters = filters if isinstance(filters, dict) else {}
+    check_report_request(query_type, filters)
+    return ReportJob.objects.create(user=user, query_type=query_type, filters=filters)
+
+
+def claim_next_job():
+    """
+    Toma el próximo trabajo pendiente (o uno 'running' abandonado) y lo marca
+    como 'running'. SKIP LOCKED permite que varios workers consuman la cola
+    sin bloquearse entre sí. Devuelve None si no hay trabajo.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    with transaction.atomic():
+        while True:
+            job = (
+                ReportJob.objects.select_for_update(skip_locked=True)
+                .filter(Q(status='pending') | Q(status='running', started_at__lt=stale))
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            if job.attempts < REPORT_JOB_MAX_ATTEMPTS:
+                break
+            job.status = 'failed'
+            job.error = 'Se superó la cantidad máxima de intentos'
+            job.finished_at = now
+            job.save(update_fields=['status', 'error', 'finished_at'])
+
+        job.status = 'running'
+        job.started_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+    return job
+
+
+def run_job(job):
+    """Genera (o reutiliza) el PDF de `job` y actualiza su estado."""
+    from .views import ExportDataView
+
+    try:
+        job.cache_key = report_cache_key(job.query_type, job.filters)
+        ReportJob.objects.filter(pk=job.pk).update(cache_key=job.cache_key)
+        path = _cached_file(job.cache_key)
+        cached = path is not None
+        if not cached:
+            pdf = ExportDataView().render_pdf(job.query_type, job.filters)
+            path = _report_path(job.cache_key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Escribir a un temporal y renombrar: nunca se sirve un PDF a medio escribir
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as fh:
+                fh.write(pdf)
+            os.replace(tmp_path, path)
+    except Exception as e:
+        ReportJob.objects.filter(pk=job.pk).update(status='failed', error=str(e), finished_at=timezone.now())
+        return False
+
+    ReportJob.objects.filter(pk=job.pk).update(
+        status='done', file_path=path, cached=cached, error='', finished_at=timezone.now(),
+    )
+    return True
+
+
+def purge_report_files(max_age=None):
+    """Elimina del disco los PDFs más viejos que `max_age` segundos (por defecto 24 × REPORT_CACHE_TTL)."""
+    max_age = max_age if max_age is not None else settings.REPORT_CACHE_TTL * 24
+    root = str(settings.REPORT_FILES_ROOT)
+    if not os.path.isdir(root):
+        return 0
+    limit = time.time() - max_age
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < limit:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
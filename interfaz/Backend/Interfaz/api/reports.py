@@ -0,0 +1,749 @@
+# backend/api/reports.py
+"""
+Motor de reportes del lado del servidor para ExportDataView.
+
+Construye las filas y el resumen de cada tipo de reporte directamente desde la
+base de datos con querysets `values()` anotados, a partir de `query_type` y de
+los filtros recibidos, en lugar de depender de los datos enviados por el
+navegador. Las filas usan las mismas claves que esperan los generadores de
+tablas PDF (`_generate_*_table`).
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import (
+    Case, When, Value, F, Q, Sum, Count, CharField, DecimalField, ExpressionWrapper,
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .authentication import role_name
+from .models import Product, CashMovement, Sale, SaleItem, Purchase, Order, OrderItem, Supplier
+
+User = get_user_model()
+
+REPORT_TITLES = {
+    'stock': 'Estado del Stock',
+    'inventario': 'Estado del Stock',
+    'ventas': 'Reporte de Ventas',
+    'movimientos_caja': 'Reporte de Movimientos de Caja',
+    'compras': 'Reporte de Compras',
+    'pedidos': 'Reporte de Pedidos',
+    'proveedores': 'Información de Proveedores',
+    'suppliers': 'Información de Proveedores',
+    'usuarios': 'Usuarios',
+    'users': 'Usuarios',
+}
+
+
+# Roles que pueden exportar cada tipo de reporte, los mismos que permiten ver
+# esos datos en sus pantallas (UserViewSet, PurchaseViewSet, auditoría y
+# pérdidas). Los tipos que no figuran los puede exportar cualquier usuario autenticado.
+REPORT_ROLES = {
+    'usuarios': ('Gerente',),
+    'users': ('Gerente',),
+    'compras': ('Gerente',),
+    'auditoria_inventario': ('Gerente', 'Encargado'),
+    'perdidas': ('Gerente', 'Encargado'),
+}
+
+
+# Operadores de los filtros de DataConsultation.js -> lookup del ORM
+OPERATORS = {
+    'equals': 'exact', 'contains': 'icontains',
+    'gt': 'gt', 'gte': 'gte', 'lt': 'lt', 'lte': 'lte',
+    'greater': 'gt', 'greaterOrEqual': 'gte', 'less': 'lt', 'lessOrEqual': 'lte',
+}
+DATE_PARTS = ('year', 'month', 'day', 'hour', 'minute')
+
+
+class ReportFilterError(ValueError):
+    """Filtros inválidos para un reporte."""
+
+
+class ReportPermissionError(PermissionError):
+    """El rol del usuario no puede exportar ese tipo de reporte."""
+
+
+def check_report_access(user, query_type):
+    """Lanza ReportPermissionError si `user` no puede exportar `query_type`."""
+    allowed = REPORT_ROLES.get(query_type)
+    if allowed is not None and role_name(user) not in allowed:
+        raise ReportPermissionError('No tiene permisos para exportar este reporte')
+
+
+def format_datetime(value):
+    # Mismo formato que el frontend envía (ISO sin microsegundos, en hora local)
+    if not value:
+        return ''
+    return timezone.localtime(value).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def parse_report_filters(filters):
+    filters = filters if isinstance(filters, dict) else {}
+    parsed = {}
+
+    for key in ('start_date', 'end_date'):
+        raw = filters.get(key)
+        if raw:
+            try:
+                parsed[key] = parse_date(str(raw)[:10])
+            except ValueError:
+                parsed[key] = None
+            if parsed[key] is None:
+                raise ReportFilterError(f'{key} inválido, use el formato YYYY-MM-DD')
+
+    ids = filters.get('ids')
+    if ids is not None:
+        if not isinstance(ids, (list, tuple)):
+            raise ReportFilterError('ids debe ser una lista')
+        try:
+            parsed['ids'] = sorted({int(i) for i in ids if i is not None and i != ''})
+        except (TypeError, ValueError):
+            raise ReportFilterError('ids debe contener solo números')
+
+    for key in ('product', 'user', 'type', 'payment_method', 'status', 'category', 'name'):
+        value = filters.get(key)
+        if value not in (None, '', []):
+            parsed[key] = value
+
+    for key in ('date_from', 'date_to'):
+        parts = filters.get(key)
+        if parts:
+            parsed[key] = _parse_date_parts(key, parts)
+
+    conditions = filters.get('conditions')
+    if conditions:
+        parsed['conditions'] = _parse_conditions(conditions)
+
+    if filters.get('order') in ('asc', 'desc'):
+        parsed['order'] = filters['order']
+    if filters.get('period'):
+        parsed['period'] = str(filters['period'])
+    return parsed
+
+
+def _parse_date_parts(key, parts):
+    if not isinstance(parts, dict):
+        raise ReportFilterError(f'{key} debe ser un objeto con year/month/day/hour/minute')
+    parsed = {}
+    for part in DATE_PARTS:
+        value = parts.get(part)
+        if value in (None, ''):
+            continue
+        try:
+            parsed[part] = int(value)
+        except (TypeError, ValueError):
+            raise ReportFilterError(f'{key}.{part} debe ser un número')
+    return parsed
+
+
+def _parse_conditions(conditions):
+    if not isinstance(conditions, list):
+        raise ReportFilterError('conditions debe ser una lista')
+    parsed = []
+    for condition in conditions:
+        if not isinstance(condition, dict) or not condition.get('field'):
+            raise ReportFilterError(f'Condición inválida: {condition}')
+        op = condition.get('op') or 'equals'
+        if op not in OPERATORS:
+            raise ReportFilterError(f'Operador no soportado: {op}')
+        value = condition.get('value')
+        if value in (None, '', []):
+            continue
+        parsed.append({
+            'field': str(condition['field']), 'op': OPERATORS[op], 'value': value, 'unit': condition.get('unit'),
+        })
+    return parsed
+
+
+def date_range_q(field, filters):
+    """Q para filtrar `field` (DateTimeField) por start_date/end_date en días locales inclusive."""
+    tz = timezone.get_current_timezone()
+    q = Q()
+    if filters.get('start_date'):
+        q &= Q(**{f'{field}__gte': timezone.make_aware(datetime.combine(filters['start_date'], time.min), tz)})
+    if filters.get('end_date'):
+        until = filters['end_date'] + timedelta(days=1)
+        q &= Q(**{f'{field}__lt': timezone.make_aware(datetime.combine(until, time.min), tz)})
+    return q
+
+
+def _part_bounds(parts):
+    """(inicio, fin exclusivo) del período que describe `parts` si empieza por el año; si no, None."""
+    present = [part for part in DATE_PARTS if part in parts]
+    if not present or present != list(DATE_PARTS[:len(present)]):
+        return None
+    try:
+        start = datetime(parts['year'], parts.get('month', 1), parts.get('day', 1),
+                         parts.get('hour', 0), parts.get('minute', 0))
+    except ValueError:
+        raise ReportFilterError('Fecha inválida en el filtro por fechas')
+    last = present[-1]
+    if last == 'year':
+        end = start.replace(year=start.year + 1)
+    elif last == 'month':
+        end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    else:
+        end = start + {'day': timedelta(days=1), 'hour': timedelta(hours=1), 'minute': timedelta(minutes=1)}[last]
+    tz = timezone.get_current_timezone()
+    return timezone.make_aware(start, tz), timezone.make_aware(end, tz)
+
+
+def date_parts_q(field, filters):
+    """
+    Q para el filtro por fechas de la pantalla de consultas (año/mes/día/hora/minuto
+    "desde" y "hasta"). Solo "desde": cada parte indicada debe coincidir. Con
+    "hasta": rango desde el inicio de "desde" hasta el final de "hasta"; si a un
+    extremo le falta el año se compara cada parte por separado.
+    """
+    date_from, date_to = filters.get('date_from') or {}, filters.get('date_to') or {}
+    if not date_to:
+        return Q(**{f'{field}__{part}': value for part, value in date_from.items()})
+    q = Q()
+    for parts, lookup, bound in ((date_from, 'gte', 0), (date_to, 'lt', 1)):
+        if not parts:
+            continue
+        bounds = _part_bounds(parts)
+        if bounds is not None:
+            q &= Q(**{f'{field}__{lookup}': bounds[bound]})
+        else:
+            edge = 'gte' if bound == 0 else 'lte'
+            q &= Q(**{f'{field}__{part}__{edge}': value for part, value in parts.items()})
+    return q
+
+
+def _condition_value(condition, kind):
+    value = condition['value']
+    if kind == 'number':
+        try:
+            return Decimal(str(value))
+        except ArithmeticError:
+            raise ReportFilterError(f"Valor numérico inválido para {condition['field']}: {value}")
+    return str(value)
+
+
+def _condition_lookup(op, kind):
+    if kind == 'text':
+        return 'iexact' if op == 'exact' else op
+    return 'exact' if op == 'icontains' else op
+
+
+def conditions_q(filters, fields, skip=()):
+    """
+    Q con las condiciones {field, op, value} de la pantalla de consultas.
+    `fields` es {campo: (ruta ORM, 'text' | 'number')}; los campos de `skip` los
+    resuelve el reporte por su cuenta y cualquier otro campo se rechaza.
+    """
+    q = Q()
+    for condition in filters.get('conditions', ()):
+        field = condition['field']
+        if field in skip:
+            continue
+        if field not in fields:
+            raise ReportFilterError(f'Filtro no soportado para este reporte: {field}')
+        path, kind = fields[field]
+        q &= Q(**{f'{path}__{_condition_lookup(condition["op"], kind)}': _condition_value(condition, kind)})
+    return q
+
+
+def matches_condition(value, condition, kind='text'):
+    """Evalúa una condición en Python para datos que no se pueden filtrar en la base (JSON, listas)."""
+    op = condition['op']
+    target = _condition_value(condition, kind)
+    if kind == 'text':
+        value, target = str(value or '').lower(), target.lower()
+        return target in value if op == 'icontains' else value == target
+    try:
+        value = Decimal(str(value or 0))
+    except ArithmeticError:
+        return False
+    return {
+        'exact': value == target, 'icontains': value == target,
+        'gt': value > target, 'gte': value >= target, 'lt': value < target, 'lte': value <= target,
+    }[op]
+
+
+def conditions_for(filters, field):
+    return [c for c in filters.get('conditions', ()) if c['field'] == field]
+
+
+def _period_label(filters):
+    if filters.get('period'):
+        return filters['period']
+    start, end = filters.get('start_date'), filters.get('end_date')
+    if start and end:
+        return f"{start.strftime('%d/%m/%Y')} - {end.strftime('%d/%m/%Y')}"
+    if start:
+        return f"Desde {start.strftime('%d/%m/%Y')}"
+    if end:
+        return f"Hasta {end.strftime('%d/%m/%Y')}"
+    return 'Todos los períodos'
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if v not in (None, '')]
+    return [value]
+
+
+def _format_stock_with_unit(stock, unit):
+    # Igual que formatStockWithUnit en DataConsultation.js
+    stock = Decimal(str(stock or 0))
+    if not unit or unit in ('u', 'unidades', 'Unidades'):
+        return f"{stock.normalize():f}U"
+    if unit in ('g', 'gramos'):
+        return f"{(stock / 1000).quantize(Decimal('0.001')).normalize():f}Kg"
+    if unit in ('ml', 'mililitros'):
+        return f"{(stock / 1000).quantize(Decimal('0.001')).normalize():f}L"
+    return f"{stock.normalize():f}{unit}"
+
+
+_STOCK_FIELDS = {'id': ('id', 'number'), 'name': ('name', 'text'), 'price': ('price', 'number')}
+# Unidad elegida en el filtro de cantidad -> (unidades de stock, factor a la unidad de stock)
+_STOCK_QUANTITY_UNITS = {'kg': (('g',), 1000), 'l': (('ml',), 1000), 'u': (('u', 'unidades', ''), 1)}
+
+
+def _stock_quantity_q(condition):
+    # Como en la pantalla: solo se comparan productos cuya unidad corresponde a la del filtro
+    units, factor = _STOCK_QUANTITY_UNITS.get(str(condition.get('unit') or 'u').lower(), _STOCK_QUANTITY_UNITS['u'])
+    target = _condition_value(condition, 'number') * factor
+    return Q(unit__in=units) & Q(**{f"stock__{_condition_lookup(condition['op'], 'number')}": target})
+
+
+def _stock_report(filters):
+    qs = Product.objects.filter(is_active=True)
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('name'):
+        qs = qs.filter(name__icontains=filters['name'])
+    if filters.get('category') or filters.get('type'):
+        qs = qs.filter(category__iexact=filters.get('category') or filters.get('type'))
+
+    qs = qs.annotate(
+        status=Case(
+            When(stock__lt=F('low_stock_threshold'), then=Value('Stock Bajo')),
+            When(stock__lt=F('low_stock_threshold') * 2, then=Value('Stock Medio')),
+            default=Value('Stock Alto'),
+            output_field=CharField(),
+        )
+    )
+    if filters.get('status'):
+        qs = qs.filter(status__in=_as_list(filters['status']))
+    qs = qs.filter(conditions_q(filters, _STOCK_FIELDS, skip=('quantity',)))
+    for condition in conditions_for(filters, 'quantity'):
+        qs = qs.filter(_stock_quantity_q(condition))
+
+    counts = qs.aggregate(
+        total_products=Count('id', filter=Q(category__iexact='Producto')),
+        total_insumos=Count('id', filter=Q(category__iexact='Insumo')),
+        low_stock_items=Count('id', filter=Q(stock__lt=F('low_stock_threshold'))),
+    )
+
+    # Totales de stock por categoría y unidad (misma presentación que la interfaz)
+    totals = {'producto': {'Kg': Decimal('0'), 'L': Decimal('0'), 'U': Decimal('0')},
+              'insumo': {'Kg': Decimal('0'), 'L': Decimal('0'), 'U': Decimal('0')}}
+    for row in qs.values('category', 'unit').annotate(total=Sum('stock')).order_by():
+        bucket = totals.get((row['category'] or '').lower())
+        if bucket is None:
+            continue
+        total = row['total'] or Decimal('0')
+        if row['unit'] == 'g':
+            bucket['Kg'] += total / 1000
+        elif row['unit'] == 'ml':
+            bucket['L'] += total / 1000
+        else:
+            bucket['U'] += total
+
+    def _fmt(bucket):
+        parts = [f"{value:.2f}{symbol}" for symbol, value in bucket.items() if value]
+        return ' + '.join(parts) if parts else '0'
+
+    rows = [
+        {
+            'id': p['id'],
+            'name': p['name'],
+            'stock': _format_stock_with_unit(p['stock'], p['unit']),
+            'type': p['category'],
+            'price': p['price'],
+            'status': p['status'],
+        }
+        for p in qs.order_by('id').values('id', 'name', 'stock', 'unit', 'category', 'price', 'status')
+    ]
+    summary = {
+        'totalProducts': counts['total_products'],
+        'totalInsumos': counts['total_insumos'],
+        'lowStockItems': counts['low_stock_items'],
+        'totalStock': f"Productos: {_fmt(totals['producto'])} | Insumos: {_fmt(totals['insumo'])}",
+    }
+    return rows, summary
+
+
+_SALE_ITEM_FIELDS = {
+    'id': ('sale_id', 'number'),
+    'product': ('product__name', 'text'),
+    'user': ('sale__user__username', 'text'),
+    'quantity': ('quantity', 'number'),
+    'total': ('line_total', 'number'),
+}
+# Ventas sin items: una fila con el total de la venta, cantidad 1
+_SALE_FALLBACK_FIELDS = {
+    'id': ('id', 'number'),
+    'product': ('row_product', 'text'),
+    'user': ('user__username', 'text'),
+    'quantity': ('row_quantity', 'number'),
+    'total': ('total_amount', 'number'),
+}
+_SALE_FALLBACK_PRODUCT = 'Venta (sin items detallados)'
+
+
+def _sales_report(filters):
+    sales = Sale.objects.filter(date_range_q('timestamp', filters) & date_parts_q('timestamp', filters))
+    if 'ids' in filters:
+        sales = sales.filter(id__in=filters['ids'])
+    if filters.get('user'):
+        sales = sales.filter(user__username__icontains=filters['user'])
+    if filters.get('payment_method'):
+        sales = sales.filter(payment_method__icontains=filters['payment_method'])
+
+    items = SaleItem.objects.filter(sale__in=sales)
+    if filters.get('product'):
+        items = items.filter(product__name__icontains=filters['product'])
+    items = items.annotate(
+        line_total=ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    ).filter(conditions_q(filters, _SALE_ITEM_FIELDS))
+
+    rows = [
+        {
+            'id': it['sale_id'],
+            'date': format_datetime(it['sale__timestamp']),
+            'product': it['product__name'],
+            'quantity': it['quantity'],
+            'total': it['line_total'],
+            'user': it['sale__user__username'] or 'Sistema',
+        }
+        for it in items.order_by('sale__timestamp', 'sale_id', 'id').values(
+            'sale_id', 'sale__timestamp', 'product__name', 'quantity', 'line_total', 'sale__user__username'
+        )
+    ]
+
+    # Ventas sin items detallados: una fila con el total de la venta (igual que el frontend)
+    if not filters.get('product'):
+        fallback = sales.filter(saleitem__isnull=True).annotate(
+            row_product=Value(_SALE_FALLBACK_PRODUCT, output_field=CharField()),
+            row_quantity=Value(1),
+        ).filter(conditions_q(filters, _SALE_FALLBACK_FIELDS))
+        for s in fallback.order_by('timestamp', 'id').values('id', 'timestamp', 'total_amount', 'user__username'):
+            rows.append({
+                'id': s['id'],
+                'date': format_datetime(s['timestamp']),
+                'product': _SALE_FALLBACK_PRODUCT,
+                'quantity': 1,
+                'total': s['total_amount'],
+                'user': s['user__username'] or 'Sistema',
+            })
+
+    summary = {
+        'totalSales': len(rows),
+        'totalRevenue': sum((r['total'] or Decimal('0')) for r in rows),
+        'period': _period_label(filters),
+    }
+    return rows, summary
+
+
+_CASH_FIELDS = {
+    'id': ('id', 'number'),
+    'amount': ('amount', 'number'),
+    'description': ('description', 'text'),
+    'user': ('user__username', 'text'),
+}
+
+
+def _any_contains_q(paths, values):
+    # Selección múltiple de la pantalla: alcanza con que alguno de los valores aparezca en alguno de los campos
+    q = Q()
+    for value in _as_list(values):
+        for path in paths:
+            q |= Q(**{f'{path}__icontains': value})
+    return q
+
+
+def _cash_movements_report(filters):
+    qs = CashMovement.objects.filter(date_range_q('timestamp', filters) & date_parts_q('timestamp', filters))
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('type'):
+        qs = qs.filter(type__in=_as_list(filters['type']))
+    if filters.get('payment_method'):
+        qs = qs.filter(_any_contains_q(('payment_method', 'description'), filters['payment_method']))
+    if filters.get('user'):
+        qs = qs.filter(user__username__icontains=filters['user'])
+    qs = qs.filter(conditions_q(filters, _CASH_FIELDS))
+    ordering = ('-timestamp', '-id') if filters.get('order') == 'desc' else ('timestamp', 'id')
+
+    totals = qs.aggregate(
+        total_movements=Count('id'),
+        total_income=Sum('amount', filter=Q(type='Entrada')),
+        total_expenses=Sum('amount', filter=Q(type='Salida')),
+    )
+    rows = [
+        {
+            'id': m['id'],
+            'date': format_datetime(m['timestamp']),
+            'type': m['type'],
+            'amount': m['amount'],
+            'description': m['description'] or '',
+            'user': m['user__username'] or '',
+            'payment_method': m['payment_method'],
+        }
+        for m in qs.order_by(*ordering).values(
+            'id', 'timestamp', 'type', 'amount', 'description', 'payment_method', 'user__username'
+        )
+    ]
+    summary = {
+        'totalMovements': totals['total_movements'],
+        'totalIncome': f"{totals['total_income'] or Decimal('0'):.2f}",
+        'totalExpenses': f"{totals['total_expenses'] or Decimal('0'):.2f}",
+        'period': _period_label(filters),
+    }
+    return rows, summary
+
+
+_PURCHASE_FIELDS = {
+    'id': ('id', 'number'),
+    'supplier': ('supplier', 'text'),
+    'total': ('total_amount', 'number'),
+}
+# Condiciones sobre los items (JSON): se evalúan en Python sobre las filas armadas
+_PURCHASE_ITEM_FIELDS = {'product': ('productName', 'text'), 'quantity': ('quantity', 'number')}
+
+
+def _purchases_report(filters):
+    qs = Purchase.objects.filter(
+        Q(is_active=True) & date_range_q('created_at', filters) & date_parts_q('created_at', filters)
+    )
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('status'):
+        qs = qs.filter(status__in=_as_list(filters['status']))
+    if filters.get('user'):
+        qs = qs.filter(user__username__icontains=filters['user'])
+    qs = qs.filter(conditions_q(filters, _PURCHASE_FIELDS, skip=_PURCHASE_ITEM_FIELDS))
+
+    purchases = list(qs.order_by('created_at', 'id').values('id', 'created_at', 'supplier', 'items', 'total_amount'))
+
+    # Categoría de cada item por nombre de producto, resuelta en una sola consulta
+    names = {
+        str(it.get('productName') or it.get('product_name') or it.get('name') or '').strip().lower()
+        for p in purchases if isinstance(p['items'], list)
+        for it in p['items'] if isinstance(it, dict)
+    }
+    names.discard('')
+    categories = {}
+    if names:
+        q = Q()
+        for name in names:
+            q |= Q(name__iexact=name)
+        for name, category in Product.objects.filter(q).values_list('name', 'category'):
+            categories.setdefault(name.lower(), category)
+
+    rows = []
+    total_amount = Decimal('0')
+    for p in purchases:
+        items = []
+        detected = set()
+        for it in (p['items'] if isinstance(p['items'], list) else []):
+            if not isinstance(it, dict):
+                continue
+            product_name = it.get('productName') or it.get('product_name') or it.get('product') or it.get('name') or ''
+            category = it.get('category') or it.get('type') or categories.get(str(product_name).strip().lower(), '')
+            if category:
+                detected.add(str(category).lower())
+            items.append({
+                'productName': product_name,
+                'quantity': it.get('quantity') or it.get('qty') or 0,
+                'unitPrice': it.get('unitPrice') or it.get('unit_price') or it.get('price') or 0,
+                'category': category,
+            })
+        if len(detected) > 1:
+            purchase_type = 'Mixto'
+        elif detected and 'insumo' in next(iter(detected)):
+            purchase_type = 'Insumo'
+        else:
+            purchase_type = 'Producto'
+        if filters.get('type') and purchase_type not in _as_list(filters['type']):
+            continue
+        if not all(
+            any(matches_condition(it[key], condition, kind) for it in items)
+            for field, (key, kind) in _PURCHASE_ITEM_FIELDS.items()
+            for condition in conditions_for(filters, field)
+        ):
+            continue
+
+        total = p['total_amount'] or Decimal('0')
+        total_amount += total
+        rows.append({
+            'id': p['id'],
+            'date': format_datetime(p['created_at']),
+            'supplier': p['supplier'] or '',
+            'items': items,
+            'total': total,
+            'type': purchase_type,
+        })
+
+    summary = {
+        'totalPurchases': len(rows),
+        'totalAmount': total_amount,
+        'period': _period_label(filters),
+    }
+    return rows, summary
+
+
+_ORDER_FIELDS = {'id': ('id', 'number'), 'customer': ('customer_name', 'text')}
+_ORDER_ITEM_FIELDS = {'product': ('product_name', 'text'), 'units': ('quantity', 'number')}
+
+
+def _orders_report(filters):
+    qs = Order.objects.filter(
+        date_range_q('fecha_de_orden_del_pedido', filters) & date_parts_q('fecha_de_orden_del_pedido', filters)
+    )
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('status'):
+        qs = qs.filter(status__in=_as_list(filters['status']))
+    if filters.get('payment_method'):
+        qs = qs.filter(_any_contains_q(('payment_method',), filters['payment_method']))
+    qs = qs.filter(conditions_q(filters, _ORDER_FIELDS, skip=_ORDER_ITEM_FIELDS))
+    # Con filtros de producto/unidades quedan los pedidos con algún item que cumple y solo esos items
+    item_q = conditions_q(filters, _ORDER_ITEM_FIELDS, skip=_ORDER_FIELDS)
+    if item_q:
+        qs = qs.filter(id__in=OrderItem.objects.filter(item_q).values('order_id'))
+
+    counts = qs.aggregate(
+        total_orders=Count('id'),
+        pending_orders=Count('id', filter=Q(status='Pendiente')),
+        sent_orders=Count('id', filter=Q(status__in=['Enviado', 'Entregado'])),
+    )
+
+    orders = list(qs.order_by('fecha_de_orden_del_pedido', 'id').values(
+        'id', 'fecha_de_orden_del_pedido', 'customer_name', 'payment_method', 'status'
+    ))
+    items_by_order = {}
+    if orders:
+        for it in OrderItem.objects.filter(item_q, order_id__in=[o['id'] for o in orders]).order_by('id').values(
+            'order_id', 'product_name', 'quantity'
+        ):
+            items_by_order.setdefault(it['order_id'], []).append(
+                {'product_name': it['product_name'], 'quantity': it['quantity']}
+            )
+
+    rows = [
+        {
+            'id': o['id'],
+            'date': format_datetime(o['fecha_de_orden_del_pedido']),
+            'cliente': o['customer_name'],
+            'metodoPago': o['payment_method'] or '',
+            'status': o['status'],
+            'items': items_by_order.get(o['id'], []),
+        }
+        for o in orders
+    ]
+    summary = {
+        'totalOrders': counts['total_orders'],
+        'pendingOrders': counts['pending_orders'],
+        'sentOrders': counts['sent_orders'],
+        'period': _period_label(filters),
+    }
+    return rows, summary
+
+
+_SUPPLIER_FIELDS = {
+    'id': ('id', 'number'),
+    'name': ('name', 'text'),
+    'cuit': ('cuit', 'text'),
+    'phone': ('phone', 'text'),
+    'address': ('address', 'text'),
+}
+
+
+def _suppliers_report(filters):
+    qs = Supplier.objects.all()
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    if filters.get('name'):
+        qs = qs.filter(name__icontains=filters['name'])
+    qs = qs.filter(conditions_q(filters, _SUPPLIER_FIELDS, skip=('products',)))
+    # `products` es una lista separada por comas: la condición se evalúa sobre cada nombre
+    for condition in conditions_for(filters, 'products'):
+        qs = qs.filter(id__in=[
+            sid for sid, products in qs.values_list('id', 'products')
+            if any(matches_condition(name.strip(), condition) for name in (products or '').split(','))
+        ])
+
+    counts = qs.aggregate(total=Count('id'), active=Count('id', filter=Q(is_active=True)))
+    rows = [
+        {
+            'id': s['id'],
+            'name': s['name'],
+            'cuit': s['cuit'] or '',
+            'phone': s['phone'] or '',
+            'address': s['address'] or '',
+            'products': s['products'] or '',
+        }
+        for s in qs.filter(is_active=True).order_by('id').values('id', 'name', 'cuit', 'phone', 'address', 'products')
+    ]
+    summary = {'totalSuppliers': counts['total'], 'activeSuppliers': counts['active']}
+    return rows, summary
+
+
+def _users_report(filters):
+    qs = User.objects.filter(is_active=True)
+    if 'ids' in filters:
+        qs = qs.filter(id__in=filters['ids'])
+    rows = [
+        {'username': u['username'], 'email': u['email'], 'role': u['role__name'] or ''}
+        for u in qs.order_by('id').values('username', 'email', 'role__name')
+    ]
+    return rows, {}
+
+
+REPORT_BUILDERS = {
+    'stock': _stock_report,
+    'inventario': _stock_report,
+    'ventas': _sales_report,
+    'movimientos_caja': _cash_movements_report,
+    'compras': _purchases_report,
+    'pedidos': _orders_report,
+    'proveedores': _suppliers_report,
+    'suppliers': _suppliers_report,
+    'usuarios': _users_report,
+    'users': _users_report,
+}
+
+
+def check_report_request(query_type, filters=None):
+    """Valida el tipo y los filtros sin consultar la base; lanza ReportFilterError."""
+    if query_type not in REPORT_BUILDERS:
+        raise ReportFilterError(f'Tipo de reporte no soportado: {query_type}')
+    parse_report_filters(filters)
+
+
+def build_report(query_type, filters=None):
+    """
+    Devuelve {'title', 'rows', 'summary'} para `query_type` aplicando `filters`:
+      - start_date / end_date: 'YYYY-MM-DD' (días locales, inclusive)
+      - ids: lista de ids a incluir (p.ej. el resultado ya filtrado en pantalla)
+      - product, user, type, payment_method, status, category, name: filtros simples
+      - date_from / date_to: {year, month, day, hour, minute} del filtro granular por fechas
+      - conditions: [{field, op, value[, unit]}] con los operadores de la pantalla
+        (equals, contains, gt, gte, lt, lte y sus alias greater/less...)
+      - order: 'asc' | 'desc' (movimientos de caja)
+      - period: texto a mostrar como período en el resumen
+    Lanza ReportFilterError si el tipo o los filtros no son válidos.
+    """
+    builder = REPORT_BUILDERS.get(query_type)
+    if builder is None:
+        raise ReportFilterError(f'Tipo de reporte no soportado: {query_type}')
+    rows, summary = builder(parse_report_filters(filters))
+    return {'title': REPORT_TITLES[query_type], 'rows': rows, 'summary': summary}
@@ -0,0 +1,238 @@
+# backend/api/rollups.py
+"""
+Tablas de resumen diarias de ventas.
+
+Las filas se actualizan de forma incremental dentro de la misma transacción
+que registra, modifica o elimina cada venta, de modo que los reportes puedan
+responder en O(días) en lugar de recorrer todas las ventas.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Sale, SaleItem, SalesDailyRollup, SalesProductDailyRollup, SalesPaymentMethodDailyRollup
+
+SUMMARY_GROUPS = ('day', 'month', 'product', 'payment_method')
+
+
+def _apply_increments(model, date, key_field, increments):
+    """
+    Suma `increments` ({clave: {campo: delta}}) a las filas de `model` para `date`
+    con un único INSERT ... ON CONFLICT DO UPDATE SET campo = campo + EXCLUDED.campo.
+    No hace falta leer ni bloquear las filas antes: la base suma sobre el valor
+    vigente, y las claves van ordenadas para que dos ventas tomen los bloqueos de
+    fila en el mismo orden. Si `key_field` es None la tabla tiene una fila por día.
+    """
+    from django.db import connection
+
+    opts = model._meta
+    quote = connection.ops.quote_name
+    fields = sorted({field for deltas in increments.values() for field in deltas})
+    key_columns = ['date'] + ([opts.get_field(key_field).column] if key_field else [])
+    columns = key_columns + [opts.get_field(f).column for f in fields] + ['updated_at']
+
+    now = timezone.now()
+    params = []
+    for key in sorted(increments, key=lambda k: (k is None, k)):
+        deltas = increments[key]
+        values = [(opts.get_field('date'), date)]
+        if key_field:
+            values.append((opts.get_field(key_field), key))
+        values += [(opts.get_field(f), deltas.get(f, 0)) for f in fields]
+        values.append((opts.get_field('updated_at'), now))
+        params.append([field.get_db_prep_save(value, connection) for field, value in values])
+
+    table = quote(opts.db_table)
+    row = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    sql = 'INSERT INTO {table} ({columns}) VALUES {rows} ON CONFLICT ({keys}) DO UPDATE SET {updates}'.format(
+        table=table,
+        columns=', '.join(quote(c) for c in columns),
+        rows=', '.join([row] * len(params)),
+        keys=', '.join(quote(c) for c in key_columns),
+        updates=', '.join(
+            [f'{quote(c)} = {table}.{quote(c)} + EXCLUDED.{quote(c)}' for c in columns[len(key_columns):-1]]
+            + [f'{quote("updated_at")} = EXCLUDED.{quote("updated_at")}']
+        ),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for values in params for value in values])
+
+
+def sale_lines(sale):
+    """Líneas (product_id, quantity, price) ya guardadas de una venta."""
+    return list(SaleItem.objects.filter(sale=sale).values_list('product_id', 'quantity', 'price'))
+
+
+def record_sale(sale, lines, sign=1):
+    """
+    Acumula una venta en las tablas de resumen.
+    `lines` es una lista de (product_id, quantity, price); con `sign=-1` se
+    descuenta la venta (antes de modificarla o eliminarla).
+    """
+    date = timezone.localdate(sale.timestamp) if sale.timestamp else timezone.localdate()
+    total_amount = Decimal(str(sale.total_amount or 0)) * sign
+
+    per_product = {}
+    items_count = 0
+    for product_id, quantity, price in lines:
+        quantity = int(quantity) * sign
+        revenue = Decimal(str(price or 0)) * quantity
+        entry = per_product.setdefault(product_id, {'quantity': 0, 'revenue': Decimal('0')})
+        entry['quantity'] += quantity
+        entry['revenue'] += revenue
+        items_count += quantity
+
+    # Siempre en el mismo orden de tablas (día, medio de pago, productos)
+    _apply_increments(SalesDailyRollup, date, None, {
+        None: {'sales_count': sign, 'items_count': items_count, 'total_amount': total_amount}
+    })
+    _apply_increments(SalesPaymentMethodDailyRollup, date, 'payment_method', {
+        (sale.payment_method or '')[:50]: {'sales_count': sign, 'total_amount': total_amount}
+    })
+    if per_product:
+        _apply_increments(SalesProductDailyRollup, date, 'product', per_product)
+
+
+def sales_summary(start, end, group_by='day'):
+    """
+    Resumen de ventas entre `start` y `end` (fechas inclusive) leído de las
+    tablas de resumen. Devuelve {'totals': {...}, 'rows': [...]}.
+    """
+    daily = SalesDailyRollup.objects.filter(date__gte=start, date__lte=end)
+    totals = daily.aggregate(
+        sales_count=Sum('sales_count'),
+        items_count=Sum('items_count'),
+        total_amount=Sum('total_amount'),
+    )
+    totals = {
+        'sales_count': totals['sales_count'] or 0,
+        'items_count': totals['items_count'] or 0,
+        'total_amount': totals['total_amount'] or Decimal('0'),
+    }
+
+    if group_by == 'day':
+        rows = list(daily.order_by('date').values('date', 'sales_count', 'items_count', 'total_amount'))
+    elif group_by == 'month':
+        rows = list(
+            daily.annotate(month=TruncMonth('date'))
+            .values('month')
+            .annotate(sales_count=Sum('sales_count'), items_count=Sum('items_count'), total_amount=Sum('total_amount'))
+            .order_by('month')
+        )
+    elif group_by == 'product':
+        rows = list(
+            SalesProductDailyRollup.objects.filter(date__gte=start, date__lte=end)
+            .values('product_id', 'product__name')
+            .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+            .order_by('-revenue')
+        )
+    elif group_by == 'payment_method':
+        rows = list(
+            SalesPaymentMethodDailyRollup.objects.filter(date__gte=start, date__lte=end)
+            .values('payment_method')
+            .annotate(sales_count=Sum('sales_count'), total_amount=Sum('total_amount'))
+            .order_by('-total_amount')
+        )
+    else:
+        raise ValueError(f'group_by inválido: {group_by}')
+
+    return {'totals': totals, 'rows': rows}
+
+
+def _local_day_bounds(start, end):
+    """Devuelve los datetimes (aware) que cubren los días locales [start, end]."""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def rebuild_sales_rollups(start, end, chunk_size=2000):
+    """
+    Recalcula las tablas de resumen de ventas para los días [start, end] a
+    partir de Sale/SaleItem.
+
+    Las filas crudas se recorren con `.iterator(chunk_size=...)` (cursor del
+    lado del servidor en PostgreSQL), así que la memoria solo crece con la
+    cantidad de días/productos del rango, no con la cantidad de ventas.
+    Las filas de resumen del rango se bloquean antes de leer, de modo que las
+    ventas que se registren mientras tanto se suman sobre el valor reconstruido.
+    Devuelve {'sales': n, 'items': n} con las filas procesadas.
+    """
+    since, until = _local_day_bounds(start, end)
+    tz = timezone.get_current_timezone()
+
+    daily, per_product, per_method = {}, {}, {}
+    sales_rows = items_rows = 0
+
+    with transaction.atomic():
+        list(SalesDailyRollup.objects.select_for_update().filter(date__gte=start, date__lte=end))
+
+        sales = Sale.objects.filter(timestamp__gte=since, timestamp__lt=until).values_list(
+            'timestamp', 'total_amount', 'payment_method'
+        )
+        for timestamp, total_amount, payment_method in sales.iterator(chunk_size=chunk_size):
+            date = timezone.localtime(timestamp, tz).date()
+            total_amount = total_amount or Decimal('0')
+            day = daily.setdefault(date, {'sales_count': 0, 'items_count': 0, 'total_amount': Decimal('0')})
+            day['sales_count'] += 1
+            day['total_amount'] += total_amount
+            method = per_method.setdefault((date, (payment_method or '')[:50]), {'sales_count': 0, 'total_amount': Decimal('0')})
+            method['sales_count'] += 1
+            method['total_amount'] += total_amount
+            sales_rows += 1
+
+        items = SaleItem.objects.filter(sale__timestamp__gte=since, sale__timestamp__lt=until).values_list(
+            'sale__timestamp', 'product_id', 'quantity', 'price'
+        )
+        for timestamp, product_id, quantity, price in items.iterator(chunk_size=chunk_size):
+            date = timezone.localtime(timestamp, tz).date()
+            quantity = quantity or 0
+            entry = per_product.setdefault((date, product_id), {'quantity': 0, 'revenue': Decimal('0')})
+            entry['quantity'] += quantity
+            entry['revenue'] += (price or Decimal('0')) * quantity
+            daily.setdefault(date, {'sales_count': 0, 'items_count': 0, 'total_amount': Decimal('0')})['items_count'] += quantity
+            items_rows += 1
+
+        _upsert_range(
+            SalesDailyRollup, start, end, ['date'],
+            [SalesDailyRollup(date=date, **values) for date, values in daily.items()],
+        )
+        _upsert_range(
+            SalesProductDailyRollup, start, end, ['date', 'product'],
+            [SalesProductDailyRollup(date=date, product_id=pid, **values) for (date, pid), values in per_product.items()],
+        )
+        _upsert_range(
+            SalesPaymentMethodDailyRollup, start, end, ['date', 'payment_method'],
+            [SalesPaymentMethodDailyRollup(date=date, payment_method=method, **values) for (date, method), values in per_method.items()],
+        )
+
+    return {'sales': sales_rows, 'items': items_rows}
+
+
+def _upsert_range(model, start, end, unique_fields, objs):
+    """Inserta/actualiza `objs` y elimina las filas del rango que ya no tienen datos."""
+    update_fields = [
+        f.name for f in model._meta.concrete_fields
+        if not f.primary_key and f.name not in unique_fields
+    ]
+    now = timezone.now()
+    for obj in objs:
+        obj.updated_at = now
+    if objs:
+        model.objects.bulk_create(objs, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields)
+
+    stale = model.objects.filter(date__gte=start, date__lte=end)
+    if model is SalesDailyRollup:
+        stale = stale.exclude(date__in=[o.date for o in objs])
+    else:
+        key = unique_fields[1] + ('_id' if unique_fields[1] == 'product' else '')
+        keep = {(o.date, getattr(o, key)) for o in objs}
+        stale = [pk for pk, date, value in stale.values_list('pk', 'date', key) if (date, value) not in keep]
+        stale = model.objects.filter(pk__in=stale)
+    stale.delete()
@@ -10,6 +10,7 @@ from .models import (
 from .models import ResetToken
 from .models import Purchase
 from .models import Order, OrderItem
+from .models import ReportJob
 
 User = get_user_model()  # Usa el modelo de usuario personalizado
 
@@ -81,7 +82,9 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         if password:
             instance.set_password(password)
             instance.save()
-        
+
+        # Invalida el estado cacheado del usuario (autenticación y /users/me/status/)
+        instance.bump_status_version()
         return instance
 
 
@@ -267,6 +270,11 @@ class ProductSerializer(serializers.ModelSerializer):
         
         # Solo procesar ingredientes si se enviaron explícitamente
         if recipe_data is not None:
+            from .bom import RecipeCycleError, ensure_acyclic
+            try:
+                ensure_acyclic(instance.pk, [item['ingredient'].pk for item in recipe_data if item.get('ingredient')])
+            except RecipeCycleError as e:
+                raise serializers.ValidationError({'recipe_ingredients': str(e)})
             # Si se envían ingredientes nuevos, agregarlos sin borrar los existentes
             for recipe_item_data in recipe_data:
                 RecipeIngredient.objects.create(product=instance, **recipe_item_data)
@@ -337,39 +345,20 @@ class SaleSerializer(serializers.ModelSerializer):
         read_only_fields = ('user',)
 
     def create(self, validated_data):
+        from django.db import transaction
+        from django.db.models import prefetch_related_objects
+        from .services import commit_sale_items
+
         items_data = validated_data.pop('items', [])
-        sale = Sale.objects.create(**validated_data)
-        
-        # Procesar cada item de la venta
-        for item_data in items_data:
-            product_id = item_data.get('product_id')
-            quantity = item_data.get('quantity')
-            price = item_data.get('price')
-            
-            try:
-                product = Product.objects.get(id=product_id)
-                
-                # Verificar que hay suficiente stock
-                if product.stock < quantity:
-                    raise serializers.ValidationError(f'Stock insuficiente para {product.name}. Disponible: {product.stock}, Requerido: {quantity}')
-                
-                # Crear el item de venta
-                SaleItem.objects.create(
-                    sale=sale,
-                    product=product,
-                    quantity=quantity,
-                    price=price
-                )
-                
-                # Actualizar el stock del producto
-                product.stock -= quantity
-                product.save()
-                
-                print(f'✅ Stock actualizado: {product.name} - Nuevo stock: {product.stock}')
-                
-            except Product.DoesNotExist:
-                raise serializers.ValidationError(f'Producto con ID {product_id} no encontrado')
-        
+
+        # Venta + items + descuento de stock en una única transacción:
+        # los productos del ticket se bloquean juntos y el stock se valida antes de escribir
+        with transaction.atomic():
+            sale = Sale.objects.create(**validated_data)
+            commit_sale_items(sale, items_data)
+
+        # Precargar items y productos para serializar la respuesta sin N+1
+        prefetch_related_objects([sale], 'saleitem_set__product')
         return sale
 
 # Serializer para consultas de usuario
@@ -571,3 +560,21 @@ class LowStockReportSerializer(serializers.ModelSerializer):
         report = LowStockReport.objects.create(**validated_data)
         report.products.set(products)
         return report
+
+
+# Serializer para exportaciones PDF asíncronas
+class ReportJobSerializer(serializers.ModelSerializer):
+    user = serializers.ReadOnlyField(source='user.username')
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ('id', 'user', 'query_type', 'filters', 'status', 'cached', 'error',
+                  'created_at', 'started_at', 'finished_at', 'download_url')
+        read_only_fields = ('id', 'user', 'status', 'cached', 'error',
+                            'created_at', 'started_at', 'finished_at', 'download_url')
+
+    def get_download_url(self, obj):
+        if obj.status != 'done':
+            return None
+        return f'/api/reports/{obj.id}/download/'
@@ -0,0 +1,393 @@
+# backend/api/services.py
+"""
+Operaciones de stock compartidas por varias vistas/serializers.
+
+Cada función recibe los datos ya validados y aplica los cambios en la base de
+datos con una cantidad fija de consultas, independientemente de la cantidad de
+líneas involucradas.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction, IntegrityError
+from django.db.models import Case, When, F, Value, DecimalField
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+
+from .bom import resolve_boms
+from .models import (
+    InventoryChangeAudit, Product, Sale, SaleItem, SaleIdempotencyKey, Production, ProductionItem,
+)
+from .sync import mark_changed
+
+# Cantidad de claves de idempotencia que se consultan juntas al ingerir un lote offline
+SALE_BATCH_CHUNK_SIZE = 50
+
+# Tope de `loss_rate` al agrandar cantidades: una pérdida del 100% dividiría por cero
+MAX_LOSS_RATE = Decimal('0.99')
+
+
+def _stock_delta_case(deltas):
+    """
+    Construye un `CASE WHEN id=... THEN stock + delta` para aplicar varios
+    cambios de stock en un único UPDATE. `deltas` es {product_id: Decimal}.
+    """
+    return Case(
+        *[When(id=pid, then=F('stock') + Value(delta)) for pid, delta in deltas.items()],
+        default=F('stock'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def apply_stock_deltas(deltas):
+    """Aplica {product_id: delta} en un solo UPDATE (delta negativo = descuento)."""
+    deltas = {pid: delta for pid, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    updated = Product.objects.filter(id__in=deltas.keys()).update(stock=_stock_delta_case(deltas))
+    # update() no dispara señales: registrar el cambio de stock para /api/sync/
+    mark_changed('products', deltas.keys())
+    return updated
+
+
+def lock_products(product_ids):
+    """
+    Bloquea (SELECT ... FOR UPDATE) todos los productos indicados en una sola
+    consulta, ordenados por id para que dos transacciones concurrentes tomen los
+    locks en el mismo orden y no se produzcan deadlocks.
+    """
+    ids = sorted(set(product_ids))
+    if not ids:
+        return {}
+    return {p.id: p for p in Product.objects.select_for_update().filter(id__in=ids).order_by('id')}
+
+
+def _normalize_sale_items(items_data):
+    """Valida el formato de las líneas recibidas del frontend."""
+    lines = []
+    for item_data in items_data:
+        product_id = item_data.get('product_id')
+        quantity = item_data.get('quantity')
+        price = item_data.get('price')
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(f'Producto con ID {product_id} no encontrado')
+        try:
+            quantity_decimal = Decimal(str(quantity))
+        except (InvalidOperation, TypeError, ValueError):
+            raise serializers.ValidationError(f'Cantidad inválida para el producto con ID {product_id}')
+        # SaleItem.quantity es entero: 1.5 no se redondea, se rechaza
+        if not quantity_decimal.is_finite() or quantity_decimal <= 0 or quantity_decimal != quantity_decimal.to_integral_value():
+            raise serializers.ValidationError(f'Cantidad inválida para el producto con ID {product_id}')
+        lines.append((product_id, int(quantity_decimal), quantity_decimal, price))
+    return lines
+
+
+def commit_sale_items(sale, items_data):
+    """
+    Registra los items de una venta y descuenta el stock de forma atómica.
+
+    - Bloquea todos los productos del ticket en un único SELECT FOR UPDATE.
+    - Valida el stock en memoria (sumando líneas repetidas del mismo producto).
+    - Inserta todos los SaleItem con bulk_create.
+    - Descuenta el stock con un único UPDATE ... CASE.
+    - Acumula la venta en las tablas de resumen diarias (api/rollups.py).
+
+    Devuelve {product_id: Product} con el stock ya actualizado en memoria.
+    """
+    from .rollups import record_sale
+
+    lines = _normalize_sale_items(items_data)
+    if not lines:
+        record_sale(sale, [])
+        return {}
+
+    with transaction.atomic():
+        products = lock_products(pid for pid, _, _, _ in lines)
+
+        required = {}
+        for product_id, _, quantity_decimal, _ in lines:
+            if product_id not in products:
+                raise serializers.ValidationError(f'Producto con ID {product_id} no encontrado')
+            required[product_id] = required.get(product_id, Decimal('0')) + quantity_decimal
+
+        for product_id, quantity_decimal in required.items():
+            product = products[product_id]
+            if product.stock < quantity_decimal:
+                raise serializers.ValidationError(f'Stock insuficiente para {product.name}. Disponible: {product.stock}, Requerido: {quantity_decimal}')
+
+        SaleItem.objects.bulk_create([
+            SaleItem(sale=sale, product=products[product_id], quantity=quantity, price=price)
+            for product_id, quantity, _, price in lines
+        ])
+
+        apply_stock_deltas({pid: -qty for pid, qty in required.items()})
+
+        for product_id, quantity_decimal in required.items():
+            products[product_id].stock -= quantity_decimal
+
+        # Mantener las tablas de resumen de ventas en la misma transacción
+        record_sale(sale, [(product_id, quantity_decimal, price) for product_id, _, quantity_decimal, price in lines])
+
+    return products
+
+
+def _ingest_one_sale(entry, user, known_keys):
+    """Procesa una venta del lote y devuelve su resultado individual."""
+    from .serializers import SaleSerializer
+
+    key = str(entry.get('idempotency_key') or '').strip() if isinstance(entry, dict) else ''
+    if not key:
+        return {'idempotency_key': None, 'status': 'error', 'error': 'idempotency_key requerido'}
+    max_length = SaleIdempotencyKey._meta.get_field('key').max_length
+    if len(key) > max_length:
+        return {'idempotency_key': key, 'status': 'error', 'error': f'idempotency_key supera los {max_length} caracteres'}
+    if key in known_keys:
+        return {'idempotency_key': key, 'status': 'duplicate', 'sale_id': known_keys[key]}
+
+    serializer = SaleSerializer(data=entry)
+    if not serializer.is_valid():
+        return {'idempotency_key': key, 'status': 'error', 'error': serializer.errors}
+
+    validated_data = dict(serializer.validated_data)
+    items_data = validated_data.pop('items', [])
+    try:
+        # Una transacción por venta: los bloqueos de productos y resúmenes se liberan
+        # al confirmar cada una y un error no afecta al resto del lote
+        with transaction.atomic():
+            sale = Sale.objects.create(user=user, **validated_data)
+            commit_sale_items(sale, items_data)
+            SaleIdempotencyKey.objects.create(key=key, sale=sale, user=user)
+    except serializers.ValidationError as e:
+        return {'idempotency_key': key, 'status': 'error', 'error': e.detail}
+    except IntegrityError:
+        # Otra petición registró la misma clave en paralelo: la venta ya existe
+        sale_id = SaleIdempotencyKey.objects.filter(key=key).values_list('sale_id', flat=True).first()
+        if sale_id is None:
+            raise
+        known_keys[key] = sale_id
+        return {'idempotency_key': key, 'status': 'duplicate', 'sale_id': sale_id}
+
+    known_keys[key] = sale.id
+    return {'idempotency_key': key, 'status': 'created', 'sale_id': sale.id}
+
+
+def ingest_sale_batch(sales_data, user, chunk_size=SALE_BATCH_CHUNK_SIZE):
+    """
+    Ingresa un lote de ventas encoladas por una caja sin conexión.
+
+    Cada venta trae una `idempotency_key` generada por el cliente; si la clave ya
+    fue registrada la venta se informa como 'duplicate' sin volver a descontar stock.
+    Cada venta se confirma en su propia transacción; las claves ya registradas
+    se consultan de a `chunk_size`. Devuelve un resultado por venta, en el
+    mismo orden recibido.
+    """
+    results = []
+    for start in range(0, len(sales_data), chunk_size):
+        chunk = sales_data[start:start + chunk_size]
+        keys = [str(e.get('idempotency_key') or '').strip() for e in chunk if isinstance(e, dict)]
+        known_keys = dict(
+            SaleIdempotencyKey.objects.filter(key__in=[k for k in keys if k]).values_list('key', 'sale_id')
+        )
+        for entry in chunk:
+            results.append(_ingest_one_sale(entry, user, known_keys))
+    return results
+
+
+def format_quantity_with_unit(quantity, unit):
+    """Cantidad legible según la unidad de la receta (g → Kg, ml → L)."""
+    quantity = Decimal(str(quantity))
+    if unit == 'g':
+        return f"{quantity / 1000:.2f} Kg"
+    if unit == 'ml':
+        return f"{quantity / 1000:.2f} L"
+    if unit == 'u':
+        return f"{quantity:.0f} U"
+    return f"{quantity:.2f} {unit}"
+
+
+def whole_units(quantity, product_id):
+    """Cantidad de unidades como int: NaN, Infinity, fracciones y valores <= 0 se rechazan con ValidationError."""
+    try:
+        quantity_decimal = Decimal(str(quantity))
+    except (InvalidOperation, TypeError, ValueError):
+        raise serializers.ValidationError(f'Cantidad inválida para el producto con ID {product_id}')
+    if not quantity_decimal.is_finite() or quantity_decimal <= 0 or quantity_decimal != quantity_decimal.to_integral_value():
+        raise serializers.ValidationError(f'Cantidad inválida para el producto con ID {product_id}')
+    return int(quantity_decimal)
+
+
+def _normalize_production_lines(lines):
+    """[(product_id, unidades, Decimal)] descartando las filas vacías (sin producto o con cantidad 0)."""
+    normalized = []
+    for item in lines:
+        product_id = item.get('product_id')
+        quantity = item.get('quantity_produced', 0)
+        try:
+            quantity_decimal = Decimal(str(quantity))
+        except (InvalidOperation, TypeError, ValueError):
+            raise serializers.ValidationError(f'Cantidad inválida para el producto con ID {product_id}')
+        if not product_id or quantity_decimal.is_zero():
+            continue
+        # ProductionItem.quantity es entero: 2.5 no se redondea, se rechaza
+        units = whole_units(quantity_decimal, product_id)
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise NotFound(f'Producto con ID {product_id} no encontrado')
+        normalized.append((product_id, units, Decimal(units)))
+    return normalized
+
+
+def gross_for_loss(quantity, loss_rate):
+    """Cantidad a consumir/producir para que, descontada la pérdida esperada (`loss_rate`), quede `quantity`."""
+    loss_rate = min(max(Decimal(str(loss_rate or 0)), Decimal('0')), MAX_LOSS_RATE)
+    return quantity / (Decimal('1') - loss_rate)
+
+
+def ingredient_consumption(per_unit, quantity, loss_rate):
+    """
+    Cantidad de un insumo que descuenta producir `quantity` unidades: receta por
+    unidad agrandada por el `loss_rate` del insumo y redondeada a centésimos.
+    Producción, factibilidad y MRP calculan el consumo con esta misma función.
+    """
+    return gross_for_loss(Decimal(str(per_unit)) * Decimal(str(quantity)), loss_rate).quantize(Decimal('0.01'))
+
+
+def commit_production_batch(user, lines, finished_goods_only=False, reason='Producción'):
+    """
+    Registra un lote de producción completo en una transacción. La usan tanto
+    el lote de ProductionViewSet como la producción individual de ProductProductionView.
+
+    - Toma la receta por unidad de cada producto de api/bom.py (cacheada, ya
+      dividida por `recipe_yield`).
+    - Bloquea una sola vez, por id, los insumos y productos afectados, y con
+      esas filas agranda el consumo de cada insumo por su `loss_rate`
+      (ingredient_consumption), en los dos endpoints de producción.
+    - Suma en memoria la demanda de cada insumo en todo el lote, así dos
+      productos que comparten harina se validan contra el mismo stock.
+    - Aplica todos los cambios de stock en un UPDATE y crea los ProductionItem
+      y la auditoría de inventario (una fila por producto afectado) con bulk_create.
+
+    Con `finished_goods_only=True` se rechazan insumos y productos sin receta.
+    Devuelve (production, changes) con el detalle de stock antes/después que
+    muestra el frontend. Un insumo insuficiente cancela el lote entero.
+    """
+    requested = _normalize_production_lines(lines)
+    if not requested:
+        raise serializers.ValidationError(
+            'No se crearon items de producción. Verifique que los productos y cantidades sean válidos.'
+        )
+
+    boms = resolve_boms(pid for pid, _, _ in requested)
+    ingredient_ids = {iid for pid, _, _ in requested for iid in boms[pid].direct}
+
+    with transaction.atomic():
+        locked = lock_products(list(ingredient_ids) + [pid for pid, _, _ in requested])
+        for product_id, _, _ in requested:
+            if product_id not in locked:
+                raise NotFound(f'Producto con ID {product_id} no encontrado')
+            if finished_goods_only and locked[product_id].is_ingredient:
+                raise serializers.ValidationError('No se pueden producir insumos, solo productos finales.')
+            if finished_goods_only and not boms[product_id].direct:
+                raise serializers.ValidationError('El producto no tiene una receta definida y no puede ser producido.')
+
+        # Demanda total por insumo y detalle por línea, en el orden recibido
+        demand = {}
+        units = {}
+        uses_by_line = []
+        for product_id, _, quantity in requested:
+            bom = boms[product_id]
+            uses = []
+            for ingredient_id, per_unit in bom.direct.items():
+                needed = ingredient_consumption(per_unit, quantity, locked[ingredient_id].loss_rate)
+                demand[ingredient_id] = demand.get(ingredient_id, Decimal('0')) + needed
+                units.setdefault(ingredient_id, bom.units[ingredient_id])
+                uses.append((ingredient_id, needed, bom.units[ingredient_id]))
+            uses_by_line.append(uses)
+
+        insufficient = [
+            f"{locked[iid].name}: Necesario {format_quantity_with_unit(needed, units[iid])}, "
+            f"Disponible {format_quantity_with_unit(locked[iid].stock, units[iid])}"
+            for iid, needed in demand.items() if locked[iid].stock < needed
+        ]
+        if insufficient:
+            raise serializers.ValidationError(
+                "Stock insuficiente de los siguientes insumos:\n" + "\n".join(insufficient)
+            )
+
+        production = Production.objects.create(user=user, total_units=sum(q for _, q, _ in requested))
+        ProductionItem.objects.bulk_create([
+            ProductionItem(production=production, product_id=product_id, quantity=quantity)
+            for product_id, quantity, _ in requested
+        ])
+
+        deltas = {iid: -needed for iid, needed in demand.items()}
+        for product_id, _, quantity in requested:
+            deltas[product_id] = deltas.get(product_id, Decimal('0')) + quantity
+        apply_stock_deltas(deltas)
+        _audit_stock_deltas(user, deltas, locked, f'{reason} #{production.id}')
+
+    return production, _production_changes(requested, uses_by_line, locked)
+
+
+def _audit_stock_deltas(user, deltas, locked, reason):
+    """Una fila de InventoryChangeAudit por producto con el stock previo (bloqueado) y el resultante."""
+    role = getattr(getattr(user, 'role', None), 'name', None)
+    InventoryChangeAudit.objects.bulk_create([
+        InventoryChangeAudit(
+            product_id=pid,
+            user=user if user is not None and user.is_authenticated else None,
+            role=role,
+            change_type='Entrada' if delta > 0 else 'Salida',
+            quantity=abs(delta),
+            previous_stock=locked[pid].stock,
+            new_stock=locked[pid].stock + delta,
+            reason=reason,
+        )
+        for pid, delta in sorted(deltas.items()) if delta
+    ])
+
+
+def _production_changes(requested, uses_by_line, locked):
+    """Recorre el lote en orden para informar el stock antes/después de cada insumo y producto."""
+    stock = {pid: Decimal(str(p.stock)) for pid, p in locked.items()}
+    ingredients_changes = {}
+    products_changes = []
+    for (product_id, _, quantity), uses in zip(requested, uses_by_line):
+        product_stock_before = stock[product_id]
+        ingredients_used = []
+        for ingredient_id, needed, unit in uses:
+            ingredient = locked[ingredient_id]
+            before = stock[ingredient.id]
+            stock[ingredient.id] = before - needed
+            ingredients_used.append({
+                'name': ingredient.name,
+                'quantity_used': float(needed),
+                'unit': unit,
+                'formatted_used': format_quantity_with_unit(needed, unit),
+            })
+            change = ingredients_changes.get(ingredient.name)
+            if change is None:
+                ingredients_changes[ingredient.name] = change = {
+                    'name': ingredient.name,
+                    'stock_before': float(before),
+                    'quantity_used': 0.0,
+                    'unit': unit,
+                    'formatted_before': format_quantity_with_unit(before, unit),
+                }
+            change['quantity_used'] += float(needed)
+            change['stock_after'] = float(stock[ingredient.id])
+            change['formatted_used'] = format_quantity_with_unit(change['quantity_used'], unit)
+            change['formatted_after'] = format_quantity_with_unit(stock[ingredient.id], unit)
+
+        stock[product_id] += quantity
+        products_changes.append({
+            'name': locked[product_id].name,
+            'stock_before': float(product_stock_before),
+            'quantity_produced': float(quantity),
+            'stock_after': float(stock[product_id]),
+            'unit': 'u',
+            'ingredients_used': ingredients_used,
+        })
+    return {'ingredients': list(ingredients_changes.values()), 'products': products_changes}
@@ -0,0 +1,170 @@
+# backend/api/sync.py
+"""
+Secuencia de cambios para la sincronización incremental del frontend
+(GET /api/sync/?since=<cursor>).
+
+Toda modificación de un producto (stock y receta incluidos), pedido o reporte
+de faltantes registra un on_commit con los ids afectados. Si la transacción (o
+el savepoint) se revierte, Django descarta el callback y con él las marcas; al
+confirmarse se toma el siguiente valor de `SyncSequence` y se graba en
+`change_seq` de esas filas. El número se asigna después del commit, en una transacción
+corta que bloquea el contador antes que las filas: así los valores siguen el
+orden en que los cambios se hicieron visibles y un cliente que ya leyó hasta N
+no puede perder un cambio confirmado más tarde con un número menor. Los
+borrados físicos dejan una `SyncTombstone` con el número asignado.
+
+El costo es que toda escritura marcada (cada venta o producción que mueve
+stock) pasa por la única fila de `SyncSequence`: las transacciones cortas de
+numeración se ejecutan de a una. Si la numeración falla, la venta ya quedó
+confirmada: el error se registra en el log y esas filas no reciben número
+hasta su próxima modificación.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+# Clave en la respuesta de /api/sync/ -> modelo
+SYNC_MODELS = {
+    'products': 'Product',
+    'orders': 'Order',
+    'low_stock_reports': 'LowStockReport',
+}
+
+def _model(name):
+    from django.apps import apps
+    return apps.get_model('api', SYNC_MODELS[name])
+
+
+def mark_changed(name, ids, deleted=False):
+    """
+    Registra filas de `name` (clave de SYNC_MODELS) modificadas o borradas en la
+    transacción actual; reciben su número de secuencia al confirmarse.
+    """
+    ids = {pid for pid in ids if pid is not None}
+    if not ids:
+        return
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and connection.run_on_commit:
+        # Marcas seguidas del mismo tipo dentro del mismo savepoint comparten callback
+        # (y número de secuencia): se revierten o se confirman juntas
+        savepoints, last, _ = connection.run_on_commit[-1]
+        if savepoints == set(connection.savepoint_ids) and getattr(last, 'sync_key', None) == (name, deleted):
+            last.sync_ids.update(ids)
+            return
+
+    def flush():
+        _flush(name, flush.sync_ids, deleted)
+    flush.sync_key = (name, deleted)
+    flush.sync_ids = ids
+    # robust: un error al numerar no convierte en 500 un cambio que ya se confirmó
+    transaction.on_commit(flush, robust=True)
+
+
+def next_change_seq():
+    """Incrementa el contador global; debe llamarse dentro de una transacción."""
+    from .models import SyncSequence
+
+    sequence, _ = SyncSequence.objects.select_for_update().get_or_create(pk=1)
+    sequence.value += 1
+    sequence.save(update_fields=['value'])
+    return sequence.value
+
+
+def current_change_seq():
+    from .models import SyncSequence
+
+    return SyncSequence.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+
+def _flush(name, ids, deleted):
+    from .models import SyncTombstone
+
+    with transaction.atomic():
+        seq = next_change_seq()
+        if deleted:
+            SyncTombstone.objects.bulk_create(
+                [SyncTombstone(model=name, object_id=pid, change_seq=seq) for pid in sorted(ids)]
+            )
+        else:
+            _model(name).objects.filter(id__in=ids).update(change_seq=seq)
+
+
+def changes_since(since, include_low_stock_reports=False, context=None):
+    """
+    Arma la respuesta de /api/sync/. Sin `since` (o con un cursor que no
+    corresponde a esta base) devuelve el estado completo con `full=True`.
+    """
+    from .models import Order, Product, LowStockReport, SyncTombstone
+    from .serializers import LowStockReportSerializer, OrderSerializer, ProductSerializer
+
+    cursor = current_change_seq()
+    full = since is None or since <= 0 or since > cursor
+
+    querysets = {
+        'products': Product.objects.prefetch_related('recipe__ingredient'),
+        'orders': Order.objects.select_related('user').prefetch_related('items'),
+    }
+    serializers = {'products': ProductSerializer, 'orders': OrderSerializer}
+    if include_low_stock_reports:
+        querysets['low_stock_reports'] = LowStockReport.objects.select_related('reported_by').prefetch_related('products')
+        serializers['low_stock_reports'] = LowStockReportSerializer
+
+    payload = {'cursor': cursor, 'full': full}
+    deleted = {name: [] for name in querysets}
+    if full:
+        querysets['products'] = querysets['products'].filter(is_active=True)
+    else:
+        querysets = {
+            name: qs.filter(change_seq__gt=since, change_seq__lte=cursor) for name, qs in querysets.items()
+        }
+        for name, object_id in (
+            SyncTombstone.objects.filter(model__in=list(querysets), change_seq__gt=since, change_seq__lte=cursor)
+            .values_list('model', 'object_id')
+        ):
+            deleted[name].append(object_id)
+
+    for name, qs in querysets.items():
+        rows = list(qs.order_by('id'))
+        if name == 'products' and not full:
+            # La baja lógica de un producto se informa como borrado
+            deleted[name].extend(p.id for p in rows if not p.is_active)
+            rows = [p for p in rows if p.is_active]
+        payload[name] = serializers[name](rows, many=True, context=context or {}).data
+    payload['deleted'] = deleted
+    return payload
+
+
+# --- Señales: cualquier escritura por el ORM marca la fila afectada ---
+
+def _saved(name, attr='pk'):
+    def receiver(sender, instance, **kwargs):
+        mark_changed(name, [getattr(instance, attr)])
+    return receiver
+
+
+def _deleted(name):
+    def receiver(sender, instance, **kwargs):
+        mark_changed(name, [instance.pk], deleted=True)
+    return receiver
+
+
+def _report_products_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    mark_changed('low_stock_reports', (pk_set or []) if reverse else [instance.pk])
+
+
+_RECEIVERS = [
+    (post_save, 'api.Product', _saved('products')),
+    (post_delete, 'api.Product', _deleted('products')),
+    (post_save, 'api.RecipeIngredient', _saved('products', 'product_id')),
+    (post_delete, 'api.RecipeIngredient', _saved('products', 'product_id')),
+    (post_save, 'api.Order', _saved('orders')),
+    (post_delete, 'api.Order', _deleted('orders')),
+    (post_save, 'api.OrderItem', _saved('orders', 'order_id')),
+    (post_delete, 'api.OrderItem', _saved('orders', 'order_id')),
+    (post_save, 'api.LowStockReport', _saved('low_stock_reports')),
+    (post_delete, 'api.LowStockReport', _deleted('low_stock_reports')),
+    (m2m_changed, 'api.LowStockReport_products', _report_products_changed),
+]
+for _signal, _sender, _receiver in _RECEIVERS:
+    _signal.connect(_receiver, sender=_sender, weak=False, dispatch_uid=f'api.sync:{_sender}')
@@ -0,0 +1,47 @@
+# backend/api/tests/bench_endpoints.py
+"""
+Suite de pytest-benchmark sobre los escenarios de api/benchmarks.py (los mismos
+que mide `python manage.py benchmark`). Requiere pytest-django y pytest-benchmark:
+
+    pytest --benchmark-json=benchmark_results.json
+    pytest --benchmark-autosave
+    pytest --benchmark-compare --benchmark-compare-fail=median:20%
+
+El dataset se siembra una vez por sesión en la base de tests (BENCH_SCALE=0.05
+del tamaño de `manage.py benchmark --seed` por defecto). Cada test corre en una
+transacción que se revierte al terminar, así los escenarios que escriben no
+cambian los datos de los siguientes; los callbacks on_commit no se ejecutan.
+La cantidad de consultas SQL por request queda en `extra_info` del JSON.
+"""
+import random
+import statistics
+
+import pytest
+
+from api.benchmarks import SCENARIOS, bench_client, run_once
+
+ROUNDS = 20
+WARMUP_ROUNDS = 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', sorted(SCENARIOS))
+def test_scenario(benchmark, bench_dataset, name):
+    scenario = SCENARIOS[name](random.Random(42))
+    client = bench_client()
+    queries = []
+
+    def run():
+        response, query_count = run_once(scenario, client)
+        queries.append(query_count)
+        return response
+
+    benchmark.group = 'endpoints'
+    response = benchmark.pedantic(run, setup=scenario.setup, rounds=ROUNDS, warmup_rounds=WARMUP_ROUNDS)
+
+    assert response.status_code < 400, response.status_code
+    benchmark.extra_info['queries'] = {
+        'min': min(queries),
+        'median': statistics.median(queries),
+        'max': max(queries),
+    }
@@ -0,0 +1,63 @@
+# backend/api/tests/conftest.py
+import os
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.benchmarks import DEFAULT_DATASET, seed_dataset
+from api.models import Role, User
+
+# Tamaños que no escalan con BENCH_SCALE: forma del dataset, no cantidad de filas
+_UNSCALED = ('ingredients_per_recipe', 'items_per_sale', 'days')
+
+
+def dataset_sizes():
+    """DEFAULT_DATASET escalado por BENCH_SCALE; cada tamaño se puede fijar con BENCH_<NOMBRE>."""
+    scale = float(os.environ.get('BENCH_SCALE', '0.05'))
+    sizes = {}
+    for name, default in DEFAULT_DATASET.items():
+        value = default if name in _UNSCALED else max(1, int(default * scale))
+        sizes[name] = int(os.environ.get(f'BENCH_{name.upper()}', value))
+    return sizes
+
+
+@pytest.fixture(scope='session')
+def bench_dataset(django_db_setup, django_db_blocker):
+    # Se carga una vez fuera de la transacción de cada test, así los rollbacks no lo borran
+    with django_db_blocker.unblock():
+        return seed_dataset(log=lambda message: None, **dataset_sizes())
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # Recetas (api/bom.py), estado del MRP y usuarios cacheados no deben pasar de un test a otro
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def roles(db):
+    # get_or_create: el dataset de benchmarks (si se cargó) ya tiene el rol Gerente
+    return {name: Role.objects.get_or_create(name=name)[0] for name in ('Gerente', 'Encargado', 'Panadero', 'Cajero')}
+
+
+@pytest.fixture
+def gerente(roles):
+    return User.objects.create_user(username='gerente', email='gerente@example.com', role=roles['Gerente'])
+
+
+@pytest.fixture
+def cajero(roles):
+    return User.objects.create_user(username='cajero', email='cajero@example.com', role=roles['Cajero'])
+
+
+@pytest.fixture
+def api_client():
+    """APIClient autenticado como el usuario recibido: api_client(gerente)."""
+    def build(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+    return build
@@ -0,0 +1,113 @@
+# backend/api/tests/test_production.py
+"""
+Producción, factibilidad y MRP descuentan el mismo consumo por insumo: receta
+por unidad agrandada por el `loss_rate` del insumo y redondeada a centésimos
+(services.ingredient_consumption).
+"""
+from decimal import Decimal
+
+import pytest
+
+from api.models import Order, OrderItem, Product, Production, RecipeIngredient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(db):
+    """100 g de harina (2% de pérdida) por torta, y por cada 3 panes."""
+    flour = Product.objects.create(
+        name='Harina test', price=Decimal('0.01'), stock=1000, is_ingredient=True, unit='g', loss_rate=Decimal('0.02'),
+    )
+    cake = Product.objects.create(name='Torta test', price=10, stock=0)
+    bread = Product.objects.create(name='Pan test', price=10, stock=0, recipe_yield=3)
+    RecipeIngredient.objects.create(product=cake, ingredient=flour, quantity=Decimal('100'), unit='g')
+    RecipeIngredient.objects.create(product=bread, ingredient=flour, quantity=Decimal('100'), unit='g')
+    return flour, cake, bread
+
+
+def _batch(client, *lines):
+    return client.post('/api/productions/batch/', {
+        'productions': [{'product_id': product.id, 'quantity_produced': quantity} for product, quantity in lines],
+    }, format='json')
+
+
+def _feasibility(client, *lines):
+    return client.post('/api/production/feasibility/', {
+        'productions': [{'product_id': product.id, 'quantity_produced': quantity} for product, quantity in lines],
+    }, format='json')
+
+
+def test_production_consumes_grossed_and_rounded_quantities(api_client, gerente, recipes):
+    flour, cake, bread = recipes
+    response = _batch(api_client(gerente), (cake, 1), (bread, 2))
+    assert response.status_code == 201
+
+    # 100 / 0.98 = 102.04; 200/3 / 0.98 = 68.03
+    flour.refresh_from_db()
+    assert flour.stock == Decimal('1000') - Decimal('102.04') - Decimal('68.03')
+    production = Production.objects.get(id=response.data['id'])
+    assert production.total_units == 3
+    assert sorted(production.items.values_list('quantity', flat=True)) == [1, 2]
+
+
+def test_feasibility_limit_matches_production(api_client, gerente, recipes):
+    flour, cake, bread = recipes
+    client = api_client(gerente)
+
+    # 9 tortas consumen 918.37 g; la décima ya no entra
+    result = _feasibility(client, (cake, 10)).data
+    assert not result['feasible']
+    assert result['products'][0]['max_producible'] == 9
+    assert result['bottlenecks'][0]['required'] == 1020.41
+    assert _feasibility(client, (cake, 9)).data['feasible']
+
+    assert _batch(client, (cake, 9)).status_code == 201
+    assert _feasibility(client, (cake, 1)).data['products'][0]['max_producible'] == 0
+    assert _batch(client, (cake, 1)).status_code == 400
+
+
+def test_feasibility_allocation_can_be_produced(api_client, gerente, recipes):
+    flour, cake, bread = recipes
+    client = api_client(gerente)
+
+    result = _feasibility(client, (cake, 5), (bread, 20)).data
+    assert not result['feasible']
+    allocated = [int(p['allocated']) for p in result['products']]
+    assert _batch(client, (cake, allocated[0]), (bread, allocated[1])).status_code == 201
+    flour.refresh_from_db()
+    assert flour.stock >= 0
+
+
+def test_material_plan_uses_production_consumption(api_client, gerente, recipes):
+    flour, cake, bread = recipes
+    flour.stock = 0
+    flour.save()
+    order = Order.objects.create(customer_name='Cliente', status='Pendiente')
+    OrderItem.objects.create(order=order, product_name='Torta test', quantity=1)
+    OrderItem.objects.create(order=order, product_name='PAN TEST', quantity=2)
+
+    response = api_client(gerente).get('/api/production/plan/')
+    assert response.status_code == 200
+    planned = {row['product_id']: row['planned'] for row in response.data['production']}
+    assert planned[cake.id] == 1
+    assert planned[bread.id] == 2
+    shortfall = next(
+        item for group in response.data['shortfalls'] for item in group['items'] if item['ingredient_id'] == flour.id
+    )
+    assert shortfall['quantity'] == 170.07
+
+
+@pytest.mark.parametrize('quantity', ['NaN', 'Infinity', '2.5', 2.5, -1])
+def test_invalid_quantities_are_rejected(api_client, gerente, recipes, quantity):
+    flour, cake, bread = recipes
+    client = api_client(gerente)
+
+    assert _batch(client, (cake, quantity)).status_code == 400
+    assert client.post(
+        '/api/products/produce/', {'product_id': cake.id, 'quantity_produced': quantity}, format='json',
+    ).status_code == 400
+    assert _feasibility(client, (cake, quantity)).status_code == 400
+    flour.refresh_from_db()
+    assert flour.stock == 1000
+    assert not Production.objects.filter(items__product=cake).exists()
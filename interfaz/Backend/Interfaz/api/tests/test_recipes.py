@@ -0,0 +1,67 @@
+# backend/api/tests/test_recipes.py
+from decimal import Decimal
+
+import pytest
+
+from api.bom import RecipeCycleError, resolve_boms
+from api.models import Product, RecipeIngredient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(db):
+    """Torta ← Crema ← Leche: la crema es una preparación intermedia que rinde 500 g."""
+    milk = Product.objects.create(name='Leche', price=1, stock=10000, is_ingredient=True, unit='ml')
+    cream = Product.objects.create(name='Crema', price=1, stock=1000, recipe_yield=500, unit='g', is_ingredient=True)
+    cake = Product.objects.create(name='Torta', price=10, stock=0)
+    RecipeIngredient.objects.create(product=cream, ingredient=milk, quantity=Decimal('400'), unit='ml')
+    RecipeIngredient.objects.create(product=cake, ingredient=cream, quantity=Decimal('250'), unit='g')
+    return milk, cream, cake
+
+
+def test_flat_bom_goes_through_intermediate_recipes(recipes):
+    milk, cream, cake = recipes
+    bom = resolve_boms([cake.id])[cake.id]
+    assert bom.direct == {cream.id: Decimal('250')}
+    assert bom.flat == {milk.id: Decimal('200')}
+
+
+def test_recipe_ingredient_cycle_is_rejected(api_client, gerente, recipes):
+    milk, cream, cake = recipes
+    client = api_client(gerente)
+
+    response = client.post(
+        '/api/recipe-ingredients/', {'product': milk.id, 'ingredient': cream.id, 'quantity': '1', 'unit': 'g'},
+        format='json',
+    )
+    assert response.status_code == 400
+    assert 'ciclo' in str(response.data)
+
+    response = client.post(
+        '/api/recipe-ingredients/', {'product': cream.id, 'ingredient': cream.id, 'quantity': '1', 'unit': 'g'},
+        format='json',
+    )
+    assert response.status_code == 400
+    assert not RecipeIngredient.objects.filter(ingredient=cream).exclude(product=cake).exists()
+
+
+def test_product_recipe_update_cycle_is_rejected(api_client, gerente, recipes):
+    milk, cream, cake = recipes
+    response = api_client(gerente).patch(
+        f'/api/products/{milk.id}/', {'recipe_ingredients': [{'ingredient': cream.id, 'quantity': '1', 'unit': 'g'}]},
+        format='json',
+    )
+    assert response.status_code == 400
+    assert 'recipe_ingredients' in response.data
+    assert not RecipeIngredient.objects.filter(product=milk).exists()
+
+
+def test_cycle_already_in_database_is_reported(api_client, gerente, recipes):
+    milk, cream, cake = recipes
+    RecipeIngredient.objects.create(product=milk, ingredient=cake, quantity=1)
+
+    with pytest.raises(RecipeCycleError):
+        resolve_boms([cake.id])
+    client = api_client(gerente)
+    assert client.get(f'/api/products/{cake.id}/bom/').status_code == 409
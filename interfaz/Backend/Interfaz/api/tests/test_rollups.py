@@ -0,0 +1,102 @@
+# backend/api/tests/test_rollups.py
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from api.models import Product, SalesDailyRollup, SalesPaymentMethodDailyRollup, SalesProductDailyRollup
+
+pytestmark = pytest.mark.django_db
+
+
+def _totals(*products):
+    """(día, producto, medio de pago) del día de hoy: el dataset de benchmarks puede tener ventas propias."""
+    today = timezone.localdate()
+    daily = SalesDailyRollup.objects.filter(date=today).values('sales_count', 'items_count', 'total_amount').first()
+    return (
+        daily or {'sales_count': 0, 'items_count': 0, 'total_amount': Decimal('0')},
+        {
+            r['product_id']: (r['quantity'], r['revenue'])
+            for r in SalesProductDailyRollup.objects.filter(date=today, product__in=products)
+            .values('product_id', 'quantity', 'revenue')
+        },
+        {
+            r['payment_method']: (r['sales_count'], r['total_amount'])
+            for r in SalesPaymentMethodDailyRollup.objects.filter(date=today).values(
+                'payment_method', 'sales_count', 'total_amount',
+            )
+        },
+    )
+
+
+def _delta(before, after):
+    return {key: after[key] - before[key] for key in after}
+
+
+def _payment(totals, method):
+    return totals[2].get(method, (0, Decimal('0')))
+
+
+@pytest.fixture
+def products(db):
+    return (
+        Product.objects.create(name='Pan', price=10, stock=100),
+        Product.objects.create(name='Torta', price=50, stock=100),
+    )
+
+
+def _create_sale(client, bread, cake, payment_method='Efectivo'):
+    response = client.post('/api/sales/', {
+        'total_amount': 70, 'payment_method': payment_method,
+        'items': [
+            {'product_id': cake.id, 'quantity': 1, 'price': 50},
+            {'product_id': bread.id, 'quantity': 2, 'price': 10},
+        ],
+    }, format='json')
+    assert response.status_code == 201
+    return response.data['id']
+
+
+def test_sale_increments_rollups(api_client, gerente, products):
+    bread, cake = products
+    before = _totals(bread, cake)
+    _create_sale(api_client(gerente), bread, cake)
+    _create_sale(api_client(gerente), bread, cake)
+    after = _totals(bread, cake)
+
+    assert _delta(before[0], after[0]) == {'sales_count': 2, 'items_count': 6, 'total_amount': Decimal('140')}
+    assert after[1] == {bread.id: (4, Decimal('40')), cake.id: (2, Decimal('100'))}
+    efectivo_before, efectivo_after = _payment(before, 'Efectivo'), _payment(after, 'Efectivo')
+    assert (efectivo_after[0] - efectivo_before[0], efectivo_after[1] - efectivo_before[1]) == (2, Decimal('140'))
+
+
+def test_sale_update_moves_rollups(api_client, gerente, products):
+    bread, cake = products
+    client = api_client(gerente)
+    sale_id = _create_sale(client, bread, cake)
+    before = _totals(bread, cake)
+
+    response = client.patch(f'/api/sales/{sale_id}/', {'payment_method': 'Tarjeta', 'total_amount': 75}, format='json')
+    assert response.status_code == 200
+    after = _totals(bread, cake)
+
+    assert _delta(before[0], after[0]) == {'sales_count': 0, 'items_count': 0, 'total_amount': Decimal('5')}
+    assert after[1] == before[1]
+    assert _payment(after, 'Efectivo')[0] == _payment(before, 'Efectivo')[0] - 1
+    assert _payment(after, 'Efectivo')[1] == _payment(before, 'Efectivo')[1] - 70
+    assert _payment(after, 'Tarjeta')[0] == _payment(before, 'Tarjeta')[0] + 1
+    assert _payment(after, 'Tarjeta')[1] == _payment(before, 'Tarjeta')[1] + 75
+
+
+def test_sale_delete_reverts_rollups(api_client, gerente, products):
+    bread, cake = products
+    client = api_client(gerente)
+    before = _totals(bread, cake)
+    sale_id = _create_sale(client, bread, cake)
+
+    assert client.delete(f'/api/sales/{sale_id}/').status_code == 204
+    after = _totals(bread, cake)
+
+    assert _delta(before[0], after[0]) == {'sales_count': 0, 'items_count': 0, 'total_amount': Decimal('0')}
+    assert after[1] == {bread.id: (0, Decimal('0')), cake.id: (0, Decimal('0'))}
+    assert _payment(after, 'Efectivo') == _payment(before, 'Efectivo')
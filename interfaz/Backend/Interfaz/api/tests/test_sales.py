@@ -0,0 +1,82 @@
+# backend/api/tests/test_sales.py
+import pytest
+
+from api.models import Product, Sale, SaleIdempotencyKey
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def bread(db):
+    return Product.objects.create(name='Pan', price=10, stock=100)
+
+
+def _sale(key, product, quantity=1):
+    return {
+        'idempotency_key': key, 'total_amount': 10 * quantity, 'payment_method': 'Efectivo',
+        'items': [{'product_id': product.id, 'quantity': quantity, 'price': 10}],
+    }
+
+
+def test_batch_replay_does_not_duplicate_sales(api_client, cajero, bread):
+    client = api_client(cajero)
+    first = client.post('/api/sales/batch/', {'sales': [_sale('a', bread), _sale('b', bread, 2)]}, format='json')
+    assert first.status_code == 200
+    assert first.data['summary'] == {'created': 2, 'duplicate': 0, 'error': 0}
+
+    # La caja reenvía el lote completo (p. ej. se cortó la conexión antes de la respuesta)
+    replay = client.post('/api/sales/batch/', {'sales': [_sale('a', bread), _sale('b', bread, 2)]}, format='json')
+    assert replay.status_code == 200
+    assert replay.data['summary'] == {'created': 0, 'duplicate': 2, 'error': 0}
+    assert [r['sale_id'] for r in replay.data['results']] == [r['sale_id'] for r in first.data['results']]
+
+    bread.refresh_from_db()
+    assert bread.stock == 97
+    assert SaleIdempotencyKey.objects.filter(key__in=['a', 'b']).count() == 2
+
+
+def test_batch_repeated_key_within_batch_is_duplicate(api_client, cajero, bread):
+    response = api_client(cajero).post(
+        '/api/sales/batch/', {'sales': [_sale('a', bread), _sale('a', bread)]}, format='json',
+    )
+    assert [r['status'] for r in response.data['results']] == ['created', 'duplicate']
+    bread.refresh_from_db()
+    assert bread.stock == 99
+
+
+def test_batch_errors_are_per_sale(api_client, cajero, bread):
+    max_length = SaleIdempotencyKey._meta.get_field('key').max_length
+    sales = [_sale('x' * (max_length + 1), bread), _sale('sin-stock', bread, 1000), _sale('ok', bread)]
+    response = api_client(cajero).post('/api/sales/batch/', {'sales': sales}, format='json')
+
+    assert response.status_code == 200
+    assert [r['status'] for r in response.data['results']] == ['error', 'error', 'created']
+    assert response.data['results'][0]['error'] == f'idempotency_key supera los {max_length} caracteres'
+    bread.refresh_from_db()
+    assert bread.stock == 99
+
+
+@pytest.mark.parametrize('quantity', ['NaN', 'Infinity', '2.5', 2.5, 0, -1])
+def test_sale_rejects_invalid_quantity(api_client, gerente, bread, quantity):
+    sales_before = Sale.objects.count()
+    response = api_client(gerente).post('/api/sales/', {
+        'total_amount': 10, 'payment_method': 'Efectivo',
+        'items': [{'product_id': bread.id, 'quantity': quantity, 'price': 10}],
+    }, format='json')
+
+    assert response.status_code == 400
+    assert Sale.objects.count() == sales_before
+    bread.refresh_from_db()
+    assert bread.stock == 100
+
+
+@pytest.mark.parametrize('quantity', ['NaN', 'Infinity', '2.5'])
+def test_batch_rejects_invalid_quantity(api_client, cajero, bread, quantity):
+    sale = _sale('q', bread)
+    sale['items'][0]['quantity'] = quantity
+    response = api_client(cajero).post('/api/sales/batch/', {'sales': [sale]}, format='json')
+
+    assert response.status_code == 200
+    assert response.data['results'][0]['status'] == 'error'
+    bread.refresh_from_db()
+    assert bread.stock == 100
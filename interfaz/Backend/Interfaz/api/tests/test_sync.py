@@ -0,0 +1,98 @@
+# backend/api/tests/test_sync.py
+"""
+Las marcas de api/sync.py se numeran en transaction.on_commit, que dentro de
+la transacción de cada test no se ejecuta: se usa
+django_capture_on_commit_callbacks(execute=True) para simular el commit.
+"""
+from contextlib import contextmanager
+
+import pytest
+from django.db import transaction
+
+from api.models import Order, Product, SyncTombstone
+from api.sync import current_change_seq
+
+pytestmark = pytest.mark.django_db
+
+
+class _Rollback(Exception):
+    pass
+
+
+@pytest.fixture
+def committed(django_capture_on_commit_callbacks):
+    """
+    Numera lo escrito en el bloque como si se hubiera confirmado. El savepoint
+    separa su callback: sin él, las marcas siguientes del test se sumarían a
+    ese callback ya ejecutado en lugar de registrar uno nuevo.
+    """
+    @contextmanager
+    def block():
+        with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+            yield
+    return block
+
+
+@pytest.fixture
+def bread(committed):
+    with committed():
+        return Product.objects.create(name='Pan', price=10, stock=100)
+
+
+def test_save_stamps_change_seq(api_client, gerente, bread, django_capture_on_commit_callbacks):
+    cursor = current_change_seq()
+    with django_capture_on_commit_callbacks(execute=True):
+        bread.name = 'Pan casero'
+        bread.save()
+
+    bread.refresh_from_db()
+    assert bread.change_seq > cursor
+    response = api_client(gerente).get('/api/sync/', {'since': cursor})
+    assert response.status_code == 200
+    assert [p['id'] for p in response.data['products']] == [bread.id]
+    assert response.data['cursor'] == bread.change_seq
+
+
+def test_delete_leaves_tombstone(api_client, gerente, committed, django_capture_on_commit_callbacks):
+    with committed():
+        order = Order.objects.create(customer_name='Cliente')
+    order_id = order.id
+    cursor = current_change_seq()
+    with django_capture_on_commit_callbacks(execute=True):
+        order.delete()
+
+    assert SyncTombstone.objects.filter(model='orders', object_id=order_id, change_seq__gt=cursor).exists()
+    response = api_client(gerente).get('/api/sync/', {'since': cursor})
+    assert response.data['deleted']['orders'] == [order_id]
+
+
+def test_rolled_back_changes_leave_no_marks(bread, committed, django_capture_on_commit_callbacks):
+    with committed():
+        cake = Product.objects.create(name='Torta', price=50, stock=10)
+    bread_id = bread.id
+    cursor = current_change_seq()
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        with pytest.raises(_Rollback):
+            with transaction.atomic():
+                bread.delete()
+                raise _Rollback
+        with transaction.atomic():
+            cake.name = 'Torta 2'
+            cake.save()
+            with pytest.raises(_Rollback):
+                with transaction.atomic():
+                    Product.objects.get(pk=bread_id).save()
+                    raise _Rollback
+
+    # Solo sobrevive la marca de la torta: el borrado y el save revertidos no dejan nada pendiente
+    assert len(callbacks) == 1
+    assert not SyncTombstone.objects.filter(model='products', object_id=bread_id).exists()
+    assert Product.objects.get(pk=bread_id).change_seq <= cursor
+    cake.refresh_from_db()
+    assert cake.change_seq > cursor
+
+    # Un commit posterior no arrastra marcas de la transacción revertida
+    with django_capture_on_commit_callbacks(execute=True):
+        cake.save()
+    assert not SyncTombstone.objects.filter(model='products', object_id=bread_id).exists()
@@ -1,4 +1,4 @@
-from rest_framework import viewsets, status, generics
+from rest_framework import viewsets, status, generics, mixins
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, action
@@ -7,10 +7,14 @@ from rest_framework.permissions import SAFE_METHODS, BasePermission
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model, authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import ROLE_CLAIM, tokens_for_user, access_token_for
+from .login_throttle import LoginThrottle, client_ip
+from .sync import changes_since, mark_changed
 from .models import Product, CashMovement, InventoryChange, Sale, UserQuery, Supplier, Role, LowStockReport, RecipeIngredient, LossRecord, Production, ProductionItem
 from .models import ResetToken
 from django.conf import settings
 from django.utils import timezone
+from django.utils.http import parse_etags
 from .serializers import (
     UserSerializer, UserCreateSerializer, ProductSerializer,
     CashMovementSerializer, InventoryChangeSerializer, SaleSerializer,
@@ -23,12 +27,15 @@ from django.db import transaction
 from decimal import Decimal
 from rest_framework.exceptions import ValidationError
 import traceback
+import logging
 import secrets
 import hashlib
 import urllib.request
 import urllib.parse
 import json
-from datetime import timedelta
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
 
 # Función de formateo de fecha para replicar el formato del frontend
 def format_date_for_pdf(date_input):
@@ -37,69 +44,54 @@ def format_date_for_pdf(date_input):
     """
     if not date_input:
         return ''
-    
+
     try:
-        # Debug: imprimir el valor de entrada para depurar
-        print(f"DEBUG - Formatting date: {date_input} (type: {type(date_input)})")
-        
         # Si ya es un objeto datetime, lo usamos directamente
         if hasattr(date_input, 'strftime'):
-            result = date_input.strftime('%Y/%m/%d %H:%M')
-            print(f"DEBUG - Datetime object formatted to: {result}")
-            return result
-        
+            return date_input.strftime('%Y/%m/%d %H:%M')
+
         # Si es una cadena, intentamos parsearla
         if isinstance(date_input, str):
             # Limpiar la cadena de entrada
             date_str = date_input.strip()
-            
-            # Intentamos varios formatos comunes incluyendo ISO 8601
-            from datetime import datetime
-            formats = [
-                '%Y-%m-%dT%H:%M:%S.%fZ',   # ISO 8601 con microsegundos y Z
-                '%Y-%m-%dT%H:%M:%S.%f',    # ISO 8601 con microsegundos
-                '%Y-%m-%dT%H:%M:%SZ',      # ISO 8601 con Z
-                '%Y-%m-%dT%H:%M:%S',       # ISO 8601 básico
-                '%Y-%m-%d %H:%M:%S.%f',    # Con microsegundos
-                '%Y-%m-%d %H:%M:%S',       # Sin microsegundos
-                '%Y-%m-%d',                # Solo fecha
-                '%d/%m/%Y %H:%M',          # DD/MM/YYYY HH:MM
-                '%d/%m/%Y',                # DD/MM/YYYY
-            ]
-            
-            for fmt in formats:
+
+            for fmt in _PDF_DATE_INPUT_FORMATS:
                 try:
-                    dt = datetime.strptime(date_str, fmt)
-                    result = dt.strftime('%Y/%m/%d %H:%M')
-                    print(f"DEBUG - String '{date_str}' parsed with format '{fmt}' and formatted to: {result}")
-                    return result
+                    return datetime.strptime(date_str, fmt).strftime('%Y/%m/%d %H:%M')
                 except ValueError:
                     continue
-            
+
             # Si no se pudo parsear, pero contiene 'T', intentar eliminarla manualmente
             if 'T' in date_str:
                 # Reemplazar T por espacio y eliminar Z al final si existe
                 cleaned = date_str.replace('T', ' ').rstrip('Z')
-                # Eliminar microsegundos si existen
-                if '.' in cleaned:
-                    cleaned = cleaned.split('.')[0]
-                
+                # Eliminar microsegundos y zona horaria si existen
+                cleaned = cleaned.split('.')[0].split('+')[0]
                 try:
-                    dt = datetime.strptime(cleaned, '%Y-%m-%d %H:%M:%S')
-                    result = dt.strftime('%Y/%m/%d %H:%M')
-                    print(f"DEBUG - Manual T replacement: '{cleaned}' formatted to: {result}")
-                    return result
+                    return datetime.strptime(cleaned, '%Y-%m-%d %H:%M:%S').strftime('%Y/%m/%d %H:%M')
                 except ValueError:
                     pass
-        
+
         # Si nada funciona, retornamos la entrada como string
-        print(f"DEBUG - Could not parse date, returning as string: {date_input}")
         return str(date_input)
-        
-    except Exception as e:
-        print(f"DEBUG - Exception formatting date {date_input}: {e}")
+
+    except Exception:
         return str(date_input)
 
+
+# Formatos aceptados por format_date_for_pdf, en orden (el primero es el que genera api/reports.py)
+_PDF_DATE_INPUT_FORMATS = (
+    '%Y-%m-%dT%H:%M:%S',       # ISO 8601 básico
+    '%Y-%m-%dT%H:%M:%S.%fZ',   # ISO 8601 con microsegundos y Z
+    '%Y-%m-%dT%H:%M:%S.%f',    # ISO 8601 con microsegundos
+    '%Y-%m-%dT%H:%M:%SZ',      # ISO 8601 con Z
+    '%Y-%m-%d %H:%M:%S.%f',    # Con microsegundos
+    '%Y-%m-%d %H:%M:%S',       # Sin microsegundos
+    '%Y-%m-%d',                # Solo fecha
+    '%d/%m/%Y %H:%M',          # DD/MM/YYYY HH:MM
+    '%d/%m/%Y',                # DD/MM/YYYY
+)
+
 # Permiso personalizado para rol de Gerente
 class IsGerente(BasePermission):
     """
@@ -115,6 +107,125 @@ class CurrentUserView(APIView):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 
+
+class CurrentUserStatusView(APIView):
+    """
+    Estado mínimo de la cuenta para el sondeo periódico del frontend.
+
+    No serializa el usuario ni consulta el rol: responde con el estado de
+    bloqueo y un ETag basado en User.status_version. Si el cliente envía el
+    mismo ETag en If-None-Match se devuelve 304 sin cuerpo. Un usuario dado de
+    baja ya no pasa la autenticación JWT y recibe 401.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        etag = f'"{user.pk}-{user.status_version}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response({
+            'id': user.pk,
+            'is_active': user.is_active,
+            'is_locked': user.is_locked,
+            'lock_type': user.lock_type,
+            'status_version': user.status_version,
+        }, headers=headers)
+
+
+class ProductionFeasibilityView(APIView):
+    """
+    Máximo producible y faltantes de insumos para un conjunto de productos,
+    sin tomar locks ni modificar stock (ver api/feasibility.py).
+    Formato: {"productions": [{"product_id": 1, "quantity_produced": 10}], "expand": false}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        from .feasibility import production_feasibility
+        from .services import whole_units
+
+        productions = request.data.get('productions') or []
+        if not isinstance(productions, list) or not productions:
+            return Response({'error': 'No se proporcionaron producciones'}, status=status.HTTP_400_BAD_REQUEST)
+        lines = []
+        for item in productions:
+            try:
+                product_id = int(item.get('product_id'))
+                quantity = item.get('quantity_produced', item.get('quantity', 0))
+            except (AttributeError, TypeError, ValueError):
+                return Response({'error': f'Línea de producción inválida: {item}'}, status=status.HTTP_400_BAD_REQUEST)
+            # Mismas unidades enteras que acepta el lote de producción: NaN, Infinity y 2.5 son 400
+            try:
+                units = whole_units(quantity, product_id)
+            except ValidationError as e:
+                return Response({'error': e.detail[0]}, status=status.HTTP_400_BAD_REQUEST)
+            lines.append((product_id, Decimal(units)))
+
+        try:
+            result = production_feasibility(lines, expand=bool(request.data.get('expand')))
+        except LookupError as e:
+            return Response({'error': f'Producto con ID {e.args[0]} no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(result)
+
+
+class MaterialPlanView(APIView):
+    """
+    Plan de producción y faltantes de insumos por proveedor a partir de los
+    pedidos abiertos (ver api/mrp.py). Parámetros: `?bucket=day|week` y
+    `?days=<n>` para limitar el horizonte a los próximos n días.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from .bom import RecipeCycleError
+        from .mrp import BUCKETS, material_plan
+
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in BUCKETS:
+            return Response({'error': f'bucket debe ser uno de: {", ".join(BUCKETS)}'}, status=status.HTTP_400_BAD_REQUEST)
+        days = request.query_params.get('days')
+        if days not in (None, ''):
+            try:
+                days = int(days)
+            except ValueError:
+                days = -1
+            if days < 0:
+                return Response({'error': 'days debe ser un entero no negativo'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            days = None
+
+        try:
+            return Response(material_plan(bucket=bucket, horizon_days=days))
+        except RecipeCycleError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+
+
+class SyncView(APIView):
+    """
+    Cambios de productos (stock y receta), pedidos y reportes de faltantes
+    posteriores a `?since=<cursor>` (ver api/sync.py). Sin cursor devuelve el
+    estado completo; la respuesta trae el `cursor` para el próximo pedido y los
+    ids borrados en `deleted`. Los reportes de faltantes solo se envían al Gerente.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since in (None, ''):
+            since = None
+        else:
+            try:
+                since = int(since)
+            except ValueError:
+                return Response({'error': 'El parámetro since debe ser un número entero'}, status=status.HTTP_400_BAD_REQUEST)
+        include_reports = IsGerente().has_permission(request, self)
+        payload = changes_since(since, include_low_stock_reports=bool(include_reports), context={'request': request})
+        return Response(payload, headers={'Cache-Control': 'private, no-cache'})
+
 class IsCajeroOrPanadero(BasePermission):
     """
     Custom permission to only allow users with the 'Cajero' or 'Panadero' role.
@@ -224,12 +335,19 @@ from .models import Purchase
 from .serializers import PurchaseSerializer
 from .models import Order
 from .serializers import OrderSerializer
+from .reports import build_report, check_report_access, ReportFilterError, ReportPermissionError
+from .report_jobs import enqueue_report
+from .exports import EXPORT_FORMATS, export_rows, stream_csv, stream_xlsx
+from .models import ReportJob
+from .serializers import ReportJobSerializer
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Flowable
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
 from io import BytesIO
+from xml.sax.saxutils import escape as xml_escape
 import json
 from decimal import Decimal
 
@@ -264,21 +382,26 @@ def login_view(request):
     # Normalizamos email para búsqueda (case-insensitive)
     email_normalizado = email.strip().lower()
 
+    # Los contadores de fallos se consultan antes de tocar la base o calcular el hash
+    throttle = LoginThrottle(email_normalizado, client_ip(request))
+    retry_after = throttle.blocked_for()
+    if retry_after:
+        response = Response({
+            'success': False,
+            'error': {
+                'code': 'too_many_attempts',
+                'message': 'Demasiados intentos de inicio de sesión. Intente nuevamente más tarde.',
+                'retry_after': retry_after
+            }
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(retry_after)
+        return response
+
     try:
-        # DEBUG: mostrar información no sensible para rastrear errores 500
-        try:
-            print(f"[login_view][DEBUG] request.data keys={list(request.data.keys())}")
-        except Exception:
-            print("[login_view][DEBUG] request.data could not be listed")
-        user = User.objects.filter(email__iexact=email_normalizado).first()
-        print(f"[login_view][DEBUG] email_normalizado={email_normalizado} user_found={bool(user)}")
-        if user:
-            try:
-                print(f"[login_view][DEBUG] user.id={user.id} is_active={getattr(user, 'is_active', None)} role={getattr(user, 'role', None)}")
-                print(f"[login_view][DEBUG] has_failed_login_attempts={hasattr(user, 'failed_login_attempts')} has_is_locked={hasattr(user, 'is_locked')} has_locked_at={hasattr(user, 'locked_at')}")
-            except Exception:
-                print("[login_view][DEBUG] could not inspect user attributes")
+        user = User.objects.select_related('role').filter(email__iexact=email_normalizado).first()
+        logger.debug('login_view user_found=%s user_id=%s', bool(user), user.id if user else None)
         if not user:
+            throttle.record_failure()
             return Response({
                 'success': False,
                 'error': {
@@ -296,75 +419,37 @@ def login_view(request):
                 }
             }, status=status.HTTP_403_FORBIDDEN)
 
-        # Verificar si la cuenta está bloqueada (con manejo de campos que pueden no existir)
-        try:
-            if hasattr(user, 'is_locked') and user.is_locked:
-                # Refrescar desde la BD para asegurar que tenemos el valor más reciente
-                user.refresh_from_db()
-                failed_attempts = getattr(user, 'failed_login_attempts', 5)
-                lock_type = getattr(user, 'lock_type', None)
-                print(f"🔍 DEBUG - Usuario: {user.username}, is_locked: {user.is_locked}, lock_type RAW: '{lock_type}' (tipo: {type(lock_type)})")
-                # Asegurar que lock_type nunca sea None
-                if lock_type is None or lock_type == '':
-                    print(f"⚠️ lock_type era None/vacío, cambiando a 'automatic'")
-                    lock_type = 'automatic'
-                print(f"📤 Enviando lock_type al frontend: '{lock_type}'")
-                return Response({
-                    'success': False,
-                    'error': {
-                        'code': 'account_locked',
-                        'message': 'La cuenta está bloqueada por múltiples intentos fallidos. Contacte al administrador.',
-                        'failed_attempts': failed_attempts,
-                        'max_attempts': 5,
-                        'lock_type': lock_type
-                    }
-                }, status=status.HTTP_403_FORBIDDEN)
-        except AttributeError:
-            pass  # Los campos de bloqueo no existen todavía
+        max_attempts = throttle.max_failures
+        if user.is_locked:
+            lock_type = user.lock_type or 'automatic'
+            logger.debug('login_view cuenta bloqueada user_id=%s lock_type=%s', user.id, lock_type)
+            return Response({
+                'success': False,
+                'error': {
+                    'code': 'account_locked',
+                    'message': 'La cuenta está bloqueada por múltiples intentos fallidos. Contacte al administrador.',
+                    'failed_attempts': user.failed_login_attempts or max_attempts,
+                    'max_attempts': max_attempts,
+                    'lock_type': lock_type
+                }
+            }, status=status.HTTP_403_FORBIDDEN)
 
         if not user.check_password(password):
-            # Incrementar intentos fallidos (con manejo de campos que pueden no existir)
-            message = 'Credenciales inválidas.'
-            failed_attempts = 0
-            max_attempts = 5
-            
-            try:
-                if hasattr(user, 'failed_login_attempts'):
-                    user.failed_login_attempts = getattr(user, 'failed_login_attempts', 0) + 1
-                    failed_attempts = user.failed_login_attempts
-                    
-                    if user.failed_login_attempts >= max_attempts:
-                        if hasattr(user, 'is_locked'):
-                            user.is_locked = True
-                        if hasattr(user, 'locked_at'):
-                            user.locked_at = timezone.now()
-                        if hasattr(user, 'lock_type'):
-                            user.lock_type = 'automatic'
-                    
-                    # Construir lista de campos que realmente existen
-                    fields_to_update = []
-                    if hasattr(user, 'failed_login_attempts'):
-                        fields_to_update.append('failed_login_attempts')
-                    if hasattr(user, 'is_locked'):
-                        fields_to_update.append('is_locked')
-                    if hasattr(user, 'locked_at'):
-                        fields_to_update.append('locked_at')
-                    if hasattr(user, 'lock_type'):
-                        fields_to_update.append('lock_type')
-                    
-                    if fields_to_update:
-                        user.save(update_fields=fields_to_update)
-                    
-                    remaining_attempts = max_attempts - user.failed_login_attempts
-                    if remaining_attempts > 0:
-                        message = f'Credenciales inválidas. Te quedan {remaining_attempts} intentos.'
-                    else:
-                        message = 'Cuenta bloqueada por múltiples intentos fallidos. Contacte al administrador.'
-            except Exception as e:
-                # Si falla, simplemente continuar sin tracking de intentos
-                print(f"[login_view] No se pudo actualizar intentos fallidos: {e}")
-                message = 'Credenciales inválidas.'
-            
+            # El fallo solo se cuenta en el caché; la base se escribe únicamente al bloquear la cuenta
+            failed_attempts = min(throttle.record_failure(), max_attempts)
+            remaining_attempts = max_attempts - failed_attempts
+            if remaining_attempts > 0:
+                message = f'Credenciales inválidas. Te quedan {remaining_attempts} intentos.'
+            else:
+                user.failed_login_attempts = failed_attempts
+                user.is_locked = True
+                user.locked_at = timezone.now()
+                user.lock_type = 'automatic'
+                user.save(update_fields=['failed_login_attempts', 'is_locked', 'locked_at', 'lock_type'])
+                user.bump_status_version()
+                throttle.reset()
+                message = 'Cuenta bloqueada por múltiples intentos fallidos. Contacte al administrador.'
+
             return Response({
                 'success': False,
                 'error': {
@@ -375,24 +460,13 @@ def login_view(request):
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Credenciales correctas -> resetear intentos fallidos y generar tokens
-        try:
-            fields_to_update = []
-            if hasattr(user, 'failed_login_attempts') and getattr(user, 'failed_login_attempts', 0) != 0:
-                user.failed_login_attempts = 0
-                fields_to_update.append('failed_login_attempts')
-            if hasattr(user, 'is_locked') and getattr(user, 'is_locked', False):
-                user.is_locked = False
-                fields_to_update.append('is_locked')
-            if hasattr(user, 'locked_at') and getattr(user, 'locked_at', None) is not None:
-                user.locked_at = None
-                fields_to_update.append('locked_at')
-            if fields_to_update:
-                user.save(update_fields=fields_to_update)
-        except (AttributeError, Exception):
-            pass  # Los campos de bloqueo no existen todavía
-        refresh = RefreshToken.for_user(user)
-        role_name = user.role.name if getattr(user, 'role', None) else None
+        # Credenciales correctas -> olvidar los intentos fallidos y generar tokens
+        throttle.reset()
+        if user.failed_login_attempts:
+            user.failed_login_attempts = 0
+            user.save(update_fields=['failed_login_attempts'])
+        refresh = tokens_for_user(user)
+        role_name = refresh[ROLE_CLAIM]
 
         # Setear refresh token en cookie HttpOnly para cross-browser persistence
         response = Response({
@@ -434,8 +508,7 @@ def login_view(request):
 
     except Exception as e:
         # Log completo para depuración (no retornar stacktrace al cliente)
-        print("[login_view] Error inesperado:")
-        traceback.print_exc()
+        logger.exception('login_view: error inesperado')
         return Response({
             'success': False,
             'error': {
@@ -476,7 +549,7 @@ def refresh_from_cookie(request):
 
         # Validar existencia y estado del usuario antes de devolver access
         try:
-            user = User.objects.get(pk=user_id)
+            user = User.objects.select_related('role').get(pk=user_id)
             if not getattr(user, 'is_active', True):
                 response = Response({'access': None, 'detail': 'Usuario inactivo'}, status=status.HTTP_200_OK)
                 response.delete_cookie('refresh_token', path='/')
@@ -487,13 +560,8 @@ def refresh_from_cookie(request):
             return response
 
         # Si el usuario existe y está activo, devolver access token y rol
-        new_access = str(refresh.access_token)
-        user_role = None
-        try:
-            user_role = user.role.name if user.role else None
-        except Exception:
-            user_role = None
-        return Response({'access': new_access, 'role': user_role}, status=status.HTTP_200_OK)
+        new_access = access_token_for(refresh, user)
+        return Response({'access': str(new_access), 'role': new_access[ROLE_CLAIM]}, status=status.HTTP_200_OK)
     except Exception as e:
         print('[refresh_from_cookie] Error:', e)
         response = Response({'access': None, 'detail': 'Refresh token inválido o error interno'}, status=status.HTTP_200_OK)
@@ -790,6 +858,7 @@ class UserViewSet(viewsets.ModelViewSet):
         # Eliminación lógica en lugar de física
         instance.is_active = False
         instance.save()
+        instance.bump_status_version()
         return Response({'message': 'Usuario desactivado correctamente'}, status=status.HTTP_200_OK)
     
     @action(detail=True, methods=['post'], permission_classes=[IsGerente])
@@ -804,6 +873,8 @@ class UserViewSet(viewsets.ModelViewSet):
         user.locked_at = None
         user.lock_type = None
         user.save(update_fields=['is_locked', 'failed_login_attempts', 'locked_at', 'lock_type'])
+        user.bump_status_version()
+        LoginThrottle(user.email).reset()
         print(f"🔓 Usuario desbloqueado: {user.username}, is_locked={user.is_locked}, lock_type={user.lock_type}")
         return Response({
             'message': f'Usuario {user.username} desbloqueado correctamente.',
@@ -821,6 +892,7 @@ class UserViewSet(viewsets.ModelViewSet):
         user.locked_at = timezone.now()
         user.lock_type = 'manual'
         user.save(update_fields=['is_locked', 'locked_at', 'lock_type'])
+        user.bump_status_version()
         print(f"🔒 Usuario bloqueado: {user.username}, lock_type={user.lock_type}")
         return Response({
             'message': f'Usuario {user.username} bloqueado correctamente.',
@@ -850,6 +922,45 @@ class ProductViewSet(viewsets.ModelViewSet):
         # Manejar partial_update (PATCH) correctamente
         return super().partial_update(request, *args, **kwargs)
     
+    @action(detail=True, methods=['get'])
+    def bom(self, request, pk=None):
+        """
+        Insumos por unidad del producto: los de su receta (`direct`) y los
+        expandidos a través de las sub-recetas (`flat`), con el costo de materiales
+        estimado a partir del precio de cada insumo.
+        """
+        from .bom import RecipeCycleError, resolve_boms
+
+        product = self.get_object()
+        try:
+            bom = resolve_boms([product.pk])[product.pk]
+        except RecipeCycleError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        ingredients = Product.objects.only('id', 'name', 'unit', 'price').in_bulk(set(bom.direct) | set(bom.flat))
+
+        def rows(vector):
+            return [
+                {
+                    'ingredient': iid,
+                    'name': ingredients[iid].name,
+                    'unit': ingredients[iid].unit,
+                    'quantity_per_unit': float(per_unit),
+                }
+                for iid, per_unit in vector.items() if iid in ingredients
+            ]
+
+        material_cost = sum(
+            (per_unit * ingredients[iid].price for iid, per_unit in bom.flat.items() if iid in ingredients),
+            Decimal('0'),
+        )
+        return Response({
+            'product': product.pk,
+            'recipe_yield': product.recipe_yield,
+            'direct': rows(bom.direct),
+            'flat': rows(bom.flat),
+            'material_cost_per_unit': float(material_cost),
+        })
+
     @action(detail=True, methods=['patch', 'put'])
     def update_loss_rate(self, request, pk=None):
         """Endpoint específico para actualizar solo loss_rate"""
@@ -864,6 +975,7 @@ class ProductViewSet(viewsets.ModelViewSet):
                 
                 # Forzar actualización usando update() para asegurar persistencia
                 Product.objects.filter(id=product.id).update(loss_rate=loss_rate)
+                mark_changed('products', [product.id])
                 
                 # Recargar el objeto para verificar que se guardó
                 product.refresh_from_db()
@@ -946,8 +1058,25 @@ class RecipeIngredientViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         # Obtener el product_id de los datos de la request
         product_id = self.request.data.get('product')
+        _check_recipe_cycle(product_id, [serializer.validated_data['ingredient'].pk])
         serializer.save(product_id=product_id)
 
+    def perform_update(self, serializer):
+        ingredient = serializer.validated_data.get('ingredient')
+        if ingredient is not None:
+            _check_recipe_cycle(serializer.instance.product_id, [ingredient.pk])
+        serializer.save()
+
+
+def _check_recipe_cycle(product_id, ingredient_ids):
+    """Rechaza con 400 un insumo que ya contiene (directa o indirectamente) al producto."""
+    from .bom import ensure_acyclic
+
+    try:
+        ensure_acyclic(product_id, ingredient_ids)
+    except ValueError as e:
+        raise ValidationError({'detail': str(e)})
+
 # Vista específica para obtener ingredientes con unidad sugerida para recetas
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -1021,9 +1150,10 @@ class IsGerenteOrEncargadoForLoss(BasePermission):
 class LossRecordViewSet(viewsets.ModelViewSet):
     serializer_class = LossRecordSerializer
     permission_classes = [IsAuthenticated, IsGerenteOrEncargadoForLoss]
+    cursor_ordering = ('-timestamp', '-id')
 
     def get_queryset(self):
-        return LossRecord.objects.all().order_by('-timestamp')
+        return LossRecord.objects.select_related('product', 'user').order_by('-timestamp')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -1357,9 +1487,10 @@ class PurchaseViewSet(viewsets.ModelViewSet):
 
 # ViewSet para pedidos de clientes
 class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.all()
+    queryset = Order.objects.select_related('user').prefetch_related('items')
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-fecha_de_orden_del_pedido', '-id')
 
     def perform_create(self, serializer):
         try:
@@ -1371,33 +1502,23 @@ class OrderViewSet(viewsets.ModelViewSet):
 
 # ViewSet para la gestión de movimientos de caja (CRUD)
 class CashMovementViewSet(viewsets.ModelViewSet):
-    queryset = CashMovement.objects.all()
+    queryset = CashMovement.objects.select_related('user')
     serializer_class = CashMovementSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-timestamp', '-id')
 
     def perform_create(self, serializer):
-        try:
-            # Log minimal info for diagnostics (no token values)
-            data = serializer.validated_data
-            print(f"[CashMovementViewSet.perform_create] Creating movement user={self.request.user if self.request.user.is_authenticated else 'Anonymous'} type={data.get('type')} amount={data.get('amount')}")
-        except Exception as e:
-            print(f"[CashMovementViewSet.perform_create] Error reading validated_data: {e}")
+        data = serializer.validated_data
+        logger.debug('CashMovement create user_id=%s type=%s amount=%s',
+                     self.request.user.pk, data.get('type'), data.get('amount'))
         serializer.save(user=self.request.user)
 
-    # Override list to add debug logging for incoming requests
-    def list(self, request, *args, **kwargs):
-        try:
-            has_cookie = 'refresh_token' in request.COOKIES
-            print(f"[CashMovementViewSet.list] Request received. user={request.user if request.user.is_authenticated else 'Anonymous'}, refresh_cookie_present={has_cookie}")
-        except Exception as e:
-            print(f"[CashMovementViewSet.list] Error checking cookies: {e}")
-        return super().list(request, *args, **kwargs)
-
 # ViewSet para la gestión de cambios de inventario (CRUD)
 class InventoryChangeViewSet(viewsets.ModelViewSet):
-    queryset = InventoryChange.objects.all()
+    queryset = InventoryChange.objects.select_related('user')
     serializer_class = InventoryChangeSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-timestamp', '-id')
 
     def perform_create(self, serializer):
         # Realizar la operación de cambio de inventario de forma atómica
@@ -1469,9 +1590,10 @@ class InventoryChangeViewSet(viewsets.ModelViewSet):
 
 # ViewSet para auditoría de cambios de inventario (solo lectura)
 class InventoryChangeAuditViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = getattr(__import__('api.models', fromlist=['InventoryChangeAudit']), 'InventoryChangeAudit').objects.all()
+    queryset = getattr(__import__('api.models', fromlist=['InventoryChangeAudit']), 'InventoryChangeAudit').objects.select_related('user', 'product')
     serializer_class = InventoryChangeAuditSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-timestamp', '-id')
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -1495,24 +1617,103 @@ class InventoryChangeAuditViewSet(viewsets.ReadOnlyModelViewSet):
 
         return qs
 
+# Máximo de ventas aceptadas en un único POST /api/sales/batch/
+SALE_BATCH_MAX_SIZE = 1000
+
 # ViewSet para la gestión de ventas (CRUD)
 class SaleViewSet(viewsets.ModelViewSet):
-    queryset = Sale.objects.all()
+    queryset = Sale.objects.select_related('user').prefetch_related('saleitem_set__product')
     serializer_class = SaleSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-timestamp', '-id')
 
     def perform_create(self, serializer):
         # El serializer ya maneja la lógica de actualización de stock
+        sale = serializer.save(user=self.request.user)
+        logger.debug('Venta %s registrada user_id=%s total=%s', sale.id, self.request.user.pk, sale.total_amount)
+
+    def perform_update(self, serializer):
+        # Las tablas de resumen se corrigen en la misma transacción: sale la versión anterior, entra la nueva
+        from .rollups import record_sale, sale_lines
+
+        with transaction.atomic():
+            lines = sale_lines(serializer.instance)
+            record_sale(serializer.instance, lines, sign=-1)
+            sale = serializer.save()
+            record_sale(sale, lines)
+
+    def perform_destroy(self, instance):
+        from .rollups import record_sale, sale_lines
+
+        with transaction.atomic():
+            record_sale(instance, sale_lines(instance), sign=-1)
+            instance.delete()
+
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch_create(self, request):
+        """
+        Endpoint para registrar ventas encoladas por cajas sin conexión.
+        Formato esperado:
+        {
+            "sales": [
+                {"idempotency_key": "caja1-0001", "total_amount": 26, "payment_method": "Efectivo",
+                 "items": [{"product_id": 1, "quantity": 2, "price": 10}]}
+            ]
+        }
+        Los reintentos con la misma idempotency_key no duplican la venta ni el descuento de stock.
+        """
+        from .services import ingest_sale_batch
+
+        sales_data = request.data.get('sales', [])
+        if not isinstance(sales_data, list) or not sales_data:
+            return Response({'error': 'No se proporcionaron ventas'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(sales_data) > SALE_BATCH_MAX_SIZE:
+            return Response(
+                {'error': f'Se permiten como máximo {SALE_BATCH_MAX_SIZE} ventas por lote'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = ingest_sale_batch(sales_data, request.user)
+        summary = {
+            'created': sum(1 for r in results if r['status'] == 'created'),
+            'duplicate': sum(1 for r in results if r['status'] == 'duplicate'),
+            'error': sum(1 for r in results if r['status'] == 'error'),
+        }
+        return Response({'summary': summary, 'results': results}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='summary')
+    def summary(self, request):
+        """
+        Resumen de ventas calculado desde las tablas de resumen diarias.
+        Parámetros: ?start=YYYY-MM-DD&end=YYYY-MM-DD&group_by=day|month|product|payment_method
+        Por defecto devuelve los últimos 30 días agrupados por día.
+        """
+        from django.utils.dateparse import parse_date
+        from .rollups import sales_summary, SUMMARY_GROUPS
+
+        group_by = request.query_params.get('group_by', 'day')
+        if group_by not in SUMMARY_GROUPS:
+            return Response(
+                {'error': f"group_by debe ser uno de: {', '.join(SUMMARY_GROUPS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
-            # Log minimal sale info for debugging
-            incoming = serializer.validated_data
-            total = incoming.get('total_amount')
-            items = incoming.get('items')
-            print(f"[SaleViewSet.perform_create] Creating sale user={self.request.user.username if self.request.user.is_authenticated else 'Anonymous'} total={total} items_count={len(items) if items else 0}")
-        except Exception as e:
-            print(f"[SaleViewSet.perform_create] Error reading validated_data: {e}")
-        serializer.save(user=self.request.user)
-        print(f'🛒 Venta registrada por usuario: {self.request.user.username}')
+            end = parse_date(request.query_params.get('end') or '') or timezone.localdate()
+            start = parse_date(request.query_params.get('start') or '') or (end - timedelta(days=30))
+        except ValueError:
+            return Response({'error': 'Fechas inválidas, use el formato YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'start debe ser anterior o igual a end'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = sales_summary(start, end, group_by)
+        return Response({
+            'start': start,
+            'end': end,
+            'group_by': group_by,
+            'totals': result['totals'],
+            'rows': result['rows'],
+        })
 
 # ViewSet para la gestión de consultas de usuario
 class UserQueryViewSet(viewsets.ModelViewSet):
@@ -1591,6 +1792,7 @@ class UserQueryViewSet(viewsets.ModelViewSet):
 class ProductionViewSet(viewsets.ModelViewSet):
     serializer_class = __import__('api.serializers', fromlist=['ProductionSerializer']).ProductionSerializer
     permission_classes = [IsAuthenticated, IsGerente]
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         Production = __import__('api.models', fromlist=['Production']).Production
@@ -1607,7 +1809,12 @@ class ProductionViewSet(viewsets.ModelViewSet):
                 {"product_id": 2, "quantity_produced": 5}
             ]
         }
+        El consumo de cada insumo incluye su `loss_rate` (por defecto 2%), igual
+        que en la producción individual y en /api/production/feasibility/.
         """
+        from rest_framework.exceptions import NotFound
+        from .services import commit_production_batch
+
         productions_data = request.data.get('productions', [])
         
         if not productions_data:
@@ -1616,450 +1823,364 @@ class ProductionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        Production = __import__('api.models', fromlist=['Production']).Production
-        ProductionItem = __import__('api.models', fromlist=['ProductionItem']).ProductionItem
-        Product = __import__('api.models', fromlist=['Product']).Product
-        RecipeIngredient = __import__('api.models', fromlist=['RecipeIngredient']).RecipeIngredient
-
         try:
-            with transaction.atomic():
-                # Crear el registro de producción principal
-                total_units = sum(item.get('quantity_produced', 0) for item in productions_data)
-                production = Production.objects.create(
-                    user=request.user,
-                    total_units=total_units
-                )
-
-                # Contador para verificar que se crea al menos un item
-                items_created = 0
-                
-                # Listas para rastrear cambios en inventario
-                ingredients_changes = {}  # Para insumos usados totales (agregados por nombre)
-                products_changes = []  # Para productos creados con sus insumos específicos
-
-                # Crear los items individuales y actualizar stock
-                for item_data in productions_data:
-                    product_id = item_data.get('product_id')
-                    quantity = item_data.get('quantity_produced', 0)
-
-                    if not product_id or quantity <= 0:
-                        continue
-
-                    try:
-                        product = Product.objects.get(id=product_id)
-                        
-                        # Obtener la receta del producto
-                        recipe_ingredients = RecipeIngredient.objects.filter(product=product)
-                        
-                        # Función para formatear cantidad según unidad
-                        def format_quantity_with_unit(quantity, unit):
-                            quantity = Decimal(str(quantity))
-                            if unit == 'g':
-                                # Convertir gramos a kilogramos
-                                kg = quantity / 1000
-                                return f"{kg:.2f} Kg"
-                            elif unit == 'ml':
-                                # Convertir mililitros a litros
-                                liters = quantity / 1000
-                                return f"{liters:.2f} L"
-                            elif unit == 'u':
-                                # Unidades
-                                return f"{quantity:.0f} U"
-                            else:
-                                # Por defecto, mostrar sin conversión
-                                return f"{quantity:.2f} {unit}"
-                        
-                        # Verificar que hay suficientes insumos antes de producir
-                        insufficient_ingredients = []
-                        for recipe_item in recipe_ingredients:
-                            ingredient = recipe_item.ingredient
-                            # Calcular cantidad necesaria considerando el rendimiento de la receta
-                            recipe_yield = product.recipe_yield if product.recipe_yield else 1
-                            quantity_needed = (Decimal(str(recipe_item.quantity)) * Decimal(str(quantity))) / Decimal(str(recipe_yield))
-                            
-                            if ingredient.stock < quantity_needed:
-                                # Agregar a la lista de insuficientes
-                                needed_formatted = format_quantity_with_unit(quantity_needed, recipe_item.unit)
-                                available_formatted = format_quantity_with_unit(ingredient.stock, recipe_item.unit)
-                                insufficient_ingredients.append(
-                                    f"{ingredient.name}: Necesario {needed_formatted}, Disponible {available_formatted}"
-                                )
-                        
-                        # Si hay insumos insuficientes, devolver error con todos los detalles
-                        if insufficient_ingredients:
-                            error_message = "Stock insuficiente de los siguientes insumos:\n" + "\n".join(insufficient_ingredients)
-                            return Response(
-                                {'error': error_message},
-                                status=status.HTTP_400_BAD_REQUEST
-                            )
-                        
-                        # Guardar stock previo del producto antes de actualizar
-                        product_stock_before = Decimal(str(product.stock))
-                        
-                        # Lista de insumos usados para ESTE producto específico
-                        product_ingredients_used = []
-                        
-                        # Descontar insumos de la receta
-                        for recipe_item in recipe_ingredients:
-                            ingredient = recipe_item.ingredient
-                            recipe_yield = product.recipe_yield if product.recipe_yield else 1
-                            quantity_needed = (Decimal(str(recipe_item.quantity)) * Decimal(str(quantity))) / Decimal(str(recipe_yield))
-                            
-                            # Guardar stock previo del ingrediente
-                            ingredient_stock_before = Decimal(str(ingredient.stock))
-                            
-                            # Descontar del stock del ingrediente
-                            ingredient.stock = Decimal(str(ingredient.stock)) - quantity_needed
-                            ingredient.save()
-                            
-                            # Información del ingrediente usado para ESTE producto
-                            ingredient_info = {
-                                'name': ingredient.name,
-                                'quantity_used': float(quantity_needed),
-                                'unit': recipe_item.unit,
-                                'formatted_used': format_quantity_with_unit(quantity_needed, recipe_item.unit)
-                            }
-                            product_ingredients_used.append(ingredient_info)
-                            
-                            # Acumular en el diccionario de totales
-                            if ingredient.name not in ingredients_changes:
-                                ingredients_changes[ingredient.name] = {
-                                    'name': ingredient.name,
-                                    'stock_before': float(ingredient_stock_before),
-                                    'quantity_used': float(quantity_needed),
-                                    'stock_after': float(ingredient.stock),
-                                    'unit': recipe_item.unit,
-                                    'formatted_before': format_quantity_with_unit(ingredient_stock_before, recipe_item.unit),
-                                    'formatted_used': format_quantity_with_unit(quantity_needed, recipe_item.unit),
-                                    'formatted_after': format_quantity_with_unit(ingredient.stock, recipe_item.unit)
-                                }
-                            else:
-                                # Si ya existe, sumar la cantidad usada
-                                ingredients_changes[ingredient.name]['quantity_used'] += float(quantity_needed)
-                                ingredients_changes[ingredient.name]['stock_after'] = float(ingredient.stock)
-                                ingredients_changes[ingredient.name]['formatted_used'] = format_quantity_with_unit(
-                                    ingredients_changes[ingredient.name]['quantity_used'], 
-                                    recipe_item.unit
-                                )
-                                ingredients_changes[ingredient.name]['formatted_after'] = format_quantity_with_unit(
-                                    ingredient.stock, 
-                                    recipe_item.unit
-                                )
-                        
-                        # Crear el item de producción
-                        ProductionItem.objects.create(
-                            production=production,
-                            product=product,
-                            quantity=quantity
-                        )
-                        items_created += 1
-
-                        # Actualizar el stock del producto
-                        product.stock = Decimal(str(product.stock)) + Decimal(str(quantity))
-                        product.save()
-                        
-                        # Registrar el cambio en el producto CON sus insumos específicos
-                        products_changes.append({
-                            'name': product.name,
-                            'stock_before': float(product_stock_before),
-                            'quantity_produced': float(quantity),
-                            'stock_after': float(product.stock),
-                            'unit': 'u',
-                            'ingredients_used': product_ingredients_used  # Insumos específicos de este producto
-                        })
-
-                    except Product.DoesNotExist:
-                        return Response(
-                            {'error': f'Producto con ID {product_id} no encontrado'},
-                            status=status.HTTP_404_NOT_FOUND
-                        )
-
-                # Validar que se haya creado al menos un item
-                if items_created == 0:
-                    return Response(
-                        {'error': 'No se crearon items de producción. Verifique que los productos y cantidades sean válidos.'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                # Retornar el registro creado con información detallada de cambios
-                serializer = self.get_serializer(production)
-                response_data = serializer.data
-                response_data['changes'] = {
-                    'ingredients': list(ingredients_changes.values()),  # Convertir diccionario a lista
-                    'products': products_changes
-                }
-                return Response(response_data, status=status.HTTP_201_CREATED)
-
+            production, changes = commit_production_batch(request.user, productions_data)
+        except NotFound as e:
+            return Response({'error': str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+        except ValidationError as e:
+            return Response({'error': str(e.detail[0])}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {'error': f'Error al crear la producción: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        # Retornar el registro creado con información detallada de cambios
+        production = self.get_queryset().get(pk=production.pk)
+        response_data = self.get_serializer(production).data
+        response_data['changes'] = changes
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+# ---------------------- Estilos de los reportes PDF
+# Se construyen una sola vez al importar el módulo y se reutilizan en cada reporte.
+_PDF_STYLES = getSampleStyleSheet()
+_PDF_TITLE_STYLE = ParagraphStyle('CustomTitle', parent=_PDF_STYLES['Heading1'], fontSize=16, spaceAfter=30, alignment=1)
+_PDF_NO_DATA_STYLE = ParagraphStyle('NoData', parent=_PDF_STYLES['Normal'], fontSize=12, alignment=1)
+_PDF_CELL_STYLE = ParagraphStyle('ReportCell', parent=_PDF_STYLES['Normal'], fontSize=8)
+_PDF_SUPPLIER_CELL_STYLE = ParagraphStyle(
+    'CellStyle', parent=_PDF_STYLES['Normal'], fontSize=7, alignment=1, wordWrap='CJK',
+    leftIndent=2, rightIndent=2, spaceAfter=2,
+)
+
+_PDF_SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,-1), colors.lightgrey),
+    ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
+    ('INNERGRID', (0,0), (-1,-1), 0.25, colors.white),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('FONTSIZE', (0,0), (-1,-1), 10),
+])
+_PDF_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+_PDF_CASH_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+])
+_PDF_SUPPLIERS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 9),
+    ('FONTSIZE', (0, 1), (-1, -1), 7),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADDING', (0, 1), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
+    ('LEFTPADDING', (0, 0), (-1, -1), 3),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.lightgrey])
+])
+
+# Filas de datos por tabla: cada bloque entra aproximadamente en una página A4,
+# así ReportLab maqueta muchas tablas chicas (costo lineal) en lugar de una gigante.
+PDF_TABLE_CHUNK_ROWS = 40
+
+_CASH_COL_WIDTHS = [30, 100, 50, 60, 80, 135, 60]
+_SUPPLIER_COL_WIDTHS = [30, 70, 70, 60, 90, 190]  # Total: 510 puntos
+_PDF_TABLE_WIDTH = 510
+
+
+def _pdf_col_widths(header, rows):
+    """
+    Anchos de columna medidos una sola vez sobre el encabezado y todas las filas
+    (Helvetica 10/8 como _PDF_TABLE_STYLE, más el padding). Las columnas angostas
+    reciben su ancho natural y el resto del ancho de página se reparte entre las
+    anchas, así todos los bloques del reporte quedan alineados.
+    """
+    def measure(value, font, size):
+        if isinstance(value, Flowable):
+            return 0
+        return max(stringWidth(line, font, size) for line in str(value).split('\n'))
+
+    natural = [measure(value, 'Helvetica-Bold', 10) for value in header]
+    for row in rows:
+        for i, value in enumerate(row):
+            natural[i] = max(natural[i], measure(value, 'Helvetica', 8))
+    natural = [width + 12 for width in natural]
+
+    widths = list(natural)
+    remaining, pending = _PDF_TABLE_WIDTH, sorted(range(len(natural)), key=natural.__getitem__)
+    while pending:
+        share = remaining / len(pending)
+        if natural[pending[0]] > share:
+            for i in pending:
+                widths[i] = share
+            break
+        i = pending.pop(0)
+        remaining -= natural[i]
+    return widths
+
+
+def _pdf_chunked_tables(header, rows, table_style, col_widths=None, chunk_rows=PDF_TABLE_CHUNK_ROWS):
+    """
+    Divide `rows` en tablas de `chunk_rows` filas, cada una con el encabezado
+    repetido. Sin `col_widths` los anchos salen de _pdf_col_widths; con anchos
+    fijos ReportLab no vuelve a medir cada bloque por separado.
+    """
+    if col_widths is None:
+        col_widths = _pdf_col_widths(header, rows)
+    if not rows:
+        return [Table([header], colWidths=col_widths, style=table_style)]
+    return [
+        Table([header] + rows[start:start + chunk_rows], colWidths=col_widths, repeatRows=1, style=table_style)
+        for start in range(0, len(rows), chunk_rows)
+    ]
+
+
+def _pdf_cell(text, style, col_width, plain_cells=True):
+    """
+    Celda de tabla: con `plain_cells` el texto que entra en una línea se deja como
+    string (mucho más barato de maquetar) y solo se usa Paragraph cuando hay que
+    ajustar el texto al ancho de la columna.
+    """
+    text = '' if text is None else str(text)
+    # Ancho promedio de un carácter en Helvetica ~ 0.5 × tamaño de fuente, más el padding de la celda
+    if plain_cells and '\n' not in text and len(text) * style.fontSize * 0.5 <= col_width - 6:
+        return text
+    return Paragraph(xml_escape(text), style)
+
+
 # Asegúrate de que ExportDataView esté definida solo aquí y no duplicada en urls.py
 class ExportDataView(APIView):
 
-    
     def post(self, request):
         try:
             data = request.data
             query_type = data.get('query_type')
-            query_data = data.get('data', [])
-            
-            # Debug: imprimir datos recibidos
-            print(f"Query type: {query_type}")
-            print(f"Data received: {query_data}")
-            
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            story = []
-            styles = getSampleStyleSheet()
-            
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                spaceAfter=30,
-                alignment=1
-            )
-            
-            # Título más descriptivo
-            title = Paragraph(f"Reporte de {query_type.replace('_', ' ').title()}", title_style)
-            story.append(title)
-            story.append(Spacer(1, 12))
-            
-            # Verificar si hay datos
-            if not query_data:
-                no_data_style = ParagraphStyle(
-                    'NoData',
-                    parent=styles['Normal'],
-                    fontSize=12,
-                    alignment=1
-                )
-                story.append(Paragraph("No hay datos disponibles para este reporte.", no_data_style))
-            else:
-                # Generar tabla según el tipo de consulta
-                if query_type in ['inventario', 'stock']:
-                    # Agregar resumen para stock si está disponible
-                    summary = data.get('summary') or {}
-                    if summary:
-                        try:
-                            total_products = int(summary.get('totalProducts') or 0)
-                            total_insumos = int(summary.get('totalInsumos') or 0)
-                            low_stock_items = int(summary.get('lowStockItems') or 0)
-                            total_stock = str(summary.get('totalStock') or '')
-                        except Exception:
-                            total_products = 0
-                            total_insumos = 0
-                            low_stock_items = 0
-                            total_stock = ''
-
-                        # Crear tabla de resumen para stock
-                        summary_data = [
-                            [Paragraph(f"<b>Total Products:</b> {total_products}", styles['Normal']), 
-                             Paragraph(f"<b>Total Insumos:</b> {total_insumos}", styles['Normal'])],
-                            [Paragraph(f"<b>Low Stock Items:</b> {low_stock_items}", styles['Normal']),
-                             Paragraph(f"<b>Total Stock:</b> {total_stock}", styles['Normal'])]
-                        ]
-                        summary_table = Table(summary_data)
-                        summary_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0,0), (-1,-1), colors.lightgrey),
-                            ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
-                            ('INNERGRID', (0,0), (-1,-1), 0.25, colors.white),
-                            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                            ('FONTSIZE', (0,0), (-1,-1), 10),
-                        ]))
-                        story.append(summary_table)
-                        story.append(Spacer(1,12))
-                    
-                    story.append(self._generate_inventory_table(query_data))
-                elif query_type == 'ventas':
-                    # Si el frontend envió un resumen (summary), renderizarlo arriba
-                    summary = data.get('summary') or {}
-                    if summary:
-                        try:
-                            # Crear tres recuadros: Total de Ventas, Ingresos Totales, Período
-                            total_sales = int(summary.get('totalSales') or summary.get('total_sales') or 0)
-                        except Exception:
-                            total_sales = 0
-                        try:
-                            total_revenue = float(summary.get('totalRevenue') or summary.get('total_revenue') or 0) or 0.0
-                        except Exception:
-                            total_revenue = 0.0
-                        period = summary.get('period') or summary.get('date_range') or ''
-
-                        # Estilo para recuadros
-                        box_style = TableStyle([
-                            ('BACKGROUND', (0,0), (-1,-1), colors.whitesmoke),
-                            ('BOX', (0,0), (-1,-1), 1, colors.lightgrey),
-                            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                        ])
-                        boxes = [
-                            [Paragraph(f"<b>Total de Ventas:</b> {total_sales}", styles['Normal']) , ''],
-                            [Paragraph(f"<b>Ingresos Totales:</b> ${total_revenue:.2f}", styles['Normal']), ''],
-                            [Paragraph(f"<b>Período:</b> {period}", styles['Normal']), '']
-                        ]
-                        # Convertir cada box a una tabla individual alineada horizontalmente
-                        # Usaremos una tabla única con 3 columnas para mostrar los 3 recuadros
-                        header_row = ['','', '']
-                        box_table = Table([[Paragraph(f"<b>Total de Ventas:</b> {total_sales}", styles['Normal']), Paragraph(f"<b>Ingresos Totales:</b> ${total_revenue:.2f}", styles['Normal']), Paragraph(f"<b>Período:</b> {period}", styles['Normal'])]])
-                        box_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0,0), (-1,-1), colors.lightgrey),
-                            ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
-                            ('INNERGRID', (0,0), (-1,-1), 0.25, colors.white),
-                            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                        ]))
-                        story.append(box_table)
-                        story.append(Spacer(1,12))
-
-                    story.append(self._generate_sales_table(query_data))
-                elif query_type in ['usuarios', 'users']:
-                    story.append(self._generate_users_table(query_data))
-                elif query_type == 'movimientos_caja':
-                    # Agregar resumen para movimientos de caja
-                    summary = data.get('summary') or {}
-                    if summary:
-                        try:
-                            total_movements = int(summary.get('totalMovements') or 0)
-                            total_income = str(summary.get('totalIncome') or '0.00')
-                            total_expenses = str(summary.get('totalExpenses') or '0.00')
-                            period = str(summary.get('period') or '')
-                        except Exception:
-                            total_movements = 0
-                            total_income = '0.00'
-                            total_expenses = '0.00'
-                            period = ''
-
-                        # Crear tabla de resumen para movimientos de caja
-                        summary_data = [
-                            [Paragraph(f"<b>Total de Movimientos:</b> {total_movements}", styles['Normal']), 
-                             Paragraph(f"<b>Ingresos Totales:</b> ${total_income}", styles['Normal'])],
-                            [Paragraph(f"<b>Gastos Totales:</b> ${total_expenses}", styles['Normal']),
-                             Paragraph(f"<b>Período:</b> {period}", styles['Normal'])]
-                        ]
-                        summary_table = Table(summary_data)
-                        summary_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0,0), (-1,-1), colors.lightgrey),
-                            ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
-                            ('INNERGRID', (0,0), (-1,-1), 0.25, colors.white),
-                            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                            ('FONTSIZE', (0,0), (-1,-1), 10),
-                        ]))
-                        story.append(summary_table)
-                        story.append(Spacer(1,12))
-                    
-                    story.append(self._generate_cash_movements_table(query_data))
-                elif query_type == 'compras':
-                    # Agregar resumen para compras
-                    summary = data.get('summary') or {}
-                    if summary:
-                        try:
-                            total_purchases = int(summary.get('totalPurchases') or 0)
-                            total_amount = float(summary.get('totalAmount') or 0)
-                            period = str(summary.get('period') or '')
-                        except Exception:
-                            total_purchases = 0
-                            total_amount = 0.0
-                            period = ''
-
-                        # Crear tabla de resumen para compras
-                        summary_data = [
-                            [Paragraph(f"<b>Total de Compras:</b> {total_purchases}", styles['Normal']), 
-                             Paragraph(f"<b>Monto Total:</b> ${total_amount:.2f}", styles['Normal'])],
-                            [Paragraph(f"<b>Período:</b> {period}", styles['Normal']), '']
-                        ]
-                        summary_table = Table(summary_data)
-                        summary_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0,0), (-1,-1), colors.lightgrey),
-                            ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
-                            ('INNERGRID', (0,0), (-1,-1), 0.25, colors.white),
-                            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                            ('FONTSIZE', (0,0), (-1,-1), 10),
-                        ]))
-                        story.append(summary_table)
-                        story.append(Spacer(1,12))
-                    
-                    story.append(self._generate_purchases_table(query_data))
-                elif query_type == 'pedidos':
-                    # Agregar resumen para pedidos
-                    summary = data.get('summary') or {}
-                    if summary:
-                        try:
-                            total_orders = int(summary.get('totalOrders') or 0)
-                            pending_orders = int(summary.get('pendingOrders') or 0)
-                            sent_orders = int(summary.get('sentOrders') or 0)
-                            period = str(summary.get('period') or '')
-                        except Exception:
-                            total_orders = 0
-                            pending_orders = 0
-                            sent_orders = 0
-                            period = ''
-
-                        # Crear tabla de resumen para pedidos
-                        summary_data = [
-                            [Paragraph(f"<b>Total de Pedidos:</b> {total_orders}", styles['Normal']), 
-                             Paragraph(f"<b>Pedidos Pendientes:</b> {pending_orders}", styles['Normal'])],
-                            [Paragraph(f"<b>Pedidos Enviados:</b> {sent_orders}", styles['Normal']),
-                             Paragraph(f"<b>Período:</b> {period}", styles['Normal'])]
-                        ]
-                        summary_table = Table(summary_data)
-                        summary_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0,0), (-1,-1), colors.lightgrey),
-                            ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
-                            ('INNERGRID', (0,0), (-1,-1), 0.25, colors.white),
-                            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                            ('FONTSIZE', (0,0), (-1,-1), 10),
-                        ]))
-                        story.append(summary_table)
-                        story.append(Spacer(1,12))
-                    
-                    story.append(self._generate_orders_table(query_data))
-                elif query_type in ['proveedores', 'suppliers']:
-                    # Agregar resumen para proveedores
-                    summary = data.get('summary') or {}
-                    if summary:
-                        try:
-                            total_suppliers = int(summary.get('totalSuppliers') or 0)
-                            active_suppliers = int(summary.get('activeSuppliers') or 0)
-                        except Exception:
-                            total_suppliers = 0
-                            active_suppliers = 0
-
-                        # Crear tabla de resumen para proveedores
-                        summary_data = [
-                            [Paragraph(f"<b>Total de Proveedores:</b> {total_suppliers}", styles['Normal']), 
-                             Paragraph(f"<b>Proveedores Activos:</b> {active_suppliers}", styles['Normal'])]
-                        ]
-                        summary_table = Table(summary_data)
-                        summary_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0,0), (-1,-1), colors.lightgrey),
-                            ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
-                            ('INNERGRID', (0,0), (-1,-1), 0.25, colors.white),
-                            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                            ('FONTSIZE', (0,0), (-1,-1), 10),
-                        ]))
-                        story.append(summary_table)
-                        story.append(Spacer(1,12))
-                    
-                    story.append(self._generate_suppliers_table(query_data))
-                else:
-                    # Tabla genérica para tipos no reconocidos
-                    story.append(self._generate_generic_table(query_data))
-            
-            doc.build(story)
-            buffer.seek(0)
-            response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
+
+            # Las filas y el resumen se calculan en el servidor a partir de
+            # query_type + filters (no se confía en los datos enviados por el navegador)
+            try:
+                check_report_access(request.user, query_type)
+                pdf = self.render_pdf(query_type, data.get('filters') or {})
+            except ReportPermissionError as e:
+                return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+            except ReportFilterError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            response = HttpResponse(pdf, content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="reporte_{query_type}.pdf"'
             return response
         except Exception as e:
-            print(f"Error generating PDF: {str(e)}")
+            logger.exception('Error generando PDF')
             return Response({'error': str(e)}, status=500)
+
+    def render_pdf(self, query_type, filters, plain_cells=True):
+        """
+        Genera el PDF del reporte y devuelve su contenido en bytes (lo usa también el worker de reportes).
+        Con `plain_cells` las celdas cortas se dibujan como texto plano en lugar de Paragraph.
+        """
+        report = build_report(query_type, filters)
+        query_data = report['rows']
+        report_summary = report['summary']
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        story = []
+        styles = _PDF_STYLES
+        self.plain_cells = plain_cells
+
+        # Título más descriptivo
+        title = Paragraph(f"Reporte de {query_type.replace('_', ' ').title()}", _PDF_TITLE_STYLE)
+        story.append(title)
+        story.append(Spacer(1, 12))
+        
+        # Verificar si hay datos
+        if not query_data:
+            story.append(Paragraph("No hay datos disponibles para este reporte.", _PDF_NO_DATA_STYLE))
+        else:
+            # Generar tabla según el tipo de consulta
+            if query_type in ['inventario', 'stock']:
+                # Agregar resumen para stock si está disponible
+                summary = report_summary
+                if summary:
+                    try:
+                        total_products = int(summary.get('totalProducts') or 0)
+                        total_insumos = int(summary.get('totalInsumos') or 0)
+                        low_stock_items = int(summary.get('lowStockItems') or 0)
+                        total_stock = str(summary.get('totalStock') or '')
+                    except Exception:
+                        total_products = 0
+                        total_insumos = 0
+                        low_stock_items = 0
+                        total_stock = ''
+
+                    # Crear tabla de resumen para stock
+                    summary_data = [
+                        [Paragraph(f"<b>Total Products:</b> {total_products}", styles['Normal']), 
+                         Paragraph(f"<b>Total Insumos:</b> {total_insumos}", styles['Normal'])],
+                        [Paragraph(f"<b>Low Stock Items:</b> {low_stock_items}", styles['Normal']),
+                         Paragraph(f"<b>Total Stock:</b> {total_stock}", styles['Normal'])]
+                    ]
+                    summary_table = Table(summary_data)
+                    summary_table.setStyle(_PDF_SUMMARY_TABLE_STYLE)
+                    story.append(summary_table)
+                    story.append(Spacer(1,12))
+                
+                story.extend(self._generate_inventory_table(query_data))
+            elif query_type == 'ventas':
+                # Renderizar el resumen arriba de la tabla
+                summary = report_summary
+                if summary:
+                    try:
+                        # Crear tres recuadros: Total de Ventas, Ingresos Totales, Período
+                        total_sales = int(summary.get('totalSales') or summary.get('total_sales') or 0)
+                    except Exception:
+                        total_sales = 0
+                    try:
+                        total_revenue = float(summary.get('totalRevenue') or summary.get('total_revenue') or 0) or 0.0
+                    except Exception:
+                        total_revenue = 0.0
+                    period = summary.get('period') or summary.get('date_range') or ''
+
+                    # Una tabla única con 3 columnas para mostrar los 3 recuadros
+                    box_table = Table([[Paragraph(f"<b>Total de Ventas:</b> {total_sales}", styles['Normal']), Paragraph(f"<b>Ingresos Totales:</b> ${total_revenue:.2f}", styles['Normal']), Paragraph(f"<b>Período:</b> {period}", styles['Normal'])]])
+                    box_table.setStyle(_PDF_SUMMARY_TABLE_STYLE)
+                    story.append(box_table)
+                    story.append(Spacer(1,12))
+
+                story.extend(self._generate_sales_table(query_data))
+            elif query_type in ['usuarios', 'users']:
+                story.extend(self._generate_users_table(query_data))
+            elif query_type == 'movimientos_caja':
+                # Agregar resumen para movimientos de caja
+                summary = report_summary
+                if summary:
+                    try:
+                        total_movements = int(summary.get('totalMovements') or 0)
+                        total_income = str(summary.get('totalIncome') or '0.00')
+                        total_expenses = str(summary.get('totalExpenses') or '0.00')
+                        period = str(summary.get('period') or '')
+                    except Exception:
+                        total_movements = 0
+                        total_income = '0.00'
+                        total_expenses = '0.00'
+                        period = ''
+
+                    # Crear tabla de resumen para movimientos de caja
+                    summary_data = [
+                        [Paragraph(f"<b>Total de Movimientos:</b> {total_movements}", styles['Normal']), 
+                         Paragraph(f"<b>Ingresos Totales:</b> ${total_income}", styles['Normal'])],
+                        [Paragraph(f"<b>Gastos Totales:</b> ${total_expenses}", styles['Normal']),
+                         Paragraph(f"<b>Período:</b> {period}", styles['Normal'])]
+                    ]
+                    summary_table = Table(summary_data)
+                    summary_table.setStyle(_PDF_SUMMARY_TABLE_STYLE)
+                    story.append(summary_table)
+                    story.append(Spacer(1,12))
+                
+                story.extend(self._generate_cash_movements_table(query_data))
+            elif query_type == 'compras':
+                # Agregar resumen para compras
+                summary = report_summary
+                if summary:
+                    try:
+                        total_purchases = int(summary.get('totalPurchases') or 0)
+                        total_amount = float(summary.get('totalAmount') or 0)
+                        period = str(summary.get('period') or '')
+                    except Exception:
+                        total_purchases = 0
+                        total_amount = 0.0
+                        period = ''
+
+                    # Crear tabla de resumen para compras
+                    summary_data = [
+                        [Paragraph(f"<b>Total de Compras:</b> {total_purchases}", styles['Normal']), 
+                         Paragraph(f"<b>Monto Total:</b> ${total_amount:.2f}", styles['Normal'])],
+                        [Paragraph(f"<b>Período:</b> {period}", styles['Normal']), '']
+                    ]
+                    summary_table = Table(summary_data)
+                    summary_table.setStyle(_PDF_SUMMARY_TABLE_STYLE)
+                    story.append(summary_table)
+                    story.append(Spacer(1,12))
+                
+                story.extend(self._generate_purchases_table(query_data))
+            elif query_type == 'pedidos':
+                # Agregar resumen para pedidos
+                summary = report_summary
+                if summary:
+                    try:
+                        total_orders = int(summary.get('totalOrders') or 0)
+                        pending_orders = int(summary.get('pendingOrders') or 0)
+                        sent_orders = int(summary.get('sentOrders') or 0)
+                        period = str(summary.get('period') or '')
+                    except Exception:
+                        total_orders = 0
+                        pending_orders = 0
+                        sent_orders = 0
+                        period = ''
+
+                    # Crear tabla de resumen para pedidos
+                    summary_data = [
+                        [Paragraph(f"<b>Total de Pedidos:</b> {total_orders}", styles['Normal']), 
+                         Paragraph(f"<b>Pedidos Pendientes:</b> {pending_orders}", styles['Normal'])],
+                        [Paragraph(f"<b>Pedidos Enviados:</b> {sent_orders}", styles['Normal']),
+                         Paragraph(f"<b>Período:</b> {period}", styles['Normal'])]
+                    ]
+                    summary_table = Table(summary_data)
+                    summary_table.setStyle(_PDF_SUMMARY_TABLE_STYLE)
+                    story.append(summary_table)
+                    story.append(Spacer(1,12))
+                
+                story.extend(self._generate_orders_table(query_data))
+            elif query_type in ['proveedores', 'suppliers']:
+                # Agregar resumen para proveedores
+                summary = report_summary
+                if summary:
+                    try:
+                        total_suppliers = int(summary.get('totalSuppliers') or 0)
+                        active_suppliers = int(summary.get('activeSuppliers') or 0)
+                    except Exception:
+                        total_suppliers = 0
+                        active_suppliers = 0
+
+                    # Crear tabla de resumen para proveedores
+                    summary_data = [
+                        [Paragraph(f"<b>Total de Proveedores:</b> {total_suppliers}", styles['Normal']), 
+                         Paragraph(f"<b>Proveedores Activos:</b> {active_suppliers}", styles['Normal'])]
+                    ]
+                    summary_table = Table(summary_data)
+                    summary_table.setStyle(_PDF_SUMMARY_TABLE_STYLE)
+                    story.append(summary_table)
+                    story.append(Spacer(1,12))
+                
+                story.extend(self._generate_suppliers_table(query_data))
+            else:
+                # Tabla genérica para tipos no reconocidos
+                story.extend(self._generate_generic_table(query_data))
+        
+        doc.build(story)
+        buffer.seek(0)
+        return buffer.getvalue()
         
         
     def _generate_inventory_table(self, data):
@@ -2083,19 +2204,8 @@ class ExportDataView(APIView):
                 precio_str,
                 item.get('status', '')
             ])
-            
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        return table
+
+        return _pdf_chunked_tables(table_data[0], table_data[1:], _PDF_TABLE_STYLE)
 
     def _generate_sales_table(self, data):
         # Columns: ID, Fecha, Producto, Cantidad, Total, Usuario
@@ -2140,18 +2250,7 @@ class ExportDataView(APIView):
                 f"${total_num:.2f}",
                 usuario
             ])
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        return table
+        return _pdf_chunked_tables(table_data[0], table_data[1:], _PDF_TABLE_STYLE)
 
     def _generate_users_table(self, data):
         table_data = [['Usuario', 'Email', 'Rol']]
@@ -2161,27 +2260,14 @@ class ExportDataView(APIView):
                 item.get('email', ''),
                 item.get('role', '')
             ])
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        return table
+        return _pdf_chunked_tables(table_data[0], table_data[1:], _PDF_TABLE_STYLE)
 
     def _generate_cash_movements_table(self, data):
-        styles = getSampleStyleSheet()
-        normal_style = styles['Normal']
-        normal_style.fontSize = 8
-        
+        plain_cells = getattr(self, 'plain_cells', True)
+
         # Encabezados
         headers = ['ID', 'Fecha', 'Tipo', 'Monto', 'Método de Pago', 'Descripción', 'Usuario']
-        table_data = [headers]
+        rows = []
 
         for item in data:
             # Obtener y formatear datos de forma segura
@@ -2202,38 +2288,32 @@ class ExportDataView(APIView):
             # Formatear fecha para que coincida con la interfaz gráfica
             formatted_date = format_date_for_pdf(date_str)
 
-            # Crear Paragraphs para permitir el ajuste de línea
-            row = [
-                Paragraph(str(item.get('id', '')), normal_style),
-                Paragraph(formatted_date, normal_style),
-                Paragraph(item.get('type', ''), normal_style),
-                Paragraph(amount_str, normal_style),
-                Paragraph(payment_method_text, normal_style),
-                Paragraph(description_text, normal_style),
-                Paragraph(user_text, normal_style)
-            ]
-            table_data.append(row)
+            # Paragraph solo en las celdas que necesitan ajuste de línea
+            values = [item.get('id', ''), formatted_date, item.get('type', ''), amount_str,
+                      payment_method_text, description_text, user_text]
+            rows.append([
+                _pdf_cell(value, _PDF_CELL_STYLE, width, plain_cells)
+                for value, width in zip(values, _CASH_COL_WIDTHS)
+            ])
 
-        # Definir anchos de columna para controlar el desbordamiento
-        col_widths = [30, 100, 50, 60, 80, 135, 60]
-
-        table = Table(table_data, colWidths=col_widths)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
-        return table
+        # Anchos de columna fijos para controlar el desbordamiento
+        return _pdf_chunked_tables(headers, rows, _PDF_CASH_TABLE_STYLE, col_widths=_CASH_COL_WIDTHS)
 
     def _generate_purchases_table(self, data):
-        from .models import Product
-        
+        from django.db.models.functions import Lower
+
+        # Unidad de cada producto mencionado, resuelta en una sola consulta
+        names = {
+            self._purchase_item_name(it).lower()
+            for item in data if isinstance(item.get('items'), (list, tuple))
+            for it in item['items'] if isinstance(it, dict)
+        }
+        names.discard('')
+        units = {}
+        if names:
+            for name, unit in Product.objects.annotate(lname=Lower('name')).filter(lname__in=names).values_list('lname', 'unit'):
+                units.setdefault(name, unit)
+
         # Columns: ID, Fecha, Proveedor, Items (nombres), Total, Tipo (sin columna Estado)
         table_data = [['ID', 'Fecha', 'Proveedor', 'Insumo/Producto', 'Total', 'Tipo']]
         for item in data:
@@ -2246,33 +2326,22 @@ class ExportDataView(APIView):
                 formatted_items = []
                 for it in items_field:
                     if isinstance(it, dict):
-                        product_name = it.get('productName') or it.get('product_name') or it.get('product') or it.get('name') or ''
+                        product_name = self._purchase_item_name(it)
                         quantity = it.get('quantity', 0)
                         
-                        # Limpiar el product_name si contiene multiplicaciones
-                        if ' x ' in product_name or ' = ' in product_name:
-                            # Extraer solo el nombre del producto antes de cualquier multiplicación
-                            product_name = product_name.split(' x ')[0].split(' = ')[0].strip()
-                        
                         if product_name and quantity and quantity > 0:
                             try:
-                                # Buscar el producto en la base de datos para obtener su unidad
-                                product = Product.objects.filter(name__iexact=product_name).first()
-                                if product:
-                                    unit = product.unit
-                                    # Formatear según la unidad directamente
-                                    if unit == 'g':
-                                        formatted_items.append(f"{product_name} {int(quantity)}Kg")
-                                    elif unit == 'ml':
-                                        formatted_items.append(f"{product_name} {int(quantity)}L")
-                                    else:  # unidades
-                                        formatted_items.append(f"{product_name} {int(quantity)}U")
-                                else:
-                                    # Si no se encuentra el producto, usar formato básico
+                                # Formatear según la unidad del producto (si no se encuentra, unidades)
+                                unit = units.get(product_name.lower())
+                                if unit == 'g':
+                                    formatted_items.append(f"{product_name} {int(quantity)}Kg")
+                                elif unit == 'ml':
+                                    formatted_items.append(f"{product_name} {int(quantity)}L")
+                                else:  # unidades
                                     formatted_items.append(f"{product_name} {int(quantity)}U")
                             except Exception:
                                 # En caso de error, usar formato básico
-                                formatted_items.append(f"{product_name} {int(quantity)}U")
+                                formatted_items.append(f"{product_name} {quantity}U")
                         elif product_name:
                             formatted_items.append(product_name)
                     elif isinstance(it, str):
@@ -2314,18 +2383,16 @@ class ExportDataView(APIView):
                 f"${total_val}",
                 item.get('type', '')
             ])
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        return table
+        return _pdf_chunked_tables(table_data[0], table_data[1:], _PDF_TABLE_STYLE)
+
+    @staticmethod
+    def _purchase_item_name(it):
+        product_name = str(it.get('productName') or it.get('product_name') or it.get('product') or it.get('name') or '')
+        # Limpiar el product_name si contiene multiplicaciones
+        if ' x ' in product_name or ' = ' in product_name:
+            # Extraer solo el nombre del producto antes de cualquier multiplicación
+            product_name = product_name.split(' x ')[0].split(' = ')[0].strip()
+        return product_name
 
     def _generate_orders_table(self, data):
         # Cambiado: mostrar columna de Productos y columna de Unidades (cantidades por producto)
@@ -2381,80 +2448,27 @@ class ExportDataView(APIView):
                 products_str,
                 units_str
             ])
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        return table
+        return _pdf_chunked_tables(table_data[0], table_data[1:], _PDF_TABLE_STYLE)
 
     def _generate_suppliers_table(self, data):
-        from reportlab.platypus import Paragraph
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        
-        styles = getSampleStyleSheet()
-        # Crear estilo específico para celdas de texto
-        cell_style = ParagraphStyle(
-            'CellStyle',
-            parent=styles['Normal'],
-            fontSize=7,
-            alignment=1,  # Center alignment
-            wordWrap='CJK',
-            leftIndent=2,
-            rightIndent=2,
-            spaceAfter=2
-        )
-        
-        table_data = [['ID', 'Nombre', 'CUIT', 'Teléfono', 'Dirección', 'Producto/Insumo']]
+        plain_cells = getattr(self, 'plain_cells', True)
+
+        headers = ['ID', 'Nombre', 'CUIT', 'Teléfono', 'Dirección', 'Producto/Insumo']
+        rows = []
         for item in data:
             # No truncar el texto, dejarlo completo para que se ajuste automáticamente
-            id_val = str(item.get('id', ''))
-            name = str(item.get('name', ''))
-            cuit = str(item.get('cuit', ''))
-            phone = str(item.get('phone', ''))
-            address = str(item.get('address', ''))
-            products = str(item.get('products', ''))
-            
-            table_data.append([
-                Paragraph(id_val, cell_style),
-                Paragraph(name, cell_style),
-                Paragraph(cuit, cell_style),
-                Paragraph(phone, cell_style),
-                Paragraph(address, cell_style),
-                Paragraph(products, cell_style)
+            values = [item.get('id', ''), item.get('name', ''), item.get('cuit', ''),
+                      item.get('phone', ''), item.get('address', ''), item.get('products', '')]
+            rows.append([
+                _pdf_cell(value, _PDF_SUPPLIER_CELL_STYLE, width, plain_cells)
+                for value, width in zip(values, _SUPPLIER_COL_WIDTHS)
             ])
-        
-        # Ajustar anchos para incluir columna ID
-        col_widths = [30, 70, 70, 60, 90, 190]  # Total: 510 puntos
-        
-        table = Table(table_data, colWidths=col_widths, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0, 1), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
-            ('LEFTPADDING', (0, 0), (-1, -1), 3),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.lightgrey])
-        ]))
-        return table
+
+        return _pdf_chunked_tables(headers, rows, _PDF_SUPPLIERS_TABLE_STYLE, col_widths=_SUPPLIER_COL_WIDTHS)
 
     def _generate_generic_table(self, data):
         if not data:
-            return Paragraph("No hay datos disponibles.")
+            return [Paragraph("No hay datos disponibles.")]
         
         # Obtener las claves del primer elemento para crear las columnas
         first_item = data[0] if data else {}
@@ -2465,83 +2479,133 @@ class ExportDataView(APIView):
             row = [str(item.get(key, '')) for key in headers]
             table_data.append(row)
         
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        return table
+        return _pdf_chunked_tables(table_data[0], table_data[1:], _PDF_TABLE_STYLE)
+
+
+
+class ExportStreamView(APIView):
+    """
+    GET /api/export-data/stream/?query_type=ventas&file_format=csv|xlsx&start_date=...&end_date=...
+    Exportación CSV/XLSX en streaming (ver api/exports.py): memoria constante sin importar la cantidad de filas.
+    """
+    permission_classes = [IsAuthenticated]
+
+    FILTER_PARAMS = ('start_date', 'end_date', 'product', 'user', 'type', 'payment_method', 'status', 'category', 'name')
+
+    def get(self, request):
+        params = request.query_params
+        query_type = params.get('query_type')
+        file_format = (params.get('file_format') or 'csv').lower()
+        if file_format not in EXPORT_FORMATS:
+            return Response({'error': f'Formato no soportado: {file_format}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {key: params.get(key) for key in self.FILTER_PARAMS if params.get(key)}
+        if params.get('ids'):
+            filters['ids'] = [i for i in params.get('ids').split(',') if i.strip()]
+        try:
+            check_report_access(request.user, query_type)
+            headers, rows = export_rows(query_type, filters)
+        except ReportPermissionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ReportFilterError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        filename = f"{query_type}_{timezone.localdate().isoformat()}.{file_format}"
+        if file_format == 'xlsx':
+            response = StreamingHttpResponse(
+                stream_xlsx(headers, rows, sheet_name=query_type),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        else:
+            response = StreamingHttpResponse(stream_csv(headers, rows), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class ReportJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Exportaciones PDF asíncronas:
+      POST /api/reports/                 -> encola {query_type, filters} y devuelve el id del trabajo
+      GET  /api/reports/<id>/            -> estado del trabajo (pending/running/done/failed)
+      GET  /api/reports/<id>/download/   -> PDF generado
+    El PDF lo genera `python manage.py run_report_worker`, fuera de los workers HTTP.
+    """
+    serializer_class = ReportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # Solo los trabajos del usuario actual
+        return ReportJob.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        query_type = request.data.get('query_type')
+        try:
+            check_report_access(request.user, query_type)
+            job = enqueue_report(request.user, query_type, request.data.get('filters') or {})
+        except ReportPermissionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ReportFilterError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        code = status.HTTP_200_OK if job.status == 'done' else status.HTTP_202_ACCEPTED
+        return Response(self.get_serializer(job).data, status=code)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'done':
+            return Response({'error': 'El reporte todavía no está listo', 'status': job.status},
+                            status=status.HTTP_409_CONFLICT)
+        try:
+            fh = open(job.file_path, 'rb')
+        except OSError:
+            return Response({'error': 'El archivo del reporte ya no está disponible'}, status=status.HTTP_410_GONE)
+        return FileResponse(fh, as_attachment=True, filename=f'reporte_{job.query_type}.pdf',
+                            content_type='application/pdf')
+
 
 class ProductProductionView(APIView):
+    """
+    Producción de un solo producto final. Usa el mismo servicio que el lote de
+    producciones (commit_production_batch): receta por unidad según `recipe_yield`,
+    consumo de insumos agrandado por `loss_rate`, un único lock de las filas
+    involucradas y auditoría de inventario en bloque.
+    Formato: {"product_id": 1, "quantity_produced": 10} (también acepta "quantity").
+    """
     permission_classes = [IsAuthenticated, IsGerente]
 
     def post(self, request, *args, **kwargs):
+        from rest_framework.exceptions import NotFound
+        from .services import commit_production_batch, whole_units
+
         product_id = request.data.get('product_id')
-        quantity_produced = request.data.get('quantity_produced')
+        quantity_produced = request.data.get('quantity_produced', request.data.get('quantity'))
 
         if not product_id or not quantity_produced:
             return Response({'error': 'El ID del producto y la cantidad son requeridos.'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            quantity_produced = int(quantity_produced)
-            if quantity_produced <= 0:
-                raise ValueError()
-        except (ValueError, TypeError):
+            quantity_produced = whole_units(quantity_produced, product_id)
+        except ValidationError:
             return Response({'error': 'La cantidad debe ser un número entero positivo.'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            with transaction.atomic():
-                # 1. Obtener el producto a producir
-                product_to_produce = get_object_or_404(Product.objects.select_for_update(), pk=product_id)
-
-                if product_to_produce.is_ingredient:
-                    raise ValidationError('No se pueden producir insumos, solo productos finales.')
-
-                # 2. Obtener la receta del producto
-                recipe = product_to_produce.recipe.all()
-                if not recipe.exists():
-                    raise ValidationError('El producto no tiene una receta definida y no puede ser producido.')
-
-                # 3. Verificar stock de ingredientes
-                for recipe_item in recipe:
-                    ingredient = recipe_item.ingredient
-                    required_quantity = recipe_item.quantity * quantity_produced
-                    
-                    # Bloquear el ingrediente para la actualización
-                    ingredient_to_update = Product.objects.select_for_update().get(pk=ingredient.pk)
-
-                    if ingredient_to_update.stock < required_quantity:
-                        raise ValidationError(f'Stock insuficiente para el insumo "{ingredient.name}". Necesario: {required_quantity:.2f} {recipe_item.unit}, Disponible: {ingredient_to_update.stock:.2f} {recipe_item.unit}')
-
-                # 4. Descontar stock de ingredientes y aumentar stock del producto final
-                for recipe_item in recipe:
-                    ingredient = recipe_item.ingredient
-                    required_quantity = recipe_item.quantity * quantity_produced
-                    
-                    ingredient_to_update = Product.objects.get(pk=ingredient.pk)
-                    ingredient_to_update.stock -= required_quantity
-                    ingredient_to_update.save()
-
-                # 5. Aumentar el stock del producto producido
-                product_to_produce.stock += quantity_produced
-                product_to_produce.save()
-
-            return Response({
-                'success': f'Producción completada: {quantity_produced} unidades de {product_to_produce.name}.'
-            }, status=status.HTTP_200_OK)
-
+            production, changes = commit_production_batch(
+                request.user, [{'product_id': product_id, 'quantity_produced': quantity_produced}],
+                finished_goods_only=True,
+            )
+        except NotFound:
+            return Response({'error': 'El producto a producir no existe.'}, status=status.HTTP_404_NOT_FOUND)
         except ValidationError as e:
             return Response({'error': e.detail[0]}, status=status.HTTP_400_BAD_REQUEST)
-        except Product.DoesNotExist:
-            return Response({'error': 'El producto a producir no existe.'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': f'Ocurrió un error inesperado: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        product = changes['products'][0]
+        return Response({
+            'success': f'Producción completada: {quantity_produced} unidades de {product["name"]}.',
+            'production_id': production.id,
+            'changes': changes,
+        }, status=status.HTTP_200_OK)
+
 
 
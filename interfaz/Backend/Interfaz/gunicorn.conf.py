@@ -0,0 +1,68 @@
+# backend/gunicorn.conf.py
+"""
+Configuración de gunicorn para producción:
+
+    gunicorn -c gunicorn.conf.py Interfaz.wsgi
+
+Procesos según los núcleos disponibles, hilos por proceso para las vistas que
+esperan a la base, carga de Django antes del fork y reciclado gradual de
+workers. Todo se puede ajustar con variables GUNICORN_*.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# (2 × núcleos) + 1 procesos, con hilos para no bloquear un proceso por request lento
+workers = int(os.environ.get('GUNICORN_WORKERS') or multiprocessing.cpu_count() * 2 + 1)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# Django se importa una sola vez en el proceso maestro y los workers lo heredan
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Reciclar cada worker después de N requests (con variación para que no se reinicien todos juntos)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Verificar la configuración antes de aceptar tráfico; si falla, gunicorn no arranca
+    if os.environ.get('GUNICORN_SELFCHECK', '1') != '1':
+        return
+    import django
+    from django.core.management import call_command
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Interfaz.settings')
+    django.setup()
+    try:
+        call_command('selfcheck')
+    except Exception as e:
+        server.log.error('selfcheck falló, no se inicia el servidor: %s', e)
+        raise SystemExit(1)
+    finally:
+        _close_master_connections()
+
+
+def _close_master_connections():
+    # Con DB_POOL=1 close_all() solo devuelve la conexión al pool: hay que cerrar el pool
+    # antes del fork para que los workers no hereden sus sockets y cada uno abra el suyo.
+    from django.db import connections
+    for alias in connections:
+        connection = connections[alias]
+        connection.close()
+        if connection.settings_dict.get('OPTIONS', {}).get('pool') and hasattr(connection, 'close_pool'):
+            connection.close_pool()
+
+
+def post_fork(server, worker):
+    # Las conexiones abiertas por el maestro (selfcheck, preload) no se comparten con los workers
+    from django.db import connections
+    connections.close_all()
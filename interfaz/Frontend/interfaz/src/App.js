@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import Select from 'react-select';
 import './App.css';
 import { formatMovementDate } from './utils/date';
-import api, { backendLogin, backendLogout, setInMemoryToken, clearInMemoryToken, getInMemoryToken, getPendingPurchases, approvePurchase, rejectPurchase, getPurchaseHistory, getRecipe, addRecipeIngredient, updateRecipeIngredient, deleteRecipeIngredient, getIngredients, getIngredientsWithSuggestedUnit, updateOrderStatus } from './services/api';
+import api, { backendLogin, backendLogout, setInMemoryToken, clearInMemoryToken, getInMemoryToken, getPendingPurchases, approvePurchase, rejectPurchase, getPurchaseHistory, getRecipe, addRecipeIngredient, updateRecipeIngredient, deleteRecipeIngredient, getIngredients, getIngredientsWithSuggestedUnit, updateOrderStatus, getAllPages } from './services/api';
 import userStorage from './services/userStorage';
 import DataConsultation from './DataConsultation';
 import MyUserData from './components/MyUserData';
@@ -146,6 +146,59 @@ const getProductIdByName = (inventory, name) => {
   return p ? p.id : null;
 };
 
+// Cursor de /api/sync/: null = todavía no hay copia local, se pide el estado completo
+let syncCursor = null;
+
+// Convertir un producto del servidor al formato local
+const formatServerProduct = (product) => ({
+  id: product.id,
+  name: product.name,
+  price: product.price,
+  category: product.category || 'Producto',
+  stock: product.stock,
+  unit: product.unit || '',
+  description: product.description || '',
+  status: 'Sincronizado',
+  hasSales: false,
+  lowStockThreshold: product.low_stock_threshold !== undefined && product.low_stock_threshold !== null ? product.low_stock_threshold : 10,
+  highStockMultiplier: product.high_stock_multiplier !== undefined && product.high_stock_multiplier !== null ? product.high_stock_multiplier : 2.0,
+  recipe_yield: product.recipe_yield || 1,
+  is_ingredient: product.is_ingredient || false
+});
+
+// Normalizar items y campos de un pedido del servidor
+const formatBackendOrder = (o) => ({
+  id: o.id,
+  fecha_para_la_que_se_quiere_el_pedido: o.fecha_para_la_que_se_quiere_el_pedido,
+  fecha_de_orden_del_pedido: o.fecha_de_orden_del_pedido,
+  customerName: o.customer_name || o.customerName || '',
+  paymentMethod: o.payment_method || o.paymentMethod || '',
+  items: Array.isArray(o.items) ? o.items.map(it => ({
+    productName: it.product_name || it.productName || '',
+    quantity: it.quantity,
+    unitPrice: it.unit_price || it.unitPrice || 0,
+    total: it.total || 0
+  })) : [],
+  totalAmount: o.total_amount || o.totalAmount || 0,
+  status: o.status || 'Pendiente',
+  notes: o.notes || ''
+});
+
+// Aplicar los cambios de /api/sync/ a una lista local: reemplaza por id, quita los borrados y agrega los nuevos
+const mergeById = (prevList, changed, deletedIds = [], prependNew = false) => {
+  const changedById = new Map(changed.map(item => [item.id, item]));
+  const removed = new Set(deletedIds);
+  const merged = prevList
+    .filter(item => !removed.has(item.id))
+    .map(item => {
+      const updated = changedById.get(item.id);
+      changedById.delete(item.id);
+      return updated || item;
+    });
+  const added = Array.from(changedById.values());
+  return prependNew ? [...added, ...merged] : [...merged, ...added];
+};
+
 
 
 // Simulación de la base de datos de usuarios con roles y credenciales
@@ -712,27 +765,8 @@ const App = () => {
             try {
                 const token = getInMemoryToken();
                 if (!token) return;
-                const res = await api.get('/orders/');
-                if (res && res.data) {
-                    // Normalizar items y campos si es necesario
-                    const backendOrders = res.data.map(o => ({
-                        id: o.id,
-                        fecha_para_la_que_se_quiere_el_pedido: o.fecha_para_la_que_se_quiere_el_pedido,
-                        fecha_de_orden_del_pedido: o.fecha_de_orden_del_pedido,
-                        customerName: o.customer_name || o.customerName || '',
-                        paymentMethod: o.payment_method || o.paymentMethod || '',
-                        items: Array.isArray(o.items) ? o.items.map(it => ({
-                            productName: it.product_name || it.productName || '',
-                            quantity: it.quantity,
-                            unitPrice: it.unit_price || it.unitPrice || 0,
-                            total: it.total || 0
-                        })) : [],
-                        totalAmount: o.total_amount || o.totalAmount || 0,
-                        status: o.status || 'Pendiente',
-                        notes: o.notes || ''
-                    }));
-                    setOrders(backendOrders);
-                }
+                const serverOrders = await getAllPages('/orders/');
+                setOrders(serverOrders.map(formatBackendOrder));
             } catch (error) {
                 console.warn('Error cargando pedidos desde backend:', error && error.message);
             }
@@ -981,6 +1015,9 @@ const App = () => {
         sessionStorage.removeItem('currentEmail');
         setCurrentEmail('');
 
+        // La próxima sesión vuelve a descargar el catálogo completo
+        syncCursor = null;
+
         // Limpiar almacenamiento local y token en memoria
         try { await removeAccessToken(); } catch (e) {}
         try { clearInMemoryToken(); } catch (e) {}
@@ -1102,9 +1139,18 @@ const App = () => {
     useEffect(() => {
         if (!isLoggedIn) return;
         
+        // El endpoint de estado responde 304 sin cuerpo mientras la cuenta no cambie
+        let statusEtag = null;
         const checkUserStatus = async () => {
+            // Las pestañas en segundo plano no consultan; se verifica al volver a ellas
+            if (document.visibilityState === 'hidden') return;
             try {
-                const response = await api.get('/users/me/');
+                const response = await api.get('/users/me/status/', {
+                    headers: statusEtag ? { 'If-None-Match': statusEtag } : {},
+                    validateStatus: (code) => code === 200 || code === 304,
+                });
+                if (response.status === 304) return;
+                statusEtag = response.headers?.etag || null;
                 if (response.data.is_locked) {
                     // Usuario fue bloqueado, cerrar sesión
                     const lockTypeFromServer = response.data.lock_type || 'automatic';
@@ -1125,8 +1171,12 @@ const App = () => {
         
         // Verificar cada 3 segundos para detección rápida de bloqueos
         const interval = setInterval(checkUserStatus, 3000);
+        document.addEventListener('visibilitychange', checkUserStatus);
         
-        return () => clearInterval(interval);
+        return () => {
+            clearInterval(interval);
+            document.removeEventListener('visibilitychange', checkUserStatus);
+        };
     }, [isLoggedIn]);
      
     const LockedAccountModal = () => (
@@ -1212,28 +1262,15 @@ const App = () => {
         if (showLoading) {
           setIsLoading(true);
         }
-        const response = await api.get('/products/');
-        const serverProducts = response.data;
-        
-        // Convertir productos del servidor al formato local
-        const formattedProducts = serverProducts.map(product => ({
-          id: product.id,
-          name: product.name,
-          price: product.price,
-          category: product.category || 'Producto',
-          stock: product.stock,
-          unit: product.unit || '',
-          description: product.description || '',
-          status: 'Sincronizado',
-          hasSales: false,
-          lowStockThreshold: product.low_stock_threshold !== undefined && product.low_stock_threshold !== null ? product.low_stock_threshold : 10,
-          highStockMultiplier: product.high_stock_multiplier !== undefined && product.high_stock_multiplier !== null ? product.high_stock_multiplier : 2.0,
-          recipe_yield: product.recipe_yield || 1,
-          is_ingredient: product.is_ingredient || false
-        }));
+        // Solo se descargan los cambios posteriores al último cursor (la primera vez, el catálogo completo)
+        const response = await api.get('/sync/', { params: syncCursor === null ? {} : { since: syncCursor } });
+        const { full, cursor, deleted = {} } = response.data;
+        const changedProducts = response.data.products.map(formatServerProduct);
+        const changedOrders = (response.data.orders || []).map(formatBackendOrder);
         
         // Solo actualizar si hay diferencias para evitar re-renders innecesarios
         setProducts(prevProducts => {
+          const formattedProducts = full ? changedProducts : mergeById(prevProducts, changedProducts, deleted.products);
           if (JSON.stringify(prevProducts) !== JSON.stringify(formattedProducts)) {
             // Productos actualizados exitosamente
             return formattedProducts;
@@ -1242,6 +1279,11 @@ const App = () => {
             return prevProducts;
           }
         });
+        // Los pedidos completos los carga fetchOrders al iniciar sesión; acá solo se aplican los cambios
+        if (!full && (changedOrders.length > 0 || (deleted.orders || []).length > 0)) {
+          setOrders(prevOrders => mergeById(prevOrders, changedOrders, deleted.orders, true));
+        }
+        syncCursor = cursor;
       } catch (error) {
         console.log('❌ Error cargando productos del servidor:', error.message);
         
@@ -1280,14 +1322,7 @@ const App = () => {
                 }
 
                 console.log('💰 Cargando movimientos de caja del servidor...');
-                const response = await api.get('/cash-movements/');
-
-                let serverMovements = [];
-                if (response.data && Array.isArray(response.data.results)) {
-                    serverMovements = response.data.results;
-                } else if (Array.isArray(response.data)) {
-                    serverMovements = response.data;
-                }
+                const serverMovements = await getAllPages('/cash-movements/');
         
                 console.debug('🔍 Datos recibidos del servidor:', serverMovements.length, 'movimientos');
         
@@ -1323,18 +1358,8 @@ const App = () => {
                             try { setIsLoggedIn(true); } catch (e) { /* silent */ }
                         }
                 }
-        const response = await api.get('/sales/');
-                // Manejar respuesta paginada de DRF: { count, next, previous, results: [...] }
-                let serverSales = [];
-                if (Array.isArray(response.data)) {
-                    serverSales = response.data;
-                } else if (response.data && Array.isArray(response.data.results)) {
-                    serverSales = response.data.results;
-                } else if (response.data && typeof response.data === 'object' && response.data !== null) {
-                    // A veces la API puede devolver un objeto con key 'data' o 'sales'
-                    if (Array.isArray(response.data.data)) serverSales = response.data.data;
-                    else if (Array.isArray(response.data.sales)) serverSales = response.data.sales;
-                }
+                // Páginas por cursor de /sales/ (más recientes primero)
+                const serverSales = await getAllPages('/sales/');
 
                 // Guardar ventas completas en el estado para consultas y para marcar productos con ventas
                                                                 setSales(serverSales);
@@ -1349,8 +1374,7 @@ const App = () => {
     const loadInventoryChanges = async () => {
       try {
         console.log('📦 Cargando cambios de inventario del servidor...');
-        const response = await api.get('/inventory-changes/');
-        const serverChanges = response.data;
+        const serverChanges = await getAllPages('/inventory-changes/');
         
         console.log('✅ Cambios de inventario cargados:', `${serverChanges.length} cambios del servidor`);
         console.log('📋 Cambios:', serverChanges);
@@ -1843,17 +1843,141 @@ export default function DataConsultation(props) {
         return results;
     };
 
+    // Filtros de la consulta actual en el formato de api/reports.py (el servidor vuelve a aplicarlos)
+    const buildReportFilters = () => {
+        const dateParts = (year, month, day, hour, minute) => {
+            const parts = { year, month, day, hour, minute };
+            Object.keys(parts).forEach(key => { if (parts[key] === '' || parts[key] === null || parts[key] === undefined) delete parts[key]; });
+            return Object.keys(parts).length > 0 ? parts : null;
+        };
+        const conditions = [];
+        const addCondition = (field, op, value, extra = {}) => {
+            if (value === undefined || value === null || String(value).trim() === '') return;
+            conditions.push({ field, op, value: String(value).trim(), ...extra });
+        };
+        const filters = { period: queryResults && queryResults.summary && queryResults.summary.period };
+        let dateFrom = null;
+        let dateTo = null;
+        let useDateRange = Boolean(startDate && endDate);
+
+        switch (selectedQuery) {
+            case 'stock':
+                useDateRange = false;
+                addCondition('id', stockIdFilterOp, stockIdFilter);
+                addCondition('name', 'contains', stockNameFilter);
+                addCondition('quantity', stockQuantityOp, stockQuantityFilter, { unit: stockQuantityUnit });
+                addCondition('price', stockPriceOp, stockPriceFilter);
+                if (stockTypeFilter) filters.type = stockTypeFilter;
+                if (stockStatusFilter.length > 0) filters.status = stockStatusFilter;
+                break;
+            case 'proveedores':
+                useDateRange = false;
+                addCondition('id', suppliersIdFilterOp, suppliersIdFilter);
+                addCondition('name', suppliersNameFilterOp, suppliersNameFilter);
+                addCondition('cuit', suppliersCuitFilterOp, suppliersCuitFilter);
+                addCondition('phone', suppliersPhoneFilterOp, suppliersPhoneFilter);
+                addCondition('address', suppliersAddressFilterOp, suppliersAddressFilter);
+                addCondition('products', suppliersProductFilterOp, suppliersProductFilter);
+                break;
+            case 'ventas':
+                dateFrom = dateParts(salesDateFromYear, salesDateFromMonth, salesDateFromDay, salesDateFromHour, salesDateFromMinute);
+                dateTo = dateParts(salesDateToYear, salesDateToMonth, salesDateToDay, salesDateToHour, salesDateToMinute);
+                addCondition('id', salesIdFilterOp, salesIdFilter);
+                addCondition('product', 'contains', salesProductFilter);
+                addCondition('user', 'contains', salesUserFilter);
+                addCondition('total', salesTotalOp, salesTotalFilter);
+                addCondition('quantity', salesQuantityOp, salesQuantityFilter);
+                // En ventas el rango de fechas general solo se usa si no hay otros filtros
+                if (conditions.length > 0) useDateRange = false;
+                break;
+            case 'compras':
+                dateFrom = dateParts(purchasesDateFromYear, purchasesDateFromMonth, purchasesDateFromDay, purchasesDateFromHour, purchasesDateFromMinute);
+                dateTo = dateParts(purchasesDateToYear, purchasesDateToMonth, purchasesDateToDay, purchasesDateToHour, purchasesDateToMinute);
+                addCondition('id', purchasesIdFilterOp, purchasesIdFilter);
+                addCondition('supplier', purchasesSupplierFilterOp, purchasesSupplierFilter);
+                addCondition('total', purchasesTotalFilterOp, purchasesTotalFilter);
+                addCondition('product', 'contains', purchasesProductFilter);
+                addCondition('quantity', purchasesQuantityFilterOp, purchasesQuantityFilter);
+                if (purchasesTypeFilter.length > 0) filters.type = purchasesTypeFilter;
+                break;
+            case 'pedidos':
+                dateFrom = dateParts(ordersDateFromYear, ordersDateFromMonth, ordersDateFromDay, ordersDateFromHour, ordersDateFromMinute);
+                dateTo = dateParts(ordersDateToYear, ordersDateToMonth, ordersDateToDay, ordersDateToHour, ordersDateToMinute);
+                addCondition('id', ordersIdFilterOp, ordersIdFilter);
+                addCondition('customer', ordersCustomerFilterOp, ordersCustomerFilter);
+                addCondition('product', 'contains', ordersProductFilter);
+                addCondition('units', ordersUnitsFilterOp, ordersUnitsFilter);
+                if (ordersPaymentMethodFilter.length > 0) filters.payment_method = ordersPaymentMethodFilter;
+                if (ordersStatusFilter.length > 0) filters.status = ordersStatusFilter;
+                break;
+            case 'movimientos_caja':
+                dateFrom = dateParts(cashDateFromYear, cashDateFromMonth, cashDateFromDay, cashDateFromHour, cashDateFromMinute);
+                dateTo = dateParts(cashDateToYear, cashDateToMonth, cashDateToDay, cashDateToHour, cashDateToMinute);
+                addCondition('id', cashIdFilterOp, cashIdFilter);
+                addCondition('amount', cashAmountFilterOp, cashAmountFilter);
+                addCondition('description', cashDescriptionFilterOp, cashDescriptionFilter);
+                addCondition('user', cashUserFilterOp, cashUserFilter);
+                if (cashTypeFilter) filters.type = cashTypeFilter;
+                if (cashPaymentMethodFilter.length > 0) filters.payment_method = cashPaymentMethodFilter;
+                filters.order = cashSortOrder;
+                break;
+            default:
+                useDateRange = false;
+        }
+
+        if (dateFrom || dateTo) {
+            // El filtro granular reemplaza al rango de fechas general
+            if (dateFrom) filters.date_from = dateFrom;
+            if (dateTo) filters.date_to = dateTo;
+        } else if (useDateRange) {
+            filters.start_date = startDate;
+            filters.end_date = endDate;
+        }
+        if (conditions.length > 0) filters.conditions = conditions;
+        return filters;
+    };
+
     const exportData = async () => {
         if (!queryResults) { setMessage('🚫 Error: No hay datos para exportar.'); return; }
         try {
+            // El servidor arma el reporte con los mismos filtros aplicados en pantalla
+            const reportFilters = buildReportFilters();
             const token = getInMemoryToken && getInMemoryToken();
-            const response = await fetch('/api/export-data/', { method: 'POST', credentials: 'include', headers: { 'Content-Type': 'application/json', 'Authorization': token ? `Bearer ${token}` : undefined }, body: JSON.stringify({ query_type: selectedQuery, data: queryResults.data, summary: queryResults.summary }) });
+            const headers = { 'Content-Type': 'application/json', 'Authorization': token ? `Bearer ${token}` : undefined };
+            // El PDF se genera en segundo plano (worker de reportes): se encola y se consulta el estado
+            const jobResponse = await fetch('/api/reports/', { method: 'POST', credentials: 'include', headers, body: JSON.stringify({ query_type: selectedQuery, filters: reportFilters }) });
+            if (!jobResponse.ok) { setMessage('🚫 Error al exportar PDF.'); return; }
+            let job = await jobResponse.json();
+            setMessage('⏳ Generando PDF...');
+            for (let attempt = 0; attempt < 120 && (job.status === 'pending' || job.status === 'running'); attempt++) {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                const statusResponse = await fetch(`/api/reports/${job.id}/`, { credentials: 'include', headers });
+                if (!statusResponse.ok) { setMessage('🚫 Error al exportar PDF.'); return; }
+                job = await statusResponse.json();
+            }
+            if (job.status !== 'done') { setMessage(job.status === 'failed' ? '🚫 Error al exportar PDF.' : '⏳ El PDF se sigue generando, intente nuevamente en unos minutos.'); return; }
+            const response = await fetch(job.download_url, { credentials: 'include', headers });
             if (!response.ok) { setMessage('🚫 Error al exportar PDF.'); return; }
             const blob = await response.blob();
             const url = window.URL.createObjectURL(blob); const a = document.createElement('a'); a.href = url; a.download = `${selectedQuery}_reporte.pdf`; document.body.appendChild(a); a.click(); a.remove(); window.URL.revokeObjectURL(url); setMessage('✅ PDF exportado correctamente.');
         } catch (error) { setMessage('🚫 Error al exportar PDF.'); }
     };
 
+    // Exportación CSV / Excel en streaming (rango de fechas seleccionado, sin límite de filas)
+    const exportFile = async (fileFormat) => {
+        if (!selectedQuery) { setMessage('🚫 Debe seleccionar un tipo de consulta.'); return; }
+        try {
+            const params = new URLSearchParams({ query_type: selectedQuery, file_format: fileFormat });
+            if (startDate) params.append('start_date', startDate);
+            if (endDate) params.append('end_date', endDate);
+            const token = getInMemoryToken && getInMemoryToken();
+            const response = await fetch(`/api/export-data/stream/?${params.toString()}`, { credentials: 'include', headers: { 'Authorization': token ? `Bearer ${token}` : undefined } });
+            if (!response.ok) { setMessage('🚫 Error al exportar archivo.'); return; }
+            const blob = await response.blob();
+            const url = window.URL.createObjectURL(blob); const a = document.createElement('a'); a.href = url; a.download = `${selectedQuery}_reporte.${fileFormat}`; document.body.appendChild(a); a.click(); a.remove(); window.URL.revokeObjectURL(url); setMessage('✅ Archivo exportado correctamente.');
+        } catch (error) { setMessage('🚫 Error al exportar archivo.'); }
+    };
+
     const executeQuery = async () => {
         if (!selectedQuery) { setMessage('🚫 Debe seleccionar un tipo de consulta.'); return; }
         if (startDate && endDate) { const start = parseAnyDate(startDate); const end = parseAnyDate(endDate); if (start > end) { setMessage('🚫 Error: La fecha de inicio no puede ser posterior a la fecha de fin.'); return; } }
@@ -2781,6 +2905,8 @@ export default function DataConsultation(props) {
                 <div className="query-actions">
                     <button onClick={executeQuery} className="action-button primary">Ejecutar Consulta</button>
                     <button onClick={exportData} className="action-button secondary" id='Exportar-datos' disabled={!queryResults}>Exportar Datos</button>
+                    <button onClick={() => exportFile('csv')} className="action-button secondary" id='Exportar-csv' disabled={!selectedQuery}>Exportar CSV</button>
+                    <button onClick={() => exportFile('xlsx')} className="action-button secondary" id='Exportar-xlsx' disabled={!selectedQuery}>Exportar Excel</button>
                 </div>
             </div>
             {queryResults && (
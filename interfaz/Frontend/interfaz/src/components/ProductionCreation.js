@@ -1,7 +1,7 @@
 
 import React, { useState, useEffect, useRef } from 'react';
 import Select from 'react-select';
-import api from '../services/api';
+import api, { getAllPages } from '../services/api';
 
 const ProductionCreation = ({ products, userRole, loadProducts }) => {
     const [productions, setProductions] = useState([]);
@@ -179,8 +179,7 @@ const ProductionCreation = ({ products, userRole, loadProducts }) => {
 
     const loadProductions = async () => {
         try {
-            const response = await api.get('/productions/');
-            setProductions(response.data);
+            setProductions(await getAllPages('/productions/'));
         } catch (err) {
             console.error('Error loading productions:', err);
         }
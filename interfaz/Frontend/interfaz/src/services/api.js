@@ -170,9 +170,24 @@ const updateOrderStatus = (orderId, status) => {
   return api.patch(`/orders/${orderId}/`, { status });
 };
 
+// Listados históricos con paginación por cursor: se piden de a `pageSize` filas
+// siguiendo `next`, así ningún request recorre el historial completo de una vez
+const getAllPages = async (path, pageSize = 500) => {
+  const results = [];
+  let params = { page_size: pageSize };
+  for (;;) {
+    const response = await api.get(path, { params });
+    const data = response.data;
+    if (Array.isArray(data)) return data;
+    results.push(...((data && data.results) || []));
+    if (!data || !data.next) return results;
+    params = { page_size: pageSize, cursor: new URL(data.next).searchParams.get('cursor') };
+  }
+};
+
 // Funciones para Gestión de Pérdidas
-const getLossRecords = () => {
-  return api.get('/loss-records/');
+const getLossRecords = async () => {
+  return { data: await getAllPages('/loss-records/') };
 };
 
 // === FUNCIONES OFFLINE ===
@@ -200,5 +215,6 @@ export {
   produceProduct,
   resetWithToken,
   updateOrderStatus,
+  getAllPages,
   getLossRecords // Nueva exportación
 };
\ No newline at end of file